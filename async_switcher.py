@@ -0,0 +1,158 @@
+"""
+asyncio facade for embedding AudioSwitcher in other tools
+Switches and toggles go through the switcher's queue on the COM worker and
+are awaited with asyncio.wrap_future, so the event loop never waits on COM.
+Device lists and the current device come from the in-memory registry.
+Device and default-device changes are forwarded from the worker with
+loop.call_soon_threadsafe into one queue per subscriber, read with async for.
+"""
+
+import asyncio
+from collections import namedtuple
+
+from audio_backend import ROLE_NAMES
+
+# Devices added to and removed from the registry, as DeviceRecord lists
+DeviceEvent = namedtuple('DeviceEvent', ['added', 'removed'])
+# New default render endpoint: role name, endpoint ID and device label
+DefaultEvent = namedtuple('DefaultEvent', ['role', 'device_id', 'label'])
+
+# Events a subscriber may fall behind by before the oldest are dropped
+STREAM_BACKLOG = 256
+
+_ROLE_LABELS = {role: name for name, role in ROLE_NAMES.items()}
+_CLOSED = object()
+
+
+class EventStream:
+    """One subscription; async-iterate it for events, close() to end it"""
+
+    def __init__(self, subscribers, backlog=STREAM_BACKLOG):
+        self._subscribers = subscribers
+        self._queue = asyncio.Queue(backlog)
+        self._closed = False
+        # Events dropped because the subscriber fell behind
+        self.dropped = 0
+        subscribers.add(self)
+
+    def _put(self, event):
+        """Event loop side of the hand-off"""
+        if self._queue.full():
+            self._queue.get_nowait()
+            self.dropped += 1
+        self._queue.put_nowait(event)
+
+    def close(self):
+        """Unsubscribe; iteration ends after the events already queued"""
+        if not self._closed:
+            self._closed = True
+            self._subscribers.discard(self)
+            self._put(_CLOSED)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        event = await self._queue.get()
+        if event is _CLOSED:
+            raise StopAsyncIteration
+        return event
+
+
+class AsyncAudioSwitcher:
+    """Awaitable methods and event streams over one shared AudioSwitcher"""
+
+    def __init__(self, switcher, loop=None):
+        """
+        switcher: AudioSwitcher whose COM worker serves every caller
+        loop: event loop events are delivered to; defaults to the running loop
+        """
+        self.switcher = switcher
+        self._loop = loop or asyncio.get_running_loop()
+        self._owned = False
+        self._device_streams = set()
+        self._default_streams = set()
+        switcher.add_device_listener(self._on_devices)
+        switcher.add_default_listener(self._on_default)
+
+    @classmethod
+    async def open(cls, **kwargs):
+        """Start an AudioSwitcher(**kwargs) off the event loop and wrap it;
+        close() stops it again"""
+        from audio_switcher import AudioSwitcher
+
+        loop = asyncio.get_running_loop()
+        switcher = await loop.run_in_executor(None, lambda: AudioSwitcher(**kwargs))
+        self = cls(switcher, loop)
+        self._owned = True
+        return self
+
+    async def close(self):
+        """End all event streams; stops the switcher if open() started it"""
+        for stream in list(self._device_streams) + list(self._default_streams):
+            stream.close()
+        if self._owned:
+            self._owned = False
+            await self._loop.run_in_executor(None, self.switcher.close)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def list_devices(self):
+        """Output devices as DeviceRecords"""
+        return list(self.switcher.devices)
+
+    async def current(self):
+        """Label of the current default device"""
+        if self.switcher.notifications_active:
+            return self.switcher.get_current_device()
+        return await self._run(self.switcher.get_current_device)
+
+    async def switch(self, device_name):
+        """Switch to device_name; returns the SwitchResult"""
+        return await asyncio.wrap_future(self.switcher.request_switch(device_name), loop=self._loop)
+
+    async def toggle(self):
+        """Toggle between device A and B; returns the SwitchResult"""
+        return await asyncio.wrap_future(self.switcher.request_toggle(), loop=self._loop)
+
+    async def warm_up(self):
+        """Compile the toggle plan and create the policy client ahead of the first switch"""
+        await asyncio.wrap_future(self.switcher.warm_up(), loop=self._loop)
+
+    def device_events(self, backlog=STREAM_BACKLOG):
+        """Stream of DeviceEvents"""
+        return EventStream(self._device_streams, backlog)
+
+    def default_events(self, backlog=STREAM_BACKLOG):
+        """Stream of DefaultEvents"""
+        return EventStream(self._default_streams, backlog)
+
+    def _run(self, fn, *args):
+        return asyncio.wrap_future(self.switcher.worker.submit(fn, *args), loop=self._loop)
+
+    # Listeners; these run on the COM worker
+
+    def _on_devices(self, added, removed):
+        if self._device_streams:
+            self._publish(self._device_streams, DeviceEvent(list(added), list(removed)))
+
+    def _on_default(self, role, device_id):
+        if self._default_streams:
+            label = self.switcher.devices.label(device_id, "Unknown")
+            self._publish(self._default_streams, DefaultEvent(_ROLE_LABELS.get(role, role), device_id, label))
+
+    def _publish(self, streams, event):
+        try:
+            self._loop.call_soon_threadsafe(self._deliver, streams, event)
+        except RuntimeError:
+            # The event loop has been closed
+            pass
+
+    @staticmethod
+    def _deliver(streams, event):
+        for stream in list(streams):
+            stream._put(event)
@@ -0,0 +1,288 @@
+"""
+Windows Core Audio backend
+Every method is called on the ComWorker thread, which owns the COM apartment
+for the lifetime of the process.
+"""
+
+from collections import namedtuple
+
+from tracing import tracer
+
+# EDataFlow / ERole values used by the Core Audio APIs
+FLOW_RENDER = 0
+FLOW_CAPTURE = 1
+ROLE_CONSOLE = 0
+ROLE_MULTIMEDIA = 1
+ROLE_COMMUNICATIONS = 2
+ROLES = (ROLE_CONSOLE, ROLE_MULTIMEDIA, ROLE_COMMUNICATIONS)
+ROLE_NAMES = {
+    'console': ROLE_CONSOLE,
+    'multimedia': ROLE_MULTIMEDIA,
+    'communications': ROLE_COMMUNICATIONS,
+}
+
+DEVICE_STATE_ACTIVE = 0x1
+DEVICE_STATE_DISABLED = 0x2
+DEVICE_STATE_NOTPRESENT = 0x4
+DEVICE_STATE_UNPLUGGED = 0x8
+
+# EndpointFormFactor values; endpoints reporting FORM_FACTOR_MICROPHONE are
+# never offered as outputs even when they appear under eRender
+FORM_FACTOR_REMOTE_NETWORK_DEVICE = 0
+FORM_FACTOR_SPEAKERS = 1
+FORM_FACTOR_LINE_LEVEL = 2
+FORM_FACTOR_HEADPHONES = 3
+FORM_FACTOR_MICROPHONE = 4
+FORM_FACTOR_HEADSET = 5
+FORM_FACTOR_HANDSET = 6
+FORM_FACTOR_DIGITAL_PASSTHROUGH = 7
+FORM_FACTOR_SPDIF = 8
+FORM_FACTOR_DIGITAL_DISPLAY = 9
+FORM_FACTOR_UNKNOWN = 10
+
+# PROPVARIANT type of a property the store does not have
+VT_EMPTY = 0
+
+# Property keys read for each surviving endpoint: (fmtid, pid)
+PKEY_DEVICE_FRIENDLY_NAME = ('{A45C254E-DF1C-4EFD-8020-67D146A850E0}', 14)
+PKEY_AUDIO_ENDPOINT_FORM_FACTOR = ('{1DA5D803-D492-4EDD-8C23-E0C0FFEE7F0E}', 0)
+
+
+# What is kept of an endpoint after enumeration. No COM pointer or property
+# store survives: the IMMDevice and its store are released as soon as these
+# five values have been read.
+DeviceRecord = namedtuple('DeviceRecord', ['id', 'name', 'state', 'flow', 'form_factor'])
+
+
+def is_output_endpoint(flow, state, form_factor):
+    """Active render endpoint that can play audio"""
+    return (flow == FLOW_RENDER and state == DEVICE_STATE_ACTIVE
+            and form_factor != FORM_FACTOR_MICROPHONE)
+
+
+class CoreAudioBackend:
+    """Core Audio backend built on pycaw and IPolicyConfig"""
+
+    def __init__(self):
+        # CLSID of the PolicyConfig class that worked last time (from config)
+        self.preferred_clsid = None
+        self._policy_client = None
+        self._notifications = None
+        # Endpoint ID -> IAudioEndpointVolume, activated once per endpoint
+        self._volumes = {}
+
+    def initialize(self):
+        """Enter the COM apartment on the worker thread"""
+        from comtypes import CoInitialize
+        CoInitialize()
+
+    def uninitialize(self):
+        """Leave the COM apartment on the worker thread"""
+        from comtypes import CoUninitialize
+        CoUninitialize()
+
+    def shutdown(self):
+        """Release COM objects owned by the backend"""
+        self.unregister_notifications()
+        self._policy_client = None
+        self._volumes.clear()
+
+    def enumerate_devices(self):
+        """Return the active output devices
+
+        Only active eRender endpoints are enumerated, and only their
+        friendly name and form factor are read from the property store.
+        """
+        from pycaw.utils import AudioUtilities
+
+        with tracer.span('com.EnumAudioEndpoints'):
+            enumerator = AudioUtilities.GetDeviceEnumerator()
+            collection = enumerator.EnumAudioEndpoints(FLOW_RENDER, DEVICE_STATE_ACTIVE)
+            devices = []
+            for index in range(collection.GetCount()):
+                try:
+                    record = self._endpoint_info(collection.Item(index), FLOW_RENDER, DEVICE_STATE_ACTIVE)
+                except Exception:
+                    continue
+                if record is not None:
+                    devices.append(record)
+            # Release the collection and enumerator now rather than whenever
+            # the frame is collected; only plain records leave this method
+            del collection, enumerator
+        return devices
+
+    def read_device(self, device_id):
+        """Return one endpoint if it is an active output device, else None"""
+        from comtypes import COMError
+        from pycaw.utils import AudioUtilities
+        from mm_notifications import IMMEndpoint
+
+        enumerator = AudioUtilities.GetDeviceEnumerator()
+        try:
+            with tracer.span('com.GetDevice'):
+                device = enumerator.GetDevice(device_id)
+            state = device.GetState()
+            flow = device.QueryInterface(IMMEndpoint).GetDataFlow()
+            if flow != FLOW_RENDER or state != DEVICE_STATE_ACTIVE:
+                return None
+            return self._endpoint_info(device, flow, state)
+        except (COMError, OSError):
+            return None
+
+    def _endpoint_info(self, device, flow, state):
+        """DeviceRecord read from the property store, None for non-outputs
+
+        The store is opened once and dropped before returning, so the
+        record holds no COM reference.
+        """
+        store = device.OpenPropertyStore(0)  # STGM_READ
+        try:
+            form_factor = self._read_property(store, PKEY_AUDIO_ENDPOINT_FORM_FACTOR)
+            if form_factor is None:
+                form_factor = FORM_FACTOR_UNKNOWN
+            if not is_output_endpoint(flow, state, form_factor):
+                return None
+            device_name = self._read_property(store, PKEY_DEVICE_FRIENDLY_NAME)
+        finally:
+            del store
+        device_id = device.GetId()
+        if not device_name or not device_id:
+            return None
+        return DeviceRecord(device_id, device_name, state, flow, form_factor)
+
+    def _read_property(self, store, key):
+        """Read a single property value from an open property store
+
+        Returns None for a missing property or a type pycaw cannot convert.
+        The PROPVARIANT is cleared once the value has been copied out, or
+        every string read would leak its CoTaskMemAlloc'd buffer.
+        """
+        from comtypes import GUID
+        from pycaw.api.mmdeviceapi.depend.structures import PROPERTYKEY
+
+        pk = PROPERTYKEY()
+        pk.fmtid = GUID(key[0])
+        pk.pid = key[1]
+        value = store.GetValue(pk)
+        vt = value.vt
+        try:
+            if vt == VT_EMPTY:
+                return None
+            # ctypes copies LPWSTR values into a new str here
+            result = value.GetValue()
+        finally:
+            value.clear()
+        if result == f"{vt}:?":
+            # pycaw's placeholder for variant types it does not convert
+            return None
+        return result
+
+    def register_notifications(self, sink):
+        """Subscribe sink to endpoint add/remove/state/default notifications"""
+        from mm_notifications import EndpointNotifications
+        self.unregister_notifications()
+        self._notifications = EndpointNotifications(sink)
+
+    def unregister_notifications(self):
+        """Drop the endpoint notification subscription"""
+        if self._notifications is not None:
+            self._notifications.close()
+            self._notifications = None
+
+    def get_default_device_id(self, role=ROLE_CONSOLE):
+        """Return the endpoint ID of the default output device for role"""
+        from comtypes import COMError
+        from pycaw.utils import AudioUtilities
+
+        enumerator = AudioUtilities.GetDeviceEnumerator()
+        try:
+            with tracer.span('com.GetDefaultAudioEndpoint', role=role):
+                return enumerator.GetDefaultAudioEndpoint(FLOW_RENDER, role).GetId()
+        except (COMError, OSError):
+            # E_NOTFOUND: no output device at all
+            return None
+
+    def get_default_device_ids(self):
+        """Return {role: endpoint ID} for every role"""
+        return {role: self.get_default_device_id(role) for role in ROLES}
+
+    def prepare(self):
+        """Create the policy client ahead of the first switch"""
+        self._get_policy_client()
+
+    def _get_policy_client(self):
+        """Return the warm PolicyConfigClient, creating it on first use"""
+        if self._policy_client is None:
+            from policy_config import PolicyConfigClient
+            self._policy_client = PolicyConfigClient(self.preferred_clsid)
+            self.preferred_clsid = self._policy_client.clsid
+        return self._policy_client
+
+    def set_default_endpoints(self, device_id, roles):
+        """Make device_id the default endpoint for every role in roles
+
+        Returns {role: bool}. IPolicyConfig only sets one role per call, so
+        this is one SetDefaultEndpoint per role on the same warm client.
+        """
+        from policy_config import StaleClientError
+        try:
+            return self._get_policy_client().set_default_endpoints(device_id, roles)
+        except StaleClientError as e:
+            print(f"PolicyConfig client went stale, recreating: {e}")
+            self._policy_client = None
+            return self._get_policy_client().set_default_endpoints(device_id, roles)
+
+    def _endpoint_volume(self, device_id):
+        """Cached IAudioEndpointVolume of device_id, activated on first use"""
+        volume = self._volumes.get(device_id)
+        if volume is None:
+            from ctypes import POINTER, cast
+            from comtypes import CLSCTX_ALL
+            from pycaw.pycaw import IAudioEndpointVolume
+            from pycaw.utils import AudioUtilities
+
+            enumerator = AudioUtilities.GetDeviceEnumerator()
+            with tracer.span('com.Activate', interface='IAudioEndpointVolume'):
+                interface = enumerator.GetDevice(device_id).Activate(IAudioEndpointVolume._iid_, CLSCTX_ALL, None)
+            volume = self._volumes[device_id] = cast(interface, POINTER(IAudioEndpointVolume))
+        return volume
+
+    def release_volume(self, device_id=None):
+        """Drop the cached volume interface of device_id (all of them for None)"""
+        if device_id is None:
+            self._volumes.clear()
+        else:
+            self._volumes.pop(device_id, None)
+
+    def get_volume(self, device_id):
+        """Return (master level 0.0-1.0, muted) of device_id, None if it is gone"""
+        from comtypes import COMError
+        try:
+            volume = self._endpoint_volume(device_id)
+            return volume.GetMasterVolumeLevelScalar(), bool(volume.GetMute())
+        except (COMError, OSError):
+            self.release_volume(device_id)
+            return None
+
+    def set_volume(self, device_id, level=None, muted=None):
+        """Set the master level (0.0-1.0) and/or mute state of device_id
+
+        Goes through the cached interface; an interface invalidated by a
+        device change is activated again once. Returns False if the endpoint
+        is gone.
+        """
+        from comtypes import COMError
+        for attempt in (1, 2):
+            try:
+                volume = self._endpoint_volume(device_id)
+                with tracer.span('com.SetMasterVolume', level=level, muted=muted):
+                    if level is not None:
+                        volume.SetMasterVolumeLevelScalar(level, None)
+                    if muted is not None:
+                        volume.SetMute(bool(muted), None)
+                return True
+            except (COMError, OSError) as e:
+                self.release_volume(device_id)
+                if attempt == 2:
+                    print(f"Error setting volume: {e}")
+        return False
@@ -1,170 +1,821 @@
-import tkinter as tk
-from tkinter import ttk, messagebox
 import threading
-from comtypes import CLSCTX_ALL
-from pycaw.pycaw import AudioUtilities, IAudioEndpointVolume
-from pycaw.constants import CLSID_MMDeviceEnumerator
-import keyboard
-import json
 import os
-import pystray
-from PIL import Image, ImageDraw
-import winsound
+import queue
+import sys
+from collections import namedtuple
+
+from startup_profile import startup
+from tracing import tracer
+from audio_backend import DeviceRecord, FLOW_RENDER, ROLE_CONSOLE, ROLE_NAMES
+from com_worker import ComWorker
+from config_store import ConfigStore
+from device_registry import DeviceRegistry, AmbiguousDeviceError
+from switch_queue import SwitchQueue
+from switch_plan import SwitchPlan
+from volume_ramp import VolumeRamp
+from hotkey_engine import HotkeyEngine, HotkeyRecorder, ACTION_TOGGLE, ACTION_SWITCH, ACTION_CYCLE, ACTION_SCENE, ACTION_VOLUME
+
+
+# Outcome of a switch or toggle request, passed to switch listeners.
+# roles maps each role name that was set to whether it succeeded.
+SwitchResult = namedtuple('SwitchResult', ['target', 'ok', 'error', 'roles'], defaults=(None,))
+
+# Roles set on a switch unless the device has its own list in 'device_roles'
+DEFAULT_ROLES = ['console', 'multimedia', 'communications']
+
+# Milliseconds between checks of the GUI's queue of work posted from other
+# threads: UI_POLL_MS while work keeps arriving, doubling up to
+# UI_POLL_IDLE_MS while the queue stays empty
+UI_POLL_MS = 25
+UI_POLL_IDLE_MS = 250
+
+# Seconds after a start from the device snapshot before it is checked against
+# a live enumeration, unless the warm-up or a switch gets there first
+RECONCILE_DELAY = 2.0
+
+# Schema version of audio_config.json
+# 1: {"hotkeys": {hotkey: device name}} (audio_switcher_old.py), or no version key
+# 2: device_a/device_b toggle, device_roles and "bindings"
+CONFIG_VERSION = 2
+
+
+def migrate_config_v1(config):
+    """Turn the old per-device "hotkeys" map into switch bindings"""
+    config = dict(config)
+    bindings = list(config.get('bindings', []))
+    for hotkey, device in config.pop('hotkeys', {}).items():
+        bindings.append({'hotkey': hotkey, 'action': ACTION_SWITCH, 'device': device})
+    config['bindings'] = bindings
+    return config
+
+
+def advance_ring(ring, current, steps):
+    """Device reached by stepping steps times through ring from current
+
+    From a device outside the ring, the first step goes to ring[0].
+    """
+    if current in ring:
+        return ring[(ring.index(current) + steps) % len(ring)]
+    return ring[(steps - 1) % len(ring)]
+
+
+def resource_path(name):
+    """Path of a bundled resource, also inside a PyInstaller build"""
+    if getattr(sys, 'frozen', False):
+        return os.path.join(sys._MEIPASS, name)
+    return name
 
 
 class AudioSwitcher:
-    def __init__(self):
-        self.devices = []
+    def __init__(self, backend=None, config_file="audio_config.json", snapshot_file=None):
+        if backend is None:
+            from audio_backend import CoreAudioBackend
+            backend = CoreAudioBackend()
+        self.backend = backend
+        self.worker = ComWorker(backend)
+        self.worker.start()
+
+        self.devices = DeviceRegistry()
         self.current_device = None
-        self.config_file = "audio_config.json"
-        self.load_devices()
+        # Endpoint the last switch made default for at least one role
+        self.last_target_id = None
+        self.config_file = config_file
+        self.config_store = ConfigStore(config_file, CONFIG_VERSION, {1: migrate_config_v1})
+        # Last known devices and defaults, next to the config file
+        if snapshot_file is None:
+            snapshot_file = os.path.join(os.path.dirname(config_file), "audio_devices.json")
+        self.snapshot_file = snapshot_file
+        self.snapshot_store = ConfigStore(snapshot_file)
+        # False while the devices come from the snapshot and have not been
+        # checked against a live enumeration yet
+        self.devices_reconciled = False
+        # Worker timestamps of the last switch (queued/started/finished)
+        self.last_switch_timings = None
+        self._device_listeners = []
+        self._switch_listeners = []
+        self._default_listeners = []
+        self.switch_queue = SwitchQueue(self.worker, self._run_switch_job, self._superseded_result)
+        # Compiled A/B toggle, see switch_plan()
+        self._switch_plan = None
+        self.metrics = self.switch_queue.metrics
+        # Fades for the volume hotkeys, see request_volume
+        self.volume_ramp = VolumeRamp(self.worker)
+        # Default render endpoint per role, kept current by notifications
+        self.default_ids = {}
+        self.notifications_active = False
+        self.start_notifications()
+        # Set while the startup reconcile is waiting, see _reconcile_soon
+        self._reconcile_due = False
+        self._reconcile_timer = None
+        if self.load_snapshot():
+            # Start from the last known devices. Only the defaults are read
+            # now; the enumeration waits until after the warm-up or the first
+            # switch so it does not hold up the first hotkey press
+            self.worker.submit(self.resync_default_devices)
+            self._reconcile_due = True
+            self._reconcile_timer = threading.Timer(RECONCILE_DELAY, self.worker.submit, (self._reconcile_soon,))
+            self._reconcile_timer.daemon = True
+            self._reconcile_timer.start()
+        else:
+            self.load_devices()
+            self.resync_default_devices()
+            self.worker.submit(self.save_snapshot)
         self.device_a = None
         self.device_b = None
         self.toggle_hotkey = None
+        # Readable form of toggle_hotkey, which stores the key by scan code
+        self.toggle_hotkey_label = None
+        self.policy_clsid = None
+        # Role names to set per device name; missing devices use DEFAULT_ROLES
+        self.device_roles = {}
+        # Extra hotkeys: [{"hotkey": ..., "action": ..., ...}], see binding_callback
+        self.bindings = []
+        # Scene name -> {"device": name, "volume": 0-100, "mute": bool};
+        # volume and mute are optional
+        self.scenes = {}
+        # Device name as saved -> endpoint ID it stood for when saved, so a
+        # saved name still finds its device after twins come or go
+        self.device_ids = {}
+        # Loopback port of the control endpoint (ipc.py); None disables it
+        self.ipc_port = 47391
+        self.ipc_server = None
         self.load_config()
 
     def load_devices(self):
-        """Load all audio output devices using simplified approach"""
-        from comtypes import CoInitialize, CoUninitialize
-        CoInitialize()
+        """Load all audio output devices on the COM worker thread"""
         try:
-            from pycaw.utils import AudioUtilities, AudioDeviceState
-
-            self.devices = []
-            all_devices = AudioUtilities.GetAllDevices()
-
-            for device in all_devices:
-                try:
-                    device_name = device.FriendlyName
-                    device_id = device.id
-                    device_state = device.state
-
-                    is_active = device_state == AudioDeviceState.Active
-                    is_output = device_name and ('Speaker' in device_name or
-                                                 'Headphone' in device_name or
-                                                 'Headset' in device_name or
-                                                 'HDMI' in device_name or
-                                                 'NVIDIA' in device_name or
-                                                 'OMEN' in device_name or
-                                                 'Monitor' in device_name or
-                                                 'Output' in device_name)
-                    is_microphone = device_name and 'Microphone' in device_name
-
-                    if is_active and is_output and not is_microphone and device_name and device_id:
-                        device_info = {
-                            'device': device,
-                            'name': device_name,
-                            'id': device_id
-                        }
-                        self.devices.append(device_info)
-
-                except Exception as e:
-                    continue
-
+            self.devices.replace(self.worker.call(self.backend.enumerate_devices))
+            self.devices_reconciled = True
         except Exception as e:
             print(f"Error loading devices: {e}")
-        finally:
-            CoUninitialize()
+
+    def reconcile_devices(self):
+        """Check the registry against a live enumeration and apply only the
+        difference; runs on the COM worker"""
+        try:
+            live = self.backend.enumerate_devices()
+            default_ids = self.backend.get_default_device_ids()
+        except Exception as e:
+            print(f"Error reconciling devices: {e}")
+            return False
+
+        live_ids = set()
+        added, removed = [], []
+        for device_info in live:
+            live_ids.add(device_info.id)
+            old = self.devices.get(device_info.id)
+            if old is None or old.name != device_info.name:
+                self.devices.add(device_info)
+                added.append(device_info)
+                if old is not None:
+                    removed.append(old)
+        for old in self.devices:
+            if old.id not in live_ids:
+                self.devices.remove(old.id)
+                self.backend.release_volume(old.id)
+                removed.append(old)
+
+        defaults_changed = default_ids != self.default_ids
+        self.default_ids = default_ids
+        self.devices_reconciled = True
+        if added or removed or defaults_changed:
+            self.save_snapshot()
+            self._notify_devices(added, removed)
+        return True
+
+    def start_notifications(self):
+        """Subscribe to endpoint notifications; they keep self.devices current"""
+        try:
+            self.worker.call(self.backend.register_notifications, self)
+            self.notifications_active = True
+        except Exception as e:
+            print(f"Endpoint notifications unavailable, use Refresh instead: {e}")
+
+    def add_device_listener(self, callback):
+        """Call callback(added, removed) on the COM worker after each device change"""
+        self._device_listeners.append(callback)
+
+    def add_default_listener(self, callback):
+        """Call callback(role, device_id) on the COM worker when a default
+        render endpoint changes"""
+        self._default_listeners.append(callback)
+
+    # Endpoint notification sink. Windows calls these on its own threads, so
+    # they only queue the work for the COM worker.
+
+    def on_device_added(self, device_id):
+        self.worker.submit(self._update_device, device_id)
+
+    def on_device_removed(self, device_id):
+        self.worker.submit(self._update_device, device_id)
+
+    def on_device_state_changed(self, device_id, new_state):
+        self.worker.submit(self._update_device, device_id)
+
+    def on_default_device_changed(self, flow, role, device_id):
+        if flow == FLOW_RENDER:
+            self.worker.submit(self._set_default_id, role, device_id)
+
+    def _set_default_id(self, role, device_id):
+        """Record the default render endpoint for role and tell the default listeners"""
+        if self.default_ids.get(role) == device_id:
+            return
+        self.default_ids[role] = device_id
+        for callback in list(self._default_listeners):
+            try:
+                callback(role, device_id)
+            except Exception as e:
+                print(f"Error in default device listener: {e}")
+
+    def _update_device(self, device_id):
+        """Re-read one endpoint and apply the difference to the registry"""
+        device_info = self.backend.read_device(device_id)
+        old = self.devices.get(device_id)
+        if device_info is not None:
+            if old is not None and old.name == device_info.name:
+                return
+            self.devices.add(device_info)
+            added, removed = [device_info], [old] if old is not None else []
+        elif old is not None:
+            self.devices.remove(device_id)
+            self.backend.release_volume(device_id)
+            added, removed = [], [old]
+        else:
+            return
+        self.save_snapshot()
+        self._notify_devices(added, removed)
+
+    def _notify_devices(self, added, removed):
+        for callback in list(self._device_listeners):
+            try:
+                callback(added, removed)
+            except Exception as e:
+                print(f"Error in device listener: {e}")
 
     def get_device_names(self):
         """Get list of device names"""
-        return [device['name'] for device in self.devices]
+        return self.devices.names()
 
-    def get_current_device(self):
-        """Get the current default audio device"""
-        from comtypes import CoInitialize, CoUninitialize
-        CoInitialize()
+    def resync_default_devices(self):
+        """Slow path: query the default endpoints instead of trusting notifications"""
         try:
-            from pycaw.pycaw import AudioUtilities
-            from pycaw.constants import EDataFlow, ERole
-
-            speakers = AudioUtilities.GetSpeakers()
-            interface = speakers.Activate(IAudioEndpointVolume._iid_, CLSCTX_ALL, None)
-            # Get device friendly name
-            for device_info in self.devices:
-                if speakers.GetId() == device_info['id']:
-                    return device_info['name']
-            return "Unknown"
-        except:
-            return "Unknown"
-        finally:
-            CoUninitialize()
+            self.default_ids = self.worker.call(self.backend.get_default_device_ids)
+        except Exception as e:
+            print(f"Error reading default devices: {e}")
+
+    def get_current_device(self):
+        """Get the current default audio device from the cached endpoint ID"""
+        if not self.notifications_active:
+            self.resync_default_devices()
+        return self.current_device_label()
+
+    def current_device_label(self):
+        """Current default device from the cached endpoint ID alone
+
+        Never waits for the COM worker, so the Tk thread uses this instead
+        of get_current_device.
+        """
+        return self.devices.label(self.default_ids.get(ROLE_CONSOLE), "Unknown")
+
+    def add_switch_listener(self, callback):
+        """Call callback(SwitchResult) on the COM worker after each switch request"""
+        self._switch_listeners.append(callback)
+
+    def request_switch(self, device_name):
+        """Queue a switch to device_name on the COM worker; returns a Future
+
+        Supersedes any switch or toggle that has not started yet. A name that
+        cannot be switched to (unknown, or shared by several devices) fails
+        on its own and leaves the queued requests alone.
+        """
+        if self.devices_reconciled:
+            device_info, error = self._resolve_device(device_name)
+            if device_info is None:
+                return self.worker.submit(self._notify_switch, SwitchResult(device_name, False, error))
+        return self.switch_queue.switch(device_name)
+
+    @staticmethod
+    def _superseded_result(device_name):
+        return SwitchResult(None, False, f"Superseded by a switch to '{device_name}'")
+
+    def request_toggle(self):
+        """Queue an A/B toggle on the COM worker; returns a Future
+
+        Safe to call straight from the hotkey callback: nothing here waits
+        for the Tk main loop. Toggles that have not started yet cancel out
+        in pairs.
+        """
+        return self.switch_queue.toggle()
 
     def switch_to_device(self, device_name):
-        """Switch audio output to specified device"""
+        """Switch audio output to specified device and wait for the result"""
+        future = self.request_switch(device_name)
+        try:
+            return future.result().ok
+        finally:
+            self.last_switch_timings = future.timings
+
+    def switch_plan(self):
+        """The compiled A/B plan, recompiled if the devices or the registry changed"""
+        plan = self._switch_plan
+        ring = (self.device_a, self.device_b)
+        if plan is None or not plan.is_current(self.devices, ring):
+            plan = self._switch_plan = SwitchPlan(self.devices, ring, self.roles_for, self.device_ids)
+        return plan
+
+    def compile_switch_plan(self):
+        """Rebuild the A/B plan after the devices or their roles were changed"""
+        self._switch_plan = None
+        return self.switch_plan()
+
+    def warm_up(self):
+        """Compile the plan and create the policy client on the COM worker,
+        so the first toggle costs the same as later ones; returns a Future"""
+        return self.worker.submit(self._warm_up)
+
+    def _warm_up(self):
+        self.compile_switch_plan()
+        try:
+            self.backend.prepare()
+        except Exception as e:
+            print(f"Error preparing the audio backend: {e}")
+        self._remember_policy_clsid()
+        self._reconcile_soon()
+
+    def _reconcile_soon(self):
+        """Queue the deferred startup reconcile behind the jobs already waiting;
+        runs on the COM worker"""
+        if not self._reconcile_due:
+            return
+        self._reconcile_due = False
+        if self._reconcile_timer is not None:
+            self._reconcile_timer.cancel()
+        if not self.devices_reconciled:
+            self.worker.submit(self.reconcile_devices)
+
+    def _run_switch_job(self, target, steps):
+        """Run a batch for the switch queue, then let the startup reconcile follow"""
+        try:
+            return self._run_switch_batch(target, steps)
+        finally:
+            self._reconcile_soon()
+
+    def _run_switch_batch(self, target, steps):
+        """Apply the net effect of a batch of requests; runs on the COM worker"""
+        if target is None and len(steps) == 1 and steps[0][0] is None:
+            return self._run_planned_toggle(steps[0][1])
+        current = self.get_current_device()
+        if target is None and steps[0][0] is None:
+            # Toggles start from where the A/B plan stands, which is not the
+            # console default when A and B do not set the console role
+            plan = self.switch_plan()
+            if plan.ok:
+                current = self.devices.label(plan.position(self.default_ids, self.last_target_id), current)
+        final = target if target is not None else current
+        for ring, count in steps:
+            if ring is None:
+                if not self.device_a or not self.device_b:
+                    return self._notify_switch(SwitchResult(None, False, "Device A and Device B are not configured"))
+                ring = [self.device_a, self.device_b]
+            final = advance_ring(ring, final, count)
+        if target is None and final == current:
+            # e.g. an even number of toggles: nothing to do
+            self.metrics['noop'] += 1
+            return SwitchResult(current, True, None)
+        return self._notify_switch(self._switch(final))
+
+    def _run_planned_toggle(self, count):
+        """count A/B toggles through the compiled plan; runs on the COM worker"""
+        if not self.notifications_active:
+            self.resync_default_devices()
+        plan = self.switch_plan()
+        if not plan.ok and not self.devices_reconciled and self.reconcile_devices():
+            # A/B not in the snapshot: they may have been plugged in since
+            plan = self.switch_plan()
+        if not plan.ok:
+            return self._notify_switch(SwitchResult(plan.error_target, False, plan.error))
+        current_id = plan.position(self.default_ids, self.last_target_id)
+        destination = plan.step(current_id, count)
+        if destination.id == current_id:
+            self.metrics['noop'] += 1
+            return SwitchResult(destination.label, True, None)
+        return self._notify_switch(self._set_default(destination.label, destination.id, destination.role_names))
+
+    def _switch(self, device_name):
+        """Switch to device_name; runs on the COM worker"""
+        device_info, error = self._resolve_device(device_name)
+        if device_info is None:
+            return SwitchResult(device_name, False, error)
+        return self._set_default(device_name, device_info.id, self.roles_for(device_name))
+
+    def _resolve_device(self, device_name):
+        """Look device_name up; returns (DeviceRecord, None) or (None, error)"""
         try:
-            from comtypes import CoInitialize, CoUninitialize
-            CoInitialize()
+            device_info = self.devices.find(device_name, self.device_ids.get(device_name))
+        except AmbiguousDeviceError as e:
+            return None, str(e)
+        if device_info is None and not self.devices_reconciled and self.reconcile_devices():
+            # Not in the snapshot: it may have been plugged in since
+            return self._resolve_device(device_name)
+        if device_info is None:
+            return None, "Device not found"
+        return device_info, None
+
+    def request_volume(self, step, device_name=None):
+        """Fade the volume of device_name (the current device for None) by
+        step percent
+
+        Safe to call straight from the hotkey callback: the step only moves
+        the fade's target, and auto-repeats of a held key merge into one fade.
+        """
+        if device_name is None:
+            device_id = self.default_ids.get(ROLE_CONSOLE)
+        else:
             try:
-                for device_info in self.devices:
-                    if device_info['name'] == device_name:
-                        from policy_config import PolicyConfigClient
-                        client = PolicyConfigClient()
-                        client.set_default_endpoint(device_info['id'], 0)
-                        self.current_device = device_name
-                        return True
-                return False
-            finally:
-                CoUninitialize()
+                device_info = self.devices.find(device_name, self.device_ids.get(device_name))
+            except AmbiguousDeviceError as e:
+                print(f"Cannot change volume: {e}")
+                return
+            device_id = device_info.id if device_info is not None else None
+        if device_id is None:
+            print(f"Cannot change volume: {device_name or 'no current device'} not found")
+            return
+        self.volume_ramp.step(device_id, step / 100.0)
+
+    def request_mute(self, muted=None, device_name=None):
+        """Mute or unmute device_name (the current device for None) on the
+        COM worker; muted None toggles. Returns a Future of the new state"""
+        return self.worker.submit(self._set_mute, muted, device_name)
+
+    def _set_mute(self, muted, device_name):
+        if device_name is None:
+            device_id = self.default_ids.get(ROLE_CONSOLE)
+        else:
+            device_info, error = self._resolve_device(device_name)
+            if device_info is None:
+                print(f"Cannot mute {device_name}: {error}")
+                return None
+            device_id = device_info.id
+        if device_id is None:
+            return None
+        if muted is None:
+            current = self.backend.get_volume(device_id)
+            if current is None:
+                return None
+            muted = not current[1]
+        if not self.backend.set_volume(device_id, muted=muted):
+            return None
+        return muted
+
+    def request_scene(self, scene_name):
+        """Queue a scene on the COM worker; returns a Future of the SwitchResult"""
+        return self.worker.submit(self._run_scene, scene_name)
+
+    def _run_scene(self, scene_name):
+        """Apply a scene as one job on the COM worker
+
+        The volume and mute state go to the scene's device before it becomes
+        the default, so it is never heard at its previous level.
+        """
+        scene = self.scenes.get(scene_name)
+        if not scene or not scene.get('device'):
+            return self._notify_switch(SwitchResult(scene_name, False, "Scene not found"))
+        device_name = scene['device']
+        device_info, error = self._resolve_device(device_name)
+        if device_info is None:
+            return self._notify_switch(SwitchResult(device_name, False, error))
+
+        volume, mute = scene.get('volume'), scene.get('mute')
+        if volume is not None or mute is not None:
+            level = None if volume is None else min(max(volume, 0), 100) / 100.0
+            try:
+                self.backend.set_volume(device_info.id, level, mute)
+            except Exception as e:
+                print(f"Error setting volume for scene {scene_name}: {e}")
+        return self._notify_switch(self._set_default(device_name, device_info.id, self.roles_for(device_name)))
+
+    def _set_default(self, device_name, device_id, role_names):
+        """Make device_id the default for role_names; runs on the COM worker"""
+        roles = [ROLE_NAMES[name] for name in role_names]
+        try:
+            results = self.backend.set_default_endpoints(device_id, roles)
         except Exception as e:
-            print(f"Error switching device: {e}")
+            results = e
+        if (isinstance(results, Exception) or not any(results.values())) and self._device_gone(device_id):
+            # The endpoint ID from the snapshot no longer exists; look the
+            # name up again in a fresh enumeration
+            return self._switch(device_name)
+        if isinstance(results, Exception):
+            print(f"Error switching device: {results}")
+            return SwitchResult(device_name, False, str(results))
+
+        roles = {}
+        for name in role_names:
+            roles[name] = results[ROLE_NAMES[name]]
+            if roles[name]:
+                self._set_default_id(ROLE_NAMES[name], device_id)
+        ok = all(roles.values())
+        if ok:
+            self.current_device = device_name
+        if any(roles.values()):
+            self.last_target_id = device_id
+            self.save_snapshot()
+        self._remember_policy_clsid()
+        failed = [name for name, role_ok in roles.items() if not role_ok]
+        error = f"SetDefaultEndpoint failed for {', '.join(failed)}" if failed else None
+        return SwitchResult(device_name, ok, error, roles)
+
+    def _device_gone(self, device_id):
+        """True if a device taken from the snapshot has disappeared; the
+        registry is reconciled when it has"""
+        if self.devices_reconciled:
             return False
+        if self.backend.read_device(device_id) is not None:
+            return False
+        self.reconcile_devices()
+        return self.devices_reconciled
+
+    def roles_for(self, device_name):
+        """Role names to set when switching to device_name"""
+        roles = self.device_roles.get(device_name) or DEFAULT_ROLES
+        return [name for name in roles if name in ROLE_NAMES]
+
+    def _notify_switch(self, result):
+        for callback in list(self._switch_listeners):
+            try:
+                callback(result)
+            except Exception as e:
+                print(f"Error in switch listener: {e}")
+        return result
+
+    def request_cycle(self, devices):
+        """Queue a step to the next device in devices; returns a Future"""
+        return self.switch_queue.cycle(tuple(devices))
+
+    def hotkey_label(self):
+        """Readable toggle hotkey for display"""
+        return self.toggle_hotkey_label or self.toggle_hotkey
+
+    def register_hotkeys(self, engine):
+        """Add the toggle hotkey and every configured binding to a HotkeyEngine
+
+        Returns the toggle Binding (None if there is no toggle hotkey).
+        """
+        toggle = None
+        if self.toggle_hotkey:
+            try:
+                toggle = engine.add(self.toggle_hotkey, self.request_toggle)
+            except ValueError as e:
+                print(f"Failed to register saved hotkey: {e}")
+        for binding in self.bindings:
+            # Volume steps follow a held key unless the binding says otherwise
+            repeat = binding.get('repeat', binding.get('action') == ACTION_VOLUME and 'step' in binding)
+            try:
+                engine.add(binding['hotkey'], self.binding_callback(binding), repeat=repeat)
+            except (KeyError, ValueError) as e:
+                print(f"Skipping binding {binding}: {e}")
+        return toggle
+
+    def binding_callback(self, binding):
+        """Hotkey callback for a 'bindings' config entry
+
+        {"hotkey": ..., "action": "toggle"}
+        {"hotkey": ..., "action": "switch", "device": name}
+        {"hotkey": ..., "action": "cycle", "devices": [name, ...]}
+        {"hotkey": ..., "action": "scene", "scene": name}
+        {"hotkey": ..., "action": "volume", "step": percent, "device": name}
+        {"hotkey": ..., "action": "volume", "mute": true/false/"toggle", "device": name}
+
+        "device" is optional for volume bindings and defaults to the current device.
+        """
+        action = binding.get('action')
+        if action == ACTION_TOGGLE:
+            return self.request_toggle
+        if action == ACTION_SWITCH:
+            device = binding['device']
+            return lambda: self.request_switch(device)
+        if action == ACTION_CYCLE:
+            devices = tuple(binding['devices'])
+            return lambda: self.request_cycle(devices)
+        if action == ACTION_SCENE:
+            scene = binding['scene']
+            return lambda: self.request_scene(scene)
+        if action == ACTION_VOLUME:
+            device = binding.get('device')
+            if 'step' in binding:
+                step = binding['step']
+                return lambda: self.request_volume(step, device)
+            if 'mute' in binding:
+                muted = None if binding['mute'] == 'toggle' else bool(binding['mute'])
+                return lambda: self.request_mute(muted, device)
+            raise ValueError("Volume binding needs 'step' or 'mute'")
+        raise ValueError(f"Unsupported binding action: {action}")
+
+    def _remember_policy_clsid(self):
+        """Persist the PolicyConfig CLSID that worked so the next launch skips probing"""
+        clsid = self.backend.preferred_clsid
+        if clsid and clsid != self.policy_clsid:
+            self.policy_clsid = clsid
+            self.save_config()
+
+    def stats(self):
+        """Process statistics plus device and switch counters"""
+        from process_stats import process_stats
+        stats = process_stats()
+        stats['devices'] = len(self.devices)
+        stats['switch_metrics'] = dict(self.metrics)
+        stats['volume_metrics'] = dict(self.volume_ramp.metrics)
+        return stats
+
+    def start_ipc_server(self, stats=None):
+        """Listen for control requests from other processes (see ipc.py)
+
+        Returns the IpcServer, or None if it is disabled or the port is taken.
+        Clients authenticate with a session token written next to the config file.
+        """
+        if self.ipc_port is None:
+            return None
+        from ipc import IpcServer, token_path, write_token
+        try:
+            token = write_token(token_path(self.config_file))
+            self.ipc_server = IpcServer(self, port=self.ipc_port, stats=stats, token=token)
+        except OSError as e:
+            print(f"Control endpoint unavailable on port {self.ipc_port}: {e}")
+            return None
+        self.ipc_server.start()
+        return self.ipc_server
+
+    def close(self):
+        """Save the device snapshot, write pending files and stop the COM worker thread"""
+        if self.ipc_server is not None:
+            self.ipc_server.stop()
+            self.ipc_server = None
+        self.volume_ramp.cancel()
+        if self._reconcile_timer is not None:
+            self._reconcile_timer.cancel()
+        if self.worker.is_running():
+            self.worker.call(self.save_snapshot)
+        self.worker.stop()
+        self.config_store.flush()
+        self.snapshot_store.flush()
+
+    def load_snapshot(self):
+        """Fill the registry and default IDs from the snapshot file
+
+        Returns False when there is no usable snapshot.
+        """
+        snapshot = self.snapshot_store.load()
+        if snapshot is None:
+            return False
+        try:
+            devices = [DeviceRecord(*(device.get(field) for field in DeviceRecord._fields))
+                       for device in snapshot['devices'] if device.get('id') and device.get('name')]
+            default_ids = {ROLE_NAMES[name]: device_id
+                           for name, device_id in snapshot.get('default_ids', {}).items()
+                           if name in ROLE_NAMES}
+        except (KeyError, TypeError, AttributeError):
+            return False
+        self.devices.replace(devices)
+        self.default_ids = default_ids
+        return True
+
+    def save_snapshot(self):
+        """Save the known devices and the current defaults to the snapshot file"""
+        role_names = {role: name for name, role in ROLE_NAMES.items()}
+        snapshot = {
+            'devices': [device._asdict() for device in self.devices],
+            'default_ids': {role_names[role]: device_id for role, device_id in self.default_ids.items()
+                            if role in role_names}
+        }
+        self.snapshot_store.save(snapshot)
 
     def load_config(self):
-        """Load saved configuration"""
-        if os.path.exists(self.config_file):
+        """Load saved configuration, migrating older formats"""
+        config = self.config_store.load()
+        if config is not None:
+            self.device_a = config.get('device_a')
+            self.device_b = config.get('device_b')
+            self.toggle_hotkey = config.get('toggle_hotkey')
+            self.toggle_hotkey_label = config.get('toggle_hotkey_label')
+            self.policy_clsid = config.get('policy_clsid')
+            self.device_roles = config.get('device_roles', {})
+            self.bindings = config.get('bindings', [])
+            self.scenes = config.get('scenes', {})
+            self.device_ids = config.get('device_ids', {})
+            self.ipc_port = config.get('ipc_port', self.ipc_port)
+        self.backend.preferred_clsid = self.policy_clsid
+        self.compile_switch_plan()
+
+    def remember_device_ids(self):
+        """Record the endpoint ID behind every device name in the config
+
+        Names that cannot be resolved right now keep the ID saved earlier.
+        """
+        names = {self.device_a, self.device_b}
+        names.update(binding.get('device') for binding in self.bindings)
+        names.update(scene.get('device') for scene in self.scenes.values())
+        names.discard(None)
+        device_ids = {}
+        for name in names:
             try:
-                with open(self.config_file, 'r') as f:
-                    config = json.load(f)
-                    self.device_a = config.get('device_a')
-                    self.device_b = config.get('device_b')
-                    self.toggle_hotkey = config.get('toggle_hotkey')
-            except:
-                pass
+                device = self.devices.find(name, self.device_ids.get(name))
+            except AmbiguousDeviceError:
+                device = None
+            if device is not None:
+                device_ids[name] = device.id
+            elif name in self.device_ids:
+                device_ids[name] = self.device_ids[name]
+        self.device_ids = device_ids
 
     def save_config(self):
-        """Save configuration"""
+        """Queue the configuration for a background write; never blocks
+
+        The A/B plan is recompiled too, as the devices or roles may have changed.
+        """
+        self.remember_device_ids()
+        self.compile_switch_plan()
         config = {
             'device_a': self.device_a,
             'device_b': self.device_b,
-            'toggle_hotkey': self.toggle_hotkey
+            'toggle_hotkey': self.toggle_hotkey,
+            'toggle_hotkey_label': self.toggle_hotkey_label,
+            'policy_clsid': self.policy_clsid,
+            'device_roles': self.device_roles,
+            'bindings': self.bindings,
+            'scenes': self.scenes,
+            'device_ids': self.device_ids,
+            'ipc_port': self.ipc_port
         }
-        with open(self.config_file, 'w') as f:
-            json.dump(config, f, indent=4)
+        self.config_store.save(config)
 
 
 class AudioSwitcherGUI:
     def __init__(self):
-        self.root = tk.Tk()
-        self.root.title("Audio Output Switcher")
-        self.root.geometry("500x550")
-        self.root.resizable(False, False)
-
-        # Set window icon (for taskbar)
-        try:
-            import sys
-            if getattr(sys, 'frozen', False):
-                icon_path = os.path.join(sys._MEIPASS, 'icon.ico')
-            else:
-                icon_path = 'icon.ico'
-            self.root.iconbitmap(icon_path)
-        except:
-            pass
-
-        self.switcher = AudioSwitcher()
+        # Work for the Tk thread posted by the COM worker, the hotkey hook,
+        # the tray and the control endpoint; see post()
+        self.ui_queue = queue.Queue()
+        self._poll_delay = UI_POLL_MS
+
+        # The hotkey comes first: the switcher and the keyboard hook are up
+        # before tkinter is even imported. Nothing they call back into
+        # touches Tk; results wait in ui_queue until the window exists.
+        with startup.phase("com worker + device snapshot"):
+            self.switcher = AudioSwitcher()
         self.recording_hotkey = False
-        self.hotkey_registered = False
+        self.hotkeys = HotkeyEngine()
+        self.toggle_binding = None
+        self.recorder = None
         self.tray_icon = None
+        # Pre-rendered per-device tray icons and the device they show
+        self.tray_icons = None
+        self._tray_current = None
+        self._tray_actions = None
+        self.error_dialog_open = False
+        self.switcher.add_switch_listener(self.on_switch_done)
+        self.switcher.add_default_listener(self.on_default_changed)
+        # Listen before the lists are filled: a reconcile finishing in
+        # between would otherwise leave them showing the snapshot
+        self.switcher.add_device_listener(
+            lambda added, removed: self.post(self.apply_device_changes, added, removed)
+        )
+        with startup.phase("hotkey registration"):
+            self.register_saved_hotkey()
+        ipc_server = self.switcher.start_ipc_server()
+        if ipc_server is not None:
+            ipc_server.add_command('show', self._show_command)
+
+        with startup.phase("tk window"):
+            import tkinter as tk
+            self.root = tk.Tk()
+            self.root.title("Audio Output Switcher")
+            self.root.geometry("500x620")
+            self.root.resizable(False, False)
+
+            # Set window icon (for taskbar)
+            try:
+                self.root.iconbitmap(resource_path('icon.ico'))
+            except:
+                pass
+            self.root.after(UI_POLL_MS, self._poll_ui_queue)
 
         # Handle window close - minimize to tray instead of exit
         self.root.protocol("WM_DELETE_WINDOW", self.hide_to_tray)
 
-        self.setup_ui()
-        self.update_current_device()
-        self.register_saved_hotkey()
-        self.setup_tray_icon()
+        # The device lists are filled from the snapshot right away and
+        # corrected through the device listener once the live enumeration is
+        # in. The tray icon (pystray, PIL) is deferred until the main loop is
+        # running, and so is the warm-up of the switch plan and policy client.
+        with startup.phase("ui build"):
+            self.setup_ui()
+            self.populate_device_lists()
+            self.update_current_device()
+        self.root.after_idle(self.switcher.warm_up)
+        self.root.after_idle(self.setup_tray_icon)
 
     def setup_ui(self):
+        import tkinter as tk
+        from tkinter import ttk
+
         # Title
         title_label = tk.Label(
             self.root,
@@ -191,17 +842,25 @@ class AudioSwitcherGUI:
 
         # Device A
         tk.Label(device_frame, text="Device A:", font=("Arial", 10, "bold")).grid(row=0, column=0, padx=5, pady=5, sticky="w")
-        self.device_a_combo = ttk.Combobox(device_frame, values=self.switcher.get_device_names(), state="readonly", width=35)
+        self.device_a_combo = ttk.Combobox(device_frame, values=(), state="readonly", width=35)
         self.device_a_combo.grid(row=0, column=1, padx=5, pady=5)
         if self.switcher.device_a:
             self.device_a_combo.set(self.switcher.device_a)
+        self.device_a_roles = self.create_role_checkboxes(device_frame, 1, self.switcher.device_a)
 
         # Device B
-        tk.Label(device_frame, text="Device B:", font=("Arial", 10, "bold")).grid(row=1, column=0, padx=5, pady=5, sticky="w")
-        self.device_b_combo = ttk.Combobox(device_frame, values=self.switcher.get_device_names(), state="readonly", width=35)
-        self.device_b_combo.grid(row=1, column=1, padx=5, pady=5)
+        tk.Label(device_frame, text="Device B:", font=("Arial", 10, "bold")).grid(row=2, column=0, padx=5, pady=5, sticky="w")
+        self.device_b_combo = ttk.Combobox(device_frame, values=(), state="readonly", width=35)
+        self.device_b_combo.grid(row=2, column=1, padx=5, pady=5)
         if self.switcher.device_b:
             self.device_b_combo.set(self.switcher.device_b)
+        self.device_b_roles = self.create_role_checkboxes(device_frame, 3, self.switcher.device_b)
+
+        # Reload the role checkboxes when a different device is picked
+        self.device_a_combo.bind("<<ComboboxSelected>>",
+                                 lambda e: self.load_role_checkboxes(self.device_a_roles, self.device_a_combo.get()))
+        self.device_b_combo.bind("<<ComboboxSelected>>",
+                                 lambda e: self.load_role_checkboxes(self.device_b_roles, self.device_b_combo.get()))
 
         # Save devices button
         save_devices_btn = tk.Button(
@@ -213,7 +872,7 @@ class AudioSwitcherGUI:
             font=("Arial", 10, "bold"),
             cursor="hand2"
         )
-        save_devices_btn.grid(row=2, column=0, columnspan=2, pady=10)
+        save_devices_btn.grid(row=4, column=0, columnspan=2, pady=10)
 
         # Hotkey configuration frame
         hotkey_frame = tk.LabelFrame(self.root, text="Toggle Hotkey", padx=10, pady=10)
@@ -224,7 +883,7 @@ class AudioSwitcherGUI:
 
         self.hotkey_display_label = tk.Label(
             hotkey_frame,
-            text=self.switcher.toggle_hotkey if self.switcher.toggle_hotkey else "No hotkey set",
+            text=self.switcher.hotkey_label() if self.switcher.toggle_hotkey else "No hotkey set",
             font=("Arial", 12, "bold"),
             bg="#f0f0f0",
             relief="sunken",
@@ -273,13 +932,36 @@ class AudioSwitcherGUI:
         )
         refresh_btn.pack(pady=5)
 
+    def create_role_checkboxes(self, parent, row, device_name):
+        """One checkbox per endpoint role, returns {role name: BooleanVar}"""
+        import tkinter as tk
+
+        frame = tk.Frame(parent)
+        frame.grid(row=row, column=1, padx=5, sticky="w")
+        role_vars = {}
+        for name in ROLE_NAMES:
+            role_vars[name] = tk.BooleanVar()
+            tk.Checkbutton(frame, text=name.capitalize(), variable=role_vars[name]).pack(side="left")
+        self.load_role_checkboxes(role_vars, device_name)
+        return role_vars
+
+    def load_role_checkboxes(self, role_vars, device_name):
+        """Tick the roles configured for device_name"""
+        roles = self.switcher.roles_for(device_name)
+        for name, var in role_vars.items():
+            var.set(name in roles)
+
     def update_current_device(self):
         """Update current device display"""
-        current = self.switcher.get_current_device()
-        self.current_device_label.config(text=current)
+        with tracer.span('ui.update_current_device'):
+            current = self.switcher.current_device_label()
+            self.current_device_label.config(text=current)
+        self.update_tray(current)
 
     def save_devices(self):
         """Save selected devices"""
+        from tkinter import messagebox
+
         device_a = self.device_a_combo.get()
         device_b = self.device_b_combo.get()
 
@@ -291,38 +973,52 @@ class AudioSwitcherGUI:
             messagebox.showwarning("Same Device", "Device A and Device B must be different")
             return
 
+        roles_a = [name for name, var in self.device_a_roles.items() if var.get()]
+        roles_b = [name for name, var in self.device_b_roles.items() if var.get()]
+        if not roles_a or not roles_b:
+            messagebox.showwarning("No Roles", "Select at least one role for each device")
+            return
+
         self.switcher.device_a = device_a
         self.switcher.device_b = device_b
+        self.switcher.device_roles[device_a] = roles_a
+        self.switcher.device_roles[device_b] = roles_b
         self.switcher.save_config()
+        self.refresh_tray_menu()
         messagebox.showinfo("Success", f"Devices saved!\nA: {device_a}\nB: {device_b}")
 
     def toggle_devices(self):
-        """Toggle between device A and B"""
-        if not self.switcher.device_a or not self.switcher.device_b:
-            messagebox.showwarning("Not Configured", "Please select and save Device A and Device B first")
-            return
+        """Toggle between device A and B on the COM worker"""
+        self.switcher.request_toggle()
 
-        current = self.switcher.get_current_device()
-
-        # Toggle logic
-        if current == self.switcher.device_a:
-            target = self.switcher.device_b
-        elif current == self.switcher.device_b:
-            target = self.switcher.device_a
-        else:
-            # If current is neither A nor B, switch to A
-            target = self.switcher.device_a
-
-        if self.switcher.switch_to_device(target):
-            self.update_current_device()
-            print(f"Switched to: {target}")
+    def on_switch_done(self, result):
+        """Switch listener; runs on the COM worker, so only the beep happens here"""
+        if result.ok:
+            print(f"Switched to: {result.target}")
             # Play a subtle beep sound
             try:
+                import winsound
                 winsound.MessageBeep(winsound.MB_OK)  # System default sound
             except:
                 pass
-        else:
-            messagebox.showerror("Error", f"Failed to switch to {target}")
+        self.post(self.show_switch_result, result)
+
+    def show_switch_result(self, result):
+        """Update the current device label, or report a failed switch"""
+        from tkinter import messagebox
+
+        self.update_current_device()
+        if result.ok or self.error_dialog_open:
+            return
+        # Only one dialog at a time; later toggles keep running underneath it
+        self.error_dialog_open = True
+        try:
+            if result.target is None:
+                messagebox.showwarning("Not Configured", "Please select and save Device A and Device B first")
+            else:
+                messagebox.showerror("Error", f"Failed to switch to {result.target}: {result.error}")
+        finally:
+            self.error_dialog_open = False
 
     def start_recording_hotkey(self):
         """Start recording hotkey from keyboard input"""
@@ -334,151 +1030,235 @@ class AudioSwitcherGUI:
         )
         self.hotkey_display_label.config(text="Waiting for input...", fg="red")
 
-        # Start keyboard listener in a thread
-        threading.Thread(target=self._record_keys, daemon=True).start()
-
-    def _record_keys(self):
-        """Record keyboard keys pressed"""
-        import time
-
-        pressed_keys = set()
-        last_key = None
-        start_time = time.time()
-
-        def on_key_event(event):
-            nonlocal last_key
-            if event.event_type == 'down':
-                pressed_keys.add(event.name)
-                last_key = event.name
-
-        # Hook keyboard events
-        keyboard.hook(on_key_event)
-
-        # Wait for key combination (max 5 seconds)
-        while self.recording_hotkey and time.time() - start_time < 5:
-            time.sleep(0.1)
-            if pressed_keys and time.time() - start_time > 0.5:
-                break
-
-        keyboard.unhook_all()
+        # The recorder borrows the engine's hook; existing bindings are
+        # suspended until the combination is released or 5 seconds pass
+        self.recorder = HotkeyRecorder(
+            self.hotkeys,
+            lambda result: self.post(self._recording_done, result),
+            timeout=5.0
+        )
+        self.recorder.start()
 
+    def _recording_done(self, result):
+        """Recorder callback, on the Tk thread"""
+        self.recorder = None
         if not self.recording_hotkey:
             return
-
-        # Build hotkey string
-        if pressed_keys:
-            modifiers = []
-            regular_keys = []
-
-            for key in pressed_keys:
-                if key in ['ctrl', 'shift', 'alt', 'windows']:
-                    modifiers.append(key)
-                else:
-                    regular_keys.append(key)
-
-            if regular_keys and last_key in regular_keys:
-                hotkey_parts = sorted(modifiers) + [last_key]
-            elif modifiers:
-                hotkey_parts = sorted(modifiers)
-            else:
-                hotkey_parts = [last_key] if last_key else list(pressed_keys)
-
-            hotkey_str = '+'.join(hotkey_parts)
-            self.root.after(0, self._finish_recording, hotkey_str)
+        if result is None:
+            self._cancel_recording()
         else:
-            self.root.after(0, self._cancel_recording)
+            self._finish_recording(result)
 
-    def _finish_recording(self, hotkey_str):
+    def _finish_recording(self, result):
         """Finish recording and apply hotkey"""
+        from tkinter import messagebox
+
         self.recording_hotkey = False
 
         # Unregister old hotkey
-        if self.hotkey_registered and self.switcher.toggle_hotkey:
-            try:
-                keyboard.remove_hotkey(self.switcher.toggle_hotkey)
-            except:
-                pass
+        old_binding = self.toggle_binding
+        if old_binding is not None:
+            self.hotkeys.remove(old_binding)
 
         # Register new hotkey
         try:
-            keyboard.add_hotkey(hotkey_str, lambda: self.root.after(0, self.toggle_devices))
-            self.switcher.toggle_hotkey = hotkey_str
+            self.toggle_binding = self.hotkeys.add(result.hotkey, self.switcher.request_toggle)
+            self.switcher.toggle_hotkey = result.hotkey
+            self.switcher.toggle_hotkey_label = result.label
             self.switcher.save_config()
-            self.hotkey_registered = True
 
-            self.hotkey_display_label.config(text=hotkey_str, fg="green")
+            self.hotkey_display_label.config(text=result.label, fg="green")
             self.record_btn.config(text="Record New Hotkey", bg="#2196F3", state="normal")
-            messagebox.showinfo("Success", f"Hotkey '{hotkey_str}' registered!\nPress it anytime to toggle devices.")
+            messagebox.showinfo("Success", f"Hotkey '{result.label}' registered!\nPress it anytime to toggle devices.")
         except Exception as e:
+            if old_binding is not None:
+                self.toggle_binding = self.hotkeys.add(old_binding.hotkey, old_binding.callback)
             messagebox.showerror("Error", f"Failed to register hotkey: {str(e)}")
             self._cancel_recording()
 
     def _cancel_recording(self):
         """Cancel recording"""
         self.recording_hotkey = False
+        if self.recorder is not None:
+            self.recorder.cancel()
         self.record_btn.config(text="Record New Hotkey", bg="#2196F3", state="normal")
         if self.switcher.toggle_hotkey:
-            self.hotkey_display_label.config(text=self.switcher.toggle_hotkey, fg="black")
+            self.hotkey_display_label.config(text=self.switcher.hotkey_label(), fg="black")
         else:
             self.hotkey_display_label.config(text="No hotkey set", fg="black")
 
     def register_saved_hotkey(self):
-        """Register hotkey from config file"""
-        if self.switcher.toggle_hotkey:
-            try:
-                keyboard.add_hotkey(
-                    self.switcher.toggle_hotkey,
-                    lambda: self.root.after(0, self.toggle_devices)
-                )
-                self.hotkey_registered = True
-            except Exception as e:
-                print(f"Failed to register saved hotkey: {e}")
+        """Register hotkeys from config file and install the keyboard hook"""
+        try:
+            self.toggle_binding = self.switcher.register_hotkeys(self.hotkeys)
+            self.hotkeys.start()
+        except Exception as e:
+            print(f"Failed to register saved hotkey: {e}")
+
+    def populate_device_lists(self):
+        """Fill the device combo boxes from the registry"""
+        with tracer.span('ui.populate_device_lists'):
+            names = self.switcher.get_device_names()
+            self.device_a_combo.config(values=names)
+            self.device_b_combo.config(values=names)
+
+    def apply_device_changes(self, added, removed):
+        """Update the combo boxes and the tray after devices were added or removed"""
+        self.populate_device_lists()
+        for device in removed:
+            print(f"Device removed: {device.name}")
+        for device in added:
+            print(f"Device added: {device.name}")
+        self.refresh_tray_menu()
 
     def refresh_all(self):
-        """Refresh everything"""
-        self.switcher.load_devices()
-        self.device_a_combo.config(values=self.switcher.get_device_names())
-        self.device_b_combo.config(values=self.switcher.get_device_names())
+        """Re-enumerate on the COM worker; changes arrive through the device
+        listener and the result is shown once the worker is done"""
+        future = self.switcher.worker.submit(self.switcher.reconcile_devices)
+        future.add_done_callback(lambda future: self.post(self._refresh_done))
+
+    def _refresh_done(self):
+        from tkinter import messagebox
+
+        self.populate_device_lists()
         self.update_current_device()
         messagebox.showinfo("Refreshed", f"Found {len(self.switcher.devices)} devices")
 
-    def create_tray_icon_image(self):
-        """Load icon for the system tray"""
-        import sys
-        if getattr(sys, 'frozen', False):
-            icon_path = os.path.join(sys._MEIPASS, 'icon.ico')
-        else:
-            icon_path = 'icon.ico'
-        return Image.open(icon_path)
+    def post(self, fn, *args):
+        """Run fn(*args) on the Tk thread; safe from any thread and never blocks
 
-    def setup_tray_icon(self):
-        """Setup system tray icon"""
-        def show_window(icon, item):
-            self.root.after(0, self.show_from_tray)
+        root.after() from another thread waits for the Tk thread, which may
+        itself be waiting for that thread.
+        """
+        self.ui_queue.put((fn, args))
 
-        def quit_app(icon, item):
-            icon.stop()
-            self.root.after(0, self.root.quit)
+    def _poll_ui_queue(self):
+        """Run the work posted to the Tk thread
+
+        Polls quickly while work arrives and backs off while the app sits
+        idle in the tray, so an idle process wakes a few times a second.
+        Waking Tk from post() itself would block the posting thread.
+        """
+        if self.ui_queue.empty():
+            self._poll_delay = min(self._poll_delay * 2, UI_POLL_IDLE_MS)
+        else:
+            self._poll_delay = UI_POLL_MS
+        # Rescheduled first: a message box opened below runs a nested event
+        # loop, which keeps draining the queue
+        self.root.after(self._poll_delay, self._poll_ui_queue)
+        while True:
+            try:
+                fn, args = self.ui_queue.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                fn(*args)
+            except Exception as e:
+                print(f"Error in UI update: {e}")
 
-        def toggle_from_tray(icon, item):
-            self.root.after(0, self.toggle_devices)
+    def on_default_changed(self, role, device_id):
+        """Default listener; Windows changed the default device, maybe from outside"""
+        if role == ROLE_CONSOLE:
+            self.post(self.update_current_device)
 
-        menu = pystray.Menu(
+    def setup_tray_icon(self):
+        """Setup system tray icon on a background thread"""
+        threading.Thread(target=self._run_tray_icon, daemon=True).start()
+
+    def _run_tray_icon(self):
+        """Import pystray/PIL, pre-render the device icons and run the tray loop"""
+        with startup.phase("tray icon"):
+            import pystray
+            from tray_icons import TrayIconCache, tooltip
+
+            def show_window(icon, item):
+                self.post(self.show_from_tray)
+
+            def quit_app(icon, item):
+                icon.stop()
+                self.post(self.root.quit)
+
+            def toggle_from_tray(icon, item):
+                self.switcher.request_toggle()
+
+            self._tray_actions = (show_window, toggle_from_tray, quit_app)
+            names = self.switcher.get_device_names()
+            icons = TrayIconCache(resource_path('icon.ico'))
+            icons.set_pair(self.switcher.device_a, self.switcher.device_b)
+            icons.prerender(names)
+            self.tray_icons = icons
+            self.tray_icon = pystray.Icon("AudioSwitcher", icons.get(None), tooltip("Unknown"),
+                                          self.build_tray_menu(names))
+
+        if startup.enabled:
+            print(startup.report())
+        # The current device is filled in on the Tk thread, like every later update
+        self.post(self.update_current_device)
+        self.tray_icon.run()
+
+    def build_tray_menu(self, names):
+        """Tray menu with a Switch To entry per device name
+
+        Everything is fixed here; opening the menu only reads _tray_current
+        for the check mark.
+        """
+        import pystray
+
+        show_window, toggle_from_tray, quit_app = self._tray_actions
+        devices = [
+            pystray.MenuItem(name, self._tray_switch_action(name),
+                             checked=lambda item, name=name: self._tray_current == name,
+                             radio=True)
+            for name in names
+        ]
+        return pystray.Menu(
             pystray.MenuItem("Show", show_window, default=True),
             pystray.MenuItem("Toggle Devices", toggle_from_tray),
+            pystray.MenuItem("Switch To", pystray.Menu(*devices), enabled=bool(devices)),
+            pystray.Menu.SEPARATOR,
             pystray.MenuItem("Quit", quit_app)
         )
 
-        icon_image = self.create_tray_icon_image()
-        self.tray_icon = pystray.Icon("AudioSwitcher", icon_image, "Audio Switcher", menu)
+    def _tray_switch_action(self, device_name):
+        def switch_from_tray(icon, item):
+            self.switcher.request_switch(device_name)
+        return switch_from_tray
 
-        # Start tray icon in background thread
-        threading.Thread(target=self.tray_icon.run, daemon=True).start()
+    def refresh_tray_menu(self):
+        """Rebuild the tray menu and render new icons after the devices or A/B changed"""
+        if self.tray_icon is None:
+            self.update_current_device()
+            return
+        with tracer.span('ui.refresh_tray_menu'):
+            names = self.switcher.get_device_names()
+            self.tray_icons.set_pair(self.switcher.device_a, self.switcher.device_b)
+            self.tray_icons.prerender(names)
+            self.tray_icon.menu = self.build_tray_menu(names)
+            # The variant for the current device may have been re-rendered
+            self._tray_current = None
+        self.update_current_device()
+
+    def update_tray(self, current):
+        """Show current in the tray icon and tooltip, from the icon cache"""
+        if self.tray_icon is None or current == self._tray_current:
+            return
+        from tray_icons import tooltip
+
+        with tracer.span('ui.update_tray', device=current):
+            self._tray_current = current
+            self.tray_icon.icon = self.tray_icons.get(current)
+            self.tray_icon.title = tooltip(current)
+            self.tray_icon.update_menu()
 
     def hide_to_tray(self):
         """Hide window to system tray"""
         self.root.withdraw()
 
+    def _show_command(self, argument):
+        """'show' control command, sent by a second launch"""
+        self.post(self.show_from_tray)
+        return "shown"
+
     def show_from_tray(self):
         """Show window from system tray"""
         self.root.deiconify()
@@ -488,13 +1268,218 @@ class AudioSwitcherGUI:
     def run(self):
         """Start the application"""
         self.root.mainloop()
+        self.hotkeys.stop()
         if self.tray_icon:
             self.tray_icon.stop()
+        self.switcher.close()
+
+
+class AudioSwitcherDaemon:
+    """Headless mode: the hotkey hook, the COM worker and the config, no Tk,
+    PIL or pystray
+
+    Commands are read from stdin (stats, current, toggle, quit). Without a
+    usable stdin the daemon just waits for the hotkeys until it is stopped.
+    """
+
+    COMMANDS = ('stats', 'current', 'toggle', 'quit')
+
+    def __init__(self, switcher=None, hotkeys=None):
+        with startup.phase("com worker + device snapshot"):
+            self.switcher = switcher or AudioSwitcher()
+        self.hotkeys = hotkeys or HotkeyEngine()
+        self.toggle_binding = None
+        self._stopped = threading.Event()
+        self.switcher.add_switch_listener(self.on_switch_done)
+
+    def start(self):
+        """Register the saved hotkeys, install the keyboard hook and start
+        the control endpoint"""
+        with startup.phase("hotkey registration"):
+            try:
+                self.toggle_binding = self.switcher.register_hotkeys(self.hotkeys)
+                self.hotkeys.start()
+            except Exception as e:
+                print(f"Failed to register saved hotkey: {e}")
+        self.switcher.start_ipc_server(stats=self.stats)
+        self.switcher.warm_up()
+
+    def on_switch_done(self, result):
+        """Switch listener; runs on the COM worker"""
+        if not result.ok:
+            print(f"Failed to switch to {result.target}: {result.error}")
+            return
+        print(f"Switched to: {result.target}")
+        try:
+            import winsound
+            winsound.MessageBeep(winsound.MB_OK)
+        except:
+            pass
+
+    def stats(self):
+        """Process and switcher statistics"""
+        stats = self.switcher.stats()
+        stats['hotkey_events'] = self.hotkeys.events
+        return stats
+
+    def format_stats(self):
+        stats = self.stats()
+        rss = stats['rss_bytes']
+        lines = [
+            f"RSS: {rss / (1024 * 1024):.1f} MB" if rss is not None else "RSS: unknown",
+            f"Threads: {stats['threads']} ({stats['python_threads']} Python)",
+            f"Devices: {stats['devices']}",
+            f"Hotkey events: {stats['hotkey_events']}",
+            f"Switches: {stats['switch_metrics']}",
+            f"Volume: {stats['volume_metrics']}",
+        ]
+        return "\n".join(lines)
+
+    def handle_command(self, line):
+        """Run one stdin command; returns the text to print"""
+        command = line.strip().lower()
+        if command == 'stats':
+            return self.format_stats()
+        if command == 'current':
+            return self.switcher.get_current_device()
+        if command == 'toggle':
+            self.switcher.request_toggle()
+            return "Toggle queued"
+        if command in ('quit', 'exit'):
+            self.stop()
+            return "Stopping"
+        if command:
+            return f"Unknown command '{command}', use one of: {', '.join(self.COMMANDS)}"
+        return None
+
+    def run(self, stdin=None):
+        """Start and serve stdin commands until quit, EOF or Ctrl+C"""
+        self.start()
+        label = self.switcher.hotkey_label() or "no toggle hotkey"
+        print(f"Audio switcher running headless ({label}). Commands: {', '.join(self.COMMANDS)}")
+        if startup.enabled:
+            print(startup.report())
+        stdin = stdin if stdin is not None else sys.stdin
+        try:
+            if stdin is not None:
+                for line in stdin:
+                    output = self.handle_command(line)
+                    if output:
+                        print(output, flush=True)
+                    if self._stopped.is_set():
+                        break
+            # No stdin (pythonw, service) or stdin closed: keep serving hotkeys
+            while not self._stopped.wait(3600):
+                pass
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.close()
+
+    def stop(self):
+        """Make run() return"""
+        self._stopped.set()
+
+    def close(self):
+        self.hotkeys.stop()
+        self.switcher.close()
+
+
+def parse_args(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description="Audio Output Switcher")
+    parser.add_argument('--startup-profile', action='store_true',
+                        help="print time spent per startup phase and per import")
+    parser.add_argument('--daemon', action='store_true',
+                        help="run headless: hotkeys only, no window or tray icon")
+    parser.add_argument('--trace', metavar='FILE',
+                        help="record timing spans and write them to FILE (Chrome trace JSON) on exit")
+    parser.add_argument('--show', action='store_true',
+                        help="show the window of the running instance")
+    parser.add_argument('--switch', metavar='DEVICE', help="switch to DEVICE")
+    parser.add_argument('--toggle', action='store_true', help="toggle between device A and B")
+    return parser.parse_args(argv)
+
+
+def launch_commands(args):
+    """Control commands (see ipc.py) asked for on the command line"""
+    commands = []
+    if args.show:
+        commands.append('show')
+    if args.switch:
+        commands.append(f"switch {args.switch}")
+    if args.toggle:
+        commands.append('toggle')
+    return commands
+
+
+def forward_to_running_instance(args, config_file="audio_config.json", wait=3.0):
+    """Hand the command line to the instance holding the lock; returns the exit code
+
+    A plain second launch asks the running instance to show its window.
+    """
+    import json
+    import time
+    import ipc
+
+    port = ipc.DEFAULT_PORT
+    try:
+        with open(config_file) as f:
+            port = json.load(f).get('ipc_port', port)
+    except (OSError, ValueError, AttributeError):
+        pass
+    if port is None:
+        print("Audio switcher is already running (control endpoint disabled)")
+        return 1
+
+    commands = launch_commands(args) or ['show']
+    deadline = time.monotonic() + wait
+    while True:
+        try:
+            # Read on every attempt: a starting instance writes a new token
+            token = ipc.read_token(ipc.token_path(config_file))
+            responses = ipc.send(commands, port=port, token=token)
+            break
+        except OSError as e:
+            # The other instance may still be starting up
+            if time.monotonic() > deadline:
+                print(f"Audio switcher is already running but not answering on port {port}: {e}")
+                return 1
+            time.sleep(0.1)
+    for command, response in zip(commands, responses):
+        if not response.get('ok'):
+            print(f"{command}: {response.get('error')}")
+    return 0 if all(response.get('ok') for response in responses) else 1
+
+
+def apply_launch_commands(switcher, args):
+    """Run --switch/--toggle in the first instance"""
+    if args.switch:
+        switcher.request_switch(args.switch)
+    if args.toggle:
+        switcher.request_toggle()
 
 
 if __name__ == "__main__":
+    args = parse_args()
+    from single_instance import InstanceLock
+    instance_lock = InstanceLock()
+    if not instance_lock.acquire():
+        sys.exit(forward_to_running_instance(args))
+    if args.startup_profile:
+        startup.enable()
+    if args.trace:
+        import atexit
+        tracer.enable()
+        atexit.register(tracer.export, args.trace)
+    if args.daemon:
+        daemon = AudioSwitcherDaemon()
+        apply_launch_commands(daemon.switcher, args)
+        daemon.run()
+        sys.exit(0)
     try:
         app = AudioSwitcherGUI()
+        apply_launch_commands(app.switcher, args)
         app.run()
     except Exception as e:
         print(f"Error starting application: {e}")
@@ -0,0 +1,135 @@
+"""
+Concurrent asyncio callers sharing one switcher on the fake audio backend
+Starts one AsyncAudioSwitcher, warms it up, then runs --callers tasks that
+each call current / list_devices / switch / toggle --rounds times while a
+subscriber reads the default-change stream. Reports per-call latency, how
+late a 1 ms ticker on the same event loop woke up (loop_lag), and the backend
+calls made: enumeration and policy client creation happen once, however many
+callers there are.
+
+Usage:
+  python bench_async.py --callers 200 --rounds 20 --set-delay 0.001
+  python bench_async.py --output new.json --compare old.json
+"""
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+from async_switcher import AsyncAudioSwitcher
+from bench_utils import summarize, print_table, write_results, compare
+from fake_backend import FakeAudioBackend
+
+CALLS = ('current', 'list_devices', 'switch', 'toggle')
+
+
+async def caller(switcher, names, index, rounds, samples, failures):
+    for round_index in range(rounds):
+        for call in CALLS:
+            start = time.perf_counter()
+            if call == 'current':
+                await switcher.current()
+            elif call == 'list_devices':
+                await switcher.list_devices()
+            else:
+                if call == 'switch':
+                    result = await switcher.switch(names[(index + round_index) % len(names)])
+                else:
+                    result = await switcher.toggle()
+                if not result.ok:
+                    failures.append(result)
+            samples[call].append(time.perf_counter() - start)
+
+
+async def ticker(stop, lags):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(0.001)
+        lags.append(time.perf_counter() - start - 0.001)
+
+
+async def count_events(stream, received):
+    async for _ in stream:
+        received.append(time.perf_counter())
+
+
+async def run_async(endpoints, callers, rounds, delays):
+    config_dir = tempfile.mkdtemp(prefix='bench_async_')
+    backend = FakeAudioBackend(endpoint_count=endpoints, delays=delays)
+    samples = {call: [] for call in CALLS}
+    lags, received, failures = [], [], []
+
+    async with await AsyncAudioSwitcher.open(backend=backend,
+                                             config_file=os.path.join(config_dir, 'audio_config.json')) as switcher:
+        names = switcher.switcher.get_device_names()
+        switcher.switcher.device_a, switcher.switcher.device_b = names[0], names[1]
+        await switcher.warm_up()
+
+        events = switcher.default_events(backlog=callers * rounds * 4)
+        reader = asyncio.ensure_future(count_events(events, received))
+        stop = asyncio.Event()
+        tick = asyncio.ensure_future(ticker(stop, lags))
+
+        start = time.perf_counter()
+        await asyncio.gather(*(caller(switcher, names, index, rounds, samples, failures)
+                               for index in range(callers)))
+        elapsed = time.perf_counter() - start
+
+        stop.set()
+        await tick
+        # Let the last default changes reach the stream before it is closed
+        await asyncio.sleep(0.05)
+        events.close()
+        await reader
+        metrics = dict(switcher.switcher.metrics)
+
+    results = {call: summarize(values) for call, values in samples.items()}
+    results['loop_lag'] = summarize(lags)
+    summary = {
+        'calls': callers * rounds * len(CALLS),
+        'elapsed_s': round(elapsed, 3),
+        'calls_per_s': round(callers * rounds * len(CALLS) / elapsed),
+        'default_events': len(received),
+        'dropped_events': events.dropped,
+        # Requests a later switch replaced also come back with ok False
+        'failed_switches': len(failures) - metrics['superseded'],
+        'superseded': metrics['superseded'],
+    }
+    return results, summary, dict(backend.calls), metrics
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--endpoints', type=int, default=8, help='number of fake endpoints')
+    parser.add_argument('--callers', type=int, default=100, help='concurrent caller tasks')
+    parser.add_argument('--rounds', type=int, default=10, help='rounds of calls per caller')
+    parser.add_argument('--enumerate-delay', type=float, default=0.05, help='fake EnumAudioEndpoints delay (s)')
+    parser.add_argument('--set-delay', type=float, default=0.001, help='fake SetDefaultEndpoint delay (s)')
+    parser.add_argument('--create-delay', type=float, default=0.1, help='fake CoCreateInstance delay (s)')
+    parser.add_argument('--output', default='bench_async.json', help='result file (JSON)')
+    parser.add_argument('--compare', metavar='FILE', help='previous result file to compare against')
+    args = parser.parse_args()
+
+    delays = {
+        'enumerate_devices': args.enumerate_delay,
+        'set_default_endpoint': args.set_delay,
+        'create_policy_client': args.create_delay,
+    }
+    results, summary, calls, metrics = asyncio.run(run_async(args.endpoints, args.callers, args.rounds, delays))
+    print_table(results, f"asyncio callers, {args.callers} callers x {args.rounds} rounds, {args.endpoints} endpoints")
+    print(f"Summary: {summary}")
+    print(f"Backend calls: enumerate_devices={calls.get('enumerate_devices', 0)} "
+          f"create_policy_client={calls.get('create_policy_client', 0)} "
+          f"set_default_endpoint={calls.get('set_default_endpoint', 0)}")
+    print(f"Switch queue: {metrics}")
+    config = dict(vars(args), delays=delays, summary=summary, backend_calls=calls, switch_metrics=metrics)
+    write_results(args.output, 'async', config, results)
+    print(f"Results written to {args.output}")
+    if args.compare:
+        compare(args.compare, results)
+
+
+if __name__ == '__main__':
+    main()
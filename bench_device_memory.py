@@ -0,0 +1,155 @@
+"""
+Memory and COM references kept per endpoint by the device registry
+Builds the registry the old way (every endpoint read with its full property
+store, the device object kept in each entry) and the current way (active
+outputs only, DeviceRecord tuples) and reports the retained Python memory per
+listed device and how many COM objects are still referenced afterwards.
+
+Runs on the fake backend, whose FakeComObject counts live references. With
+--real on Windows it uses Core Audio and counts live comtypes pointers.
+
+Usage:
+  python bench_device_memory.py --active 8 --stale 0 100 500
+  python bench_device_memory.py --real
+"""
+
+import argparse
+import gc
+import threading
+import tracemalloc
+
+from audio_backend import is_output_endpoint
+from bench_utils import write_results, compare
+from device_registry import DeviceRegistry
+
+
+def measure(build, count_com):
+    """(retained bytes, live COM objects, registry) for a registry built by build()"""
+    gc.collect()
+    com_before = count_com()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        registry = build()
+        gc.collect()
+        retained = tracemalloc.get_traced_memory()[0] - before
+    finally:
+        tracemalloc.stop()
+    return retained, count_com() - com_before, registry
+
+
+class LegacyEntry(dict):
+    """The old registry entry: a dict keeping the device object, with the
+    id/name attributes DeviceRegistry needs"""
+
+    @property
+    def id(self):
+        return self['id']
+
+    @property
+    def name(self):
+        return self['name']
+
+
+def run_fake(active, stale):
+    from fake_backend import FakeAudioBackend, FakeComObject
+
+    backend = FakeAudioBackend(endpoint_count=active)
+    backend.add_stale_endpoints(stale)
+    outcome = {}
+
+    def body():
+        backend.initialize()
+        try:
+            def legacy():
+                return DeviceRegistry(LegacyEntry(d) for d in backend.get_all_devices()
+                                      if is_output_endpoint(d['flow'], d['state'], d['form_factor']))
+
+            def compact():
+                return DeviceRegistry(backend.enumerate_devices())
+
+            outcome['legacy'] = measure(legacy, lambda: FakeComObject.live)
+            outcome['compact'] = measure(compact, lambda: FakeComObject.live)
+        finally:
+            backend.uninitialize()
+
+    thread = threading.Thread(target=body)
+    thread.start()
+    thread.join()
+    return outcome
+
+
+def run_real():
+    import comtypes
+    from audio_backend import CoreAudioBackend
+
+    def count_com():
+        return sum(1 for o in gc.get_objects() if isinstance(o, comtypes._compointer_base))
+
+    backend = CoreAudioBackend()
+    outcome = {}
+
+    def body():
+        backend.initialize()
+        try:
+            from pycaw.utils import AudioUtilities
+
+            def legacy():
+                # The old load_devices kept pycaw's AudioDevice in every entry
+                return DeviceRegistry(LegacyEntry(id=d.id, name=d.FriendlyName, device=d)
+                                      for d in AudioUtilities.GetAllDevices() if d.FriendlyName)
+
+            def compact():
+                return DeviceRegistry(backend.enumerate_devices())
+
+            outcome['legacy'] = measure(legacy, count_com)
+            outcome['compact'] = measure(compact, count_com)
+        finally:
+            backend.uninitialize()
+
+    thread = threading.Thread(target=body)
+    thread.start()
+    thread.join()
+    return outcome
+
+
+def report(title, outcome):
+    results = {}
+    print(title)
+    print(f"  {'registry':<10}{'devices':>9}{'retained KB':>14}{'bytes/device':>14}{'live COM':>10}")
+    for name, (retained, live, registry) in outcome.items():
+        per_device = retained / len(registry) if len(registry) else 0
+        print(f"  {name:<10}{len(registry):>9}{retained / 1024:>14.1f}{per_device:>14.0f}{live:>10}")
+        results[name] = {'devices': len(registry), 'retained_bytes': retained,
+                         'bytes_per_device': per_device, 'live_com_objects': live}
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--active', type=int, default=8, help='active render endpoints (fake backend)')
+    parser.add_argument('--stale', type=int, nargs='+', default=[0, 100, 500],
+                        help='stale/capture endpoints to add, one run per value (fake backend)')
+    parser.add_argument('--real', action='store_true', help='measure Core Audio instead (Windows only)')
+    parser.add_argument('--output', default='bench_device_memory.json', help='result file (JSON)')
+    parser.add_argument('--compare', metavar='FILE', help='previous result file to compare against')
+    args = parser.parse_args()
+
+    results = {}
+    if args.real:
+        for name, summary in report("Core Audio endpoints", run_real()).items():
+            results[f"real_{name}"] = summary
+    else:
+        for stale in args.stale:
+            outcome = run_fake(args.active, stale)
+            for name, summary in report(f"{args.active} active + {stale} stale fake endpoints", outcome).items():
+                results[f"{stale}_stale_{name}"] = summary
+
+    write_results(args.output, 'device_memory', vars(args), results)
+    print(f"Results written to {args.output}")
+    if args.compare:
+        compare(args.compare, results, metric='bytes_per_device')
+
+
+if __name__ == '__main__':
+    main()
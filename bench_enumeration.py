@@ -0,0 +1,98 @@
+"""
+Device enumeration cost with many stale endpoints
+Compares the source-filtered enumeration (EnumAudioEndpoints for active
+render endpoints, two properties per survivor) against reading every
+endpoint's full property store and filtering afterwards, the way
+AudioUtilities.GetAllDevices is used. Runs on the fake backend, which keeps
+capture, disabled, unplugged and not-present endpoints next to the outputs.
+
+Usage:
+  python bench_enumeration.py --active 6 --stale 50 300 --read-delay 0.00002
+  python bench_enumeration.py --output new.json --compare old.json
+"""
+
+import argparse
+import threading
+import time
+
+from audio_backend import is_output_endpoint
+from bench_utils import summarize, print_table, write_results, compare
+from fake_backend import FakeAudioBackend
+
+
+def enumerate_all(backend):
+    """Full read of every endpoint, then filter"""
+    return [d for d in backend.get_all_devices()
+            if is_output_endpoint(d['flow'], d['state'], d['form_factor'])]
+
+
+def measure(backend, enumerate_fn, rounds):
+    samples = []
+    backend.calls.clear()
+    for _ in range(rounds):
+        start = time.perf_counter()
+        devices = enumerate_fn()
+        samples.append(time.perf_counter() - start)
+    reads = backend.calls['read_property'] // rounds
+    return samples, devices, reads
+
+
+def run(active, stale, rounds, delays):
+    backend = FakeAudioBackend(endpoint_count=active, delays=delays)
+    backend.add_stale_endpoints(stale)
+    outcome = {}
+
+    def body():
+        backend.initialize()
+        try:
+            outcome['filtered'] = measure(backend, backend.enumerate_devices, rounds)
+            outcome['all'] = measure(backend, lambda: enumerate_all(backend), rounds)
+        finally:
+            backend.uninitialize()
+
+    # The fake backend insists on being called from its apartment thread
+    thread = threading.Thread(target=body)
+    thread.start()
+    thread.join()
+
+    filtered_samples, filtered_devices, filtered_reads = outcome['filtered']
+    all_samples, all_devices, all_reads = outcome['all']
+    if [d.id for d in filtered_devices] != [d['id'] for d in all_devices]:
+        print("  warning: the two strategies listed different devices")
+    results = {
+        'filtered': dict(summarize(filtered_samples), property_reads=filtered_reads),
+        'get_all_devices': dict(summarize(all_samples), property_reads=all_reads),
+    }
+    return results, len(filtered_devices)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--active', type=int, default=6, help='active render endpoints')
+    parser.add_argument('--stale', type=int, nargs='+', default=[0, 50, 300],
+                        help='stale/capture endpoints to add, one run per value')
+    parser.add_argument('--rounds', type=int, default=50, help='enumerations per strategy')
+    parser.add_argument('--read-delay', type=float, default=0.00002, help='fake property read delay (s)')
+    parser.add_argument('--open-delay', type=float, default=0.00005, help='fake OpenPropertyStore delay (s)')
+    parser.add_argument('--output', default='bench_enumeration.json', help='result file (JSON)')
+    parser.add_argument('--compare', metavar='FILE', help='previous result file to compare against')
+    args = parser.parse_args()
+
+    delays = {'read_property': args.read_delay, 'open_property_store': args.open_delay}
+    results = {}
+    for stale in args.stale:
+        run_results, listed = run(args.active, stale, args.rounds, delays)
+        print_table(run_results, f"Enumeration, {args.active} active + {stale} stale endpoints "
+                                 f"({listed} listed)")
+        for strategy, summary in run_results.items():
+            print(f"  {strategy}: {summary['property_reads']} property reads")
+            results[f"{stale}_stale_{strategy}"] = summary
+
+    write_results(args.output, 'enumeration', dict(vars(args), delays=delays), results)
+    print(f"Results written to {args.output}")
+    if args.compare:
+        compare(args.compare, results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,153 @@
+"""
+Per-keystroke cost of hotkey dispatch at 1, 50 and 500 bindings
+Feeds a synthetic keystroke stream through HotkeyEngine.on_event and through
+a linear matcher that checks every binding on every event, the way one
+keyboard.add_hotkey handler per binding does.
+
+Usage:
+  python bench_hotkeys.py --events 200000 --bindings 1 50 500
+"""
+
+import argparse
+import random
+import time
+from types import SimpleNamespace
+
+from bench_utils import write_results, compare
+from hotkey_engine import HotkeyEngine
+
+SYNTHETIC_MODIFIERS = {
+    'ctrl': (29,), 'left ctrl': (29,), 'right ctrl': (157,),
+    'shift': (42, 54), 'left shift': (42,), 'right shift': (54,),
+    'alt': (56,), 'left alt': (56,), 'right alt': (184,), 'alt gr': (184,),
+    'windows': (91, 92), 'left windows': (91,), 'right windows': (92,),
+}
+MODIFIER_COMBOS = ['ctrl', 'alt', 'ctrl+shift', 'ctrl+alt', 'alt+shift', 'ctrl+alt+shift',
+                   'windows', 'windows+shift', 'windows+ctrl', 'windows+alt']
+KEY_CODES = [code for code in range(2, 58) if code not in (29, 42, 54, 56)]
+
+
+def synthetic_resolver(name):
+    if name in SYNTHETIC_MODIFIERS:
+        return SYNTHETIC_MODIFIERS[name]
+    raise ValueError(f"Unknown key {name}")
+
+
+class NullSource:
+    def hook(self, callback):
+        return callback
+
+    def unhook(self, handle):
+        pass
+
+
+def make_hotkeys(count):
+    hotkeys = []
+    for combo in MODIFIER_COMBOS:
+        for code in KEY_CODES:
+            hotkeys.append(f"{combo}+sc{code}")
+    if count > len(hotkeys):
+        raise ValueError(f"At most {len(hotkeys)} synthetic bindings")
+    return hotkeys[:count]
+
+
+def make_events(count, seed=1):
+    """Mostly plain typing with the occasional modifier chord"""
+    rng = random.Random(seed)
+    events = []
+    while len(events) < count:
+        modifiers = []
+        if rng.random() < 0.2:
+            modifiers = rng.choice([(29,), (56,), (29, 42), (29, 56), (91,)])
+        key = rng.choice(KEY_CODES)
+        for code in modifiers:
+            events.append(SimpleNamespace(event_type='down', scan_code=code))
+        events.append(SimpleNamespace(event_type='down', scan_code=key))
+        events.append(SimpleNamespace(event_type='up', scan_code=key))
+        for code in reversed(modifiers):
+            events.append(SimpleNamespace(event_type='up', scan_code=code))
+    return events
+
+
+class LinearMatcher:
+    """Checks the pressed key set against every binding on every event"""
+
+    def __init__(self, engine):
+        self.pressed = set()
+        self.bindings = []
+        modifier_codes = {}
+        for name, codes in SYNTHETIC_MODIFIERS.items():
+            for code in codes:
+                modifier_codes.setdefault(name.split()[-1] if name != 'alt gr' else 'alt', set()).add(code)
+        for binding in engine.bindings:
+            tokens = binding.hotkey.split('+')
+            groups = [frozenset(modifier_codes[t]) for t in tokens[:-1]]
+            groups.append(frozenset([int(tokens[-1][2:])]))
+            self.bindings.append((groups, binding.callback))
+
+    def on_event(self, event):
+        if event.event_type == 'down':
+            self.pressed.add(event.scan_code)
+        else:
+            self.pressed.discard(event.scan_code)
+            return
+        for groups, callback in self.bindings:
+            if len(groups) != len(self.pressed):
+                continue
+            if all(self.pressed & group for group in groups):
+                callback()
+
+
+def measure(handler, events, rounds=3):
+    best = None
+    for _ in range(rounds):
+        start = time.perf_counter_ns()
+        for event in events:
+            handler(event)
+        elapsed = time.perf_counter_ns() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best / len(events)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--events', type=int, default=100000, help='synthetic key events per run')
+    parser.add_argument('--bindings', type=int, nargs='+', default=[1, 50, 500])
+    parser.add_argument('--output', default='bench_hotkeys.json', help='result file (JSON)')
+    parser.add_argument('--compare', metavar='FILE', help='previous result file to compare against')
+    args = parser.parse_args()
+
+    events = make_events(args.events)
+    results = {}
+    print(f"{'bindings':>9}{'engine ns/event':>18}{'linear ns/event':>18}{'fired':>8}")
+    for count in args.bindings:
+        fired = [0]
+
+        def callback():
+            fired[0] += 1
+
+        engine = HotkeyEngine(resolver=synthetic_resolver, source=NullSource())
+        for hotkey in make_hotkeys(count):
+            engine.add(hotkey, callback)
+        linear = LinearMatcher(engine)
+
+        engine_ns = measure(engine.on_event, events)
+        engine_fired = fired[0]
+        fired[0] = 0
+        linear_ns = measure(linear.on_event, events)
+        if fired[0] != engine_fired:
+            print(f"  warning: engine fired {engine_fired} times, linear matcher {fired[0]}")
+        results[f"{count}_bindings"] = {
+            'engine_ns_per_event': engine_ns,
+            'linear_ns_per_event': linear_ns,
+        }
+        print(f"{count:>9}{engine_ns:>18.1f}{linear_ns:>18.1f}{engine_fired:>8}")
+
+    write_results(args.output, 'hotkeys', vars(args), results)
+    print(f"Results written to {args.output}")
+    if args.compare:
+        compare(args.compare, results, metric='engine_ns_per_event')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+"""
+Round-trip latency of the local control endpoint on the fake backend
+Compares a switch through a running instance (ipc.py) against the cold path
+external scripts used to take: a fresh process-like AudioSwitcher that
+enumerates devices and creates the policy client for every switch. Also
+measures pipelined requests on one connection.
+
+Usage:
+  python bench_ipc.py --requests 300 --enumerate-delay 0.05 --create-delay 0.1
+  python bench_ipc.py --output new.json --compare old.json
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from bench_utils import summarize, print_table, write_results, compare
+from fake_backend import FakeAudioBackend
+from ipc import IpcClient
+
+
+def run(endpoints, requests, cold_runs, delays):
+    from audio_switcher import AudioSwitcher
+
+    config_dir = tempfile.mkdtemp(prefix='bench_ipc_')
+    config_file = os.path.join(config_dir, 'audio_config.json')
+    switcher = AudioSwitcher(backend=FakeAudioBackend(endpoint_count=endpoints, delays=delays),
+                             config_file=config_file)
+    switcher.ipc_port = 0
+    server = switcher.start_ipc_server()
+    names = switcher.get_device_names()
+    switcher.device_a, switcher.device_b = names[0], names[1]
+    port = server.address[1]
+    samples = {'current': [], 'switch': [], 'toggle': [], 'pipelined_per_request': []}
+
+    with IpcClient(port=port, token=server.token) as client:
+        client.request('ping')
+        for index in range(requests):
+            start = time.perf_counter()
+            client.request('current')
+            samples['current'].append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            response = client.request(f"switch {names[index % 2]}")
+            samples['switch'].append(time.perf_counter() - start)
+            if not response['ok']:
+                print(f"  switch failed: {response}")
+
+            start = time.perf_counter()
+            client.request('toggle')
+            samples['toggle'].append(time.perf_counter() - start)
+
+        batch = ['toggle', 'current'] * 10
+        for _ in range(max(1, requests // 10)):
+            start = time.perf_counter()
+            client.pipeline(batch)
+            samples['pipelined_per_request'].append((time.perf_counter() - start) / len(batch))
+    metrics = dict(switcher.metrics)
+    switcher.close()
+
+    # Cold path: new instance per switch, as a spawned script would do
+    samples['cold_switch'] = []
+    for index in range(cold_runs):
+        start = time.perf_counter()
+        cold = AudioSwitcher(backend=FakeAudioBackend(endpoint_count=endpoints, delays=delays),
+                             config_file=config_file, snapshot_file=os.path.join(config_dir, 'cold.json'))
+        cold.switch_to_device(names[index % 2])
+        cold.close()
+        os.remove(os.path.join(config_dir, 'cold.json'))
+        samples['cold_switch'].append(time.perf_counter() - start)
+
+    return {name: summarize(values) for name, values in samples.items()}, metrics
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--endpoints', type=int, default=8, help='number of fake endpoints')
+    parser.add_argument('--requests', type=int, default=200, help='requests per command')
+    parser.add_argument('--cold-runs', type=int, default=10, help='switches through a fresh instance')
+    parser.add_argument('--enumerate-delay', type=float, default=0.05, help='fake EnumAudioEndpoints delay (s)')
+    parser.add_argument('--set-delay', type=float, default=0.001, help='fake SetDefaultEndpoint delay (s)')
+    parser.add_argument('--create-delay', type=float, default=0.1, help='fake CoCreateInstance delay (s)')
+    parser.add_argument('--output', default='bench_ipc.json', help='result file (JSON)')
+    parser.add_argument('--compare', metavar='FILE', help='previous result file to compare against')
+    args = parser.parse_args()
+
+    delays = {
+        'enumerate_devices': args.enumerate_delay,
+        'set_default_endpoint': args.set_delay,
+        'create_policy_client': args.create_delay,
+    }
+    results, metrics = run(args.endpoints, args.requests, args.cold_runs, delays)
+    print_table(results, f"Control endpoint round trips, {args.endpoints} endpoints")
+    print(f"Switch queue: {metrics}")
+    write_results(args.output, 'ipc', dict(vars(args), delays=delays, switch_metrics=metrics), results)
+    print(f"Results written to {args.output}")
+    if args.compare:
+        compare(args.compare, results)
+
+
+if __name__ == '__main__':
+    main()
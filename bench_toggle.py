@@ -0,0 +1,146 @@
+"""
+End-to-end toggle latency benchmark on the fake audio backend
+Drives the hotkey -> toggle -> SetDefaultEndpoint -> label update path of
+AudioSwitcher without Core Audio and reports p50/p95/p99 per stage:
+
+  hook        time spent inside the hotkey callback
+  queue_wait  hotkey callback returning -> COM worker starting the switch
+  com_call    the switch on the COM worker: one SetDefaultEndpoint per role
+  com_per_role  com_call divided by the roles set; IPolicyConfig has no
+              multi-role call, so com_call grows with the role count
+  ui_update   switch finished -> current device label updated
+  total       key press -> label updated
+
+first_press is the total of the first press alone. The switcher is warmed
+up first, as the app does at idle after startup, unless --no-warm-up is given.
+
+Usage:
+  python bench_toggle.py --endpoints 32 --presses 500 --set-delay 0.002
+  python bench_toggle.py --output new.json --compare old.json
+"""
+
+import argparse
+import os
+import queue
+import tempfile
+import threading
+import time
+
+from bench_utils import summarize, print_table, write_results, compare
+from fake_backend import FakeAudioBackend
+
+STAGES = ('hook', 'queue_wait', 'com_call', 'com_per_role', 'ui_update', 'total')
+
+
+class FakeTkLoop:
+    """Single thread standing in for the Tk main loop and root.after(0, ...)"""
+
+    def __init__(self):
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def after(self, ms, fn, *args):
+        self._queue.put((fn, args))
+
+    def _run(self):
+        while True:
+            fn, args = self._queue.get()
+            if fn is None:
+                break
+            fn(*args)
+
+    def stop(self):
+        self._queue.put((None, ()))
+        self._thread.join()
+
+
+def run(endpoints, presses, interval, delays, warm_up=True):
+    from audio_switcher import AudioSwitcher
+
+    config_dir = tempfile.mkdtemp(prefix='bench_toggle_')
+    backend = FakeAudioBackend(endpoint_count=endpoints, delays=delays)
+    switcher = AudioSwitcher(backend=backend, config_file=os.path.join(config_dir, 'audio_config.json'))
+    names = switcher.get_device_names()
+    switcher.device_a, switcher.device_b = names[0], names[1]
+    if warm_up:
+        switcher.warm_up().result()
+
+    ui = FakeTkLoop()
+    samples = {stage: [] for stage in STAGES}
+    first = []
+    done = threading.Semaphore(0)
+
+    def show_switch_result(press, result):
+        # Mirrors AudioSwitcherGUI.show_switch_result
+        label = switcher.current_device_label()
+        updated = time.perf_counter()
+        press['recorded'].wait()
+        timings = press['future'].timings
+        if result.ok and label == result.target:
+            samples['hook'].append(press['hook_returned'] - press['pressed'])
+            samples['queue_wait'].append(timings['started'] - press['hook_returned'])
+            samples['com_call'].append(timings['finished'] - timings['started'])
+            samples['com_per_role'].append((timings['finished'] - timings['started']) / max(len(result.roles or ()), 1))
+            samples['ui_update'].append(updated - timings['finished'])
+            samples['total'].append(updated - press['pressed'])
+            if press['index'] == 0:
+                first.append(updated - press['pressed'])
+        done.release()
+
+    for index in range(presses):
+        press = {'index': index, 'recorded': threading.Event(), 'pressed': time.perf_counter()}
+        # The hotkey callback is switcher.request_toggle itself. Presses that
+        # were coalesced carry their batch's timings; each one is measured
+        # until that batch's result reaches the UI.
+        press['future'] = switcher.request_toggle()
+        press['hook_returned'] = time.perf_counter()
+        press['recorded'].set()
+        press['future'].add_done_callback(
+            lambda future, press=press: ui.after(0, show_switch_result, press, future.result()))
+        if interval:
+            time.sleep(interval)
+        else:
+            done.acquire()
+    if interval:
+        for _ in range(presses):
+            done.acquire()
+
+    ui.stop()
+    switcher.close()
+    results = {stage: summarize(values) for stage, values in samples.items()}
+    results['first_press'] = summarize(first)
+    return results, dict(backend.calls), dict(switcher.metrics)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--endpoints', type=int, default=8, help='number of fake endpoints')
+    parser.add_argument('--presses', type=int, default=300, help='number of simulated hotkey presses')
+    parser.add_argument('--interval', type=float, default=0.0,
+                        help='seconds between presses (0 = wait for each switch to finish)')
+    parser.add_argument('--enumerate-delay', type=float, default=0.0, help='fake EnumAudioEndpoints delay (s)')
+    parser.add_argument('--set-delay', type=float, default=0.001, help='fake SetDefaultEndpoint delay (s)')
+    parser.add_argument('--create-delay', type=float, default=0.0, help='fake CoCreateInstance delay (s)')
+    parser.add_argument('--no-warm-up', action='store_true', help='skip the idle warm-up before the first press')
+    parser.add_argument('--output', default='bench_toggle.json', help='result file (JSON)')
+    parser.add_argument('--compare', metavar='FILE', help='previous result file to compare against')
+    args = parser.parse_args()
+
+    delays = {
+        'enumerate_devices': args.enumerate_delay,
+        'set_default_endpoint': args.set_delay,
+        'create_policy_client': args.create_delay,
+    }
+    results, calls, metrics = run(args.endpoints, args.presses, args.interval, delays, not args.no_warm_up)
+    print_table(results, f"Toggle latency, {args.endpoints} endpoints, {args.presses} presses")
+    print(f"Switch queue: {metrics}")
+    config = dict(vars(args), delays=delays, backend_calls=calls, switch_metrics=metrics)
+    write_results(args.output, 'toggle', config, results)
+    print(f"Results written to {args.output}")
+    if args.compare:
+        compare(args.compare, results)
+
+
+if __name__ == '__main__':
+    main()
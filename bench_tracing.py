@@ -0,0 +1,103 @@
+"""
+Cost of the tracing spans, disabled and enabled
+Times a tight loop around a trivial function bare, behind a tracer.enabled
+check, inside a disabled span and inside an enabled span, then runs the fake-backend toggle benchmark with
+tracing off and on and exports the recorded spans as Chrome trace JSON.
+
+Usage:
+  python bench_tracing.py --iterations 1000000
+  python bench_tracing.py --trace-file toggle_trace.json
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from bench_utils import write_results, compare
+from tracing import Tracer, tracer
+
+
+def work():
+    return None
+
+
+def loop_bare(iterations):
+    start = time.perf_counter_ns()
+    for _ in range(iterations):
+        work()
+    return (time.perf_counter_ns() - start) / iterations
+
+
+def loop_guarded(tracer, iterations):
+    start = time.perf_counter_ns()
+    for _ in range(iterations):
+        if tracer.enabled:
+            tracer.instant('bench.work')
+        work()
+    return (time.perf_counter_ns() - start) / iterations
+
+
+def loop_span(tracer, iterations):
+    start = time.perf_counter_ns()
+    for _ in range(iterations):
+        with tracer.span('bench.work', n=1):
+            work()
+    return (time.perf_counter_ns() - start) / iterations
+
+
+def best(fn, *args, rounds=5):
+    return min(fn(*args) for _ in range(rounds))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--iterations', type=int, default=500000, help='loop iterations per round')
+    parser.add_argument('--presses', type=int, default=200, help='toggles in the end-to-end run')
+    parser.add_argument('--trace-file', default=None, help='where to export the toggle trace')
+    parser.add_argument('--output', default='bench_tracing.json', help='result file (JSON)')
+    parser.add_argument('--compare', metavar='FILE', help='previous result file to compare against')
+    args = parser.parse_args()
+
+    local = Tracer(capacity=1000)
+    bare = best(loop_bare, args.iterations)
+    guarded = best(loop_guarded, local, args.iterations)
+    disabled = best(loop_span, local, args.iterations)
+    local.enable()
+    enabled = best(loop_span, local, args.iterations)
+    print(f"{'bare call':<22}{bare:>10.1f} ns")
+    print(f"{'enabled check':<22}{guarded:>10.1f} ns  (+{guarded - bare:.1f} ns)")
+    print(f"{'disabled span':<22}{disabled:>10.1f} ns  (+{disabled - bare:.1f} ns)")
+    print(f"{'enabled span':<22}{enabled:>10.1f} ns  (+{enabled - bare:.1f} ns)")
+
+    from bench_toggle import run as run_toggle
+    delays = {'set_default_endpoint': 0.001}
+    off, _, _ = run_toggle(8, args.presses, 0.0, delays)
+    tracer.enable()
+    on, _, _ = run_toggle(8, args.presses, 0.0, delays)
+    tracer.disable()
+    trace_file = args.trace_file or os.path.join(tempfile.mkdtemp(prefix='bench_tracing_'), 'trace.json')
+    spans = tracer.export(trace_file)
+    print(f"toggle total p50: {off['total']['p50_ms']:.3f} ms untraced, {on['total']['p50_ms']:.3f} ms traced")
+    print(f"{spans} spans exported to {trace_file} ({os.path.getsize(trace_file)} bytes)")
+
+    results = {
+        'span': {
+            'bare_ns': bare,
+            'guarded_ns': guarded,
+            'disabled_ns': disabled,
+            'enabled_ns': enabled,
+            'disabled_overhead_ns': disabled - bare,
+            'enabled_overhead_ns': enabled - bare,
+        },
+        'toggle_untraced': off['total'],
+        'toggle_traced': on['total'],
+    }
+    write_results(args.output, 'tracing', vars(args), results)
+    print(f"Results written to {args.output}")
+    if args.compare:
+        compare(args.compare, results, metric='disabled_overhead_ns')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""
+Helpers shared by the bench_*.py scripts
+Percentile summaries, machine-readable result files and comparison against
+a previous run.
+"""
+
+import json
+import os
+import platform
+import subprocess
+import time
+
+
+def percentile(sorted_samples, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_samples:
+        return None
+    rank = max(1, int(round(pct / 100.0 * len(sorted_samples))))
+    return sorted_samples[min(rank, len(sorted_samples)) - 1]
+
+
+def summarize(samples):
+    """p50/p95/p99/mean/max of a list of seconds, reported in milliseconds"""
+    ordered = sorted(samples)
+    if not ordered:
+        return {'n': 0}
+    ms = 1000.0
+    return {
+        'n': len(ordered),
+        'p50_ms': percentile(ordered, 50) * ms,
+        'p95_ms': percentile(ordered, 95) * ms,
+        'p99_ms': percentile(ordered, 99) * ms,
+        'mean_ms': sum(ordered) / len(ordered) * ms,
+        'max_ms': ordered[-1] * ms,
+    }
+
+
+def git_revision():
+    """Current commit hash, or None outside a git checkout"""
+    try:
+        out = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'],
+                             capture_output=True, text=True, timeout=5,
+                             cwd=os.path.dirname(os.path.abspath(__file__)))
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return out.stdout.strip() or None
+
+
+def write_results(path, benchmark, config, results):
+    """Write a JSON result file that later runs can be compared against"""
+    document = {
+        'benchmark': benchmark,
+        'revision': git_revision(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'config': config,
+        'results': results,
+    }
+    with open(path, 'w') as f:
+        json.dump(document, f, indent=4)
+    return document
+
+
+def print_table(results, title=None):
+    """Print {name: summary} as a fixed-width table"""
+    if title:
+        print(title)
+    print(f"  {'stage':<22}{'n':>7}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for name, summary in results.items():
+        if not summary.get('n'):
+            continue
+        print(f"  {name:<22}{summary['n']:>7}{summary['p50_ms']:>10.3f}"
+              f"{summary['p95_ms']:>10.3f}{summary['p99_ms']:>10.3f}{summary['max_ms']:>10.3f}")
+
+
+def compare(baseline_path, results, metric='p95_ms'):
+    """Print the change of metric for each stage against a previous result file"""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    print(f"Compared with {baseline_path} (revision {baseline.get('revision')}), {metric}:")
+    for name, summary in results.items():
+        old = baseline['results'].get(name, {}).get(metric)
+        new = summary.get(metric)
+        if old is None or new is None:
+            continue
+        change = (new - old) / old * 100 if old else 0.0
+        print(f"  {name:<22}{old:>10.3f} -> {new:>10.3f}  ({change:+.1f}%)")
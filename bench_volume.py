@@ -0,0 +1,123 @@
+"""
+Volume hotkey cost on the fake audio backend
+Simulates a volume key held down with keyboard auto-repeat, --holds times,
+through two paths:
+
+  naive  every repeat activates IAudioEndpointVolume again, reads the level
+         and sets it (what a per-press Activate costs)
+  ramp   every repeat goes to AudioSwitcher.request_volume, which moves the
+         target of one fade on a cached interface
+
+For each path it reports the time spent in the hotkey callback (hook), the
+time from the last repeat until the volume reached its final level (settle)
+and the backend calls made per second of holding. The ramp's settle time is
+mostly the fade itself (volume_ramp.RAMP_DURATION).
+
+Usage:
+  python bench_volume.py --holds 5 --hold-time 1.0 --repeat-rate 30
+  python bench_volume.py --output new.json --compare old.json
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from bench_utils import summarize, print_table, write_results, compare
+from fake_backend import FakeAudioBackend
+
+VOLUME_CALLS = ('activate_endpoint_volume', 'get_volume', 'set_master_volume')
+
+
+def hold(press, presses, interval):
+    """Call press() presses times, interval seconds apart; returns the hook times"""
+    hook = []
+    for _ in range(presses):
+        start = time.perf_counter()
+        press()
+        hook.append(time.perf_counter() - start)
+        time.sleep(interval)
+    return hook
+
+
+def run(holds, hold_time, repeat_rate, step, delays):
+    from audio_switcher import AudioSwitcher
+
+    config_dir = tempfile.mkdtemp(prefix='bench_volume_')
+    backend = FakeAudioBackend(delays=delays)
+    switcher = AudioSwitcher(backend=backend, config_file=os.path.join(config_dir, 'audio_config.json'))
+    device_id = switcher.default_ids[0]
+    presses = max(1, int(hold_time * repeat_rate))
+    interval = 1.0 / repeat_rate
+    samples = {'naive_hook': [], 'naive_settle': [], 'ramp_hook': [], 'ramp_settle': []}
+    calls = {}
+
+    def naive_step(delta):
+        backend.release_volume(device_id)
+        level, _ = backend.get_volume(device_id)
+        backend.set_volume(device_id, min(max(level + delta, 0.0), 1.0))
+
+    for mode in ('naive', 'ramp'):
+        # Each path starts without a cached volume interface
+        switcher.worker.call(backend.release_volume)
+        before = {name: backend.calls[name] for name in VOLUME_CALLS}
+        held = 0.0
+        for index in range(holds):
+            # Alternate up and down so the level never sticks at 0 or 100
+            delta = step if index % 2 == 0 else -step
+            futures = []
+            start = time.perf_counter()
+            if mode == 'naive':
+                hook = hold(lambda: futures.append(switcher.worker.submit(naive_step, delta / 100.0)),
+                            presses, interval)
+                released = time.perf_counter()
+                futures[-1].result()
+            else:
+                hook = hold(lambda: switcher.request_volume(delta), presses, interval)
+                released = time.perf_counter()
+                while switcher.volume_ramp.active():
+                    time.sleep(0.001)
+            settled = time.perf_counter()
+            held += released - start
+            samples[f'{mode}_hook'].extend(hook)
+            samples[f'{mode}_settle'].append(settled - released)
+        calls[mode] = {name: backend.calls[name] - before[name] for name in VOLUME_CALLS}
+        calls[mode]['per_second'] = round(sum(calls[mode].values()) / held, 1)
+
+    metrics = dict(switcher.volume_ramp.metrics)
+    switcher.close()
+    return {name: summarize(values) for name, values in samples.items()}, calls, metrics
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--holds', type=int, default=4, help='number of simulated key holds per path')
+    parser.add_argument('--hold-time', type=float, default=1.0, help='seconds each key is held')
+    parser.add_argument('--repeat-rate', type=float, default=30.0, help='auto-repeats per second')
+    parser.add_argument('--step', type=float, default=2.0, help='volume step per repeat (percent)')
+    parser.add_argument('--activate-delay', type=float, default=0.002, help='fake Activate delay (s)')
+    parser.add_argument('--volume-delay', type=float, default=0.0005,
+                        help='fake get/set master volume delay (s)')
+    parser.add_argument('--output', default='bench_volume.json', help='result file (JSON)')
+    parser.add_argument('--compare', metavar='FILE', help='previous result file to compare against')
+    args = parser.parse_args()
+
+    delays = {
+        'activate_endpoint_volume': args.activate_delay,
+        'get_volume': args.volume_delay,
+        'set_master_volume': args.volume_delay,
+    }
+    results, calls, metrics = run(args.holds, args.hold_time, args.repeat_rate, args.step, delays)
+    print_table(results, f"Volume key held {args.hold_time}s at {args.repeat_rate:g} repeats/s, {args.holds} holds")
+    for mode, counts in calls.items():
+        print(f"{mode:6} backend calls: {counts}")
+    print(f"Ramp: {metrics}")
+    config = dict(vars(args), delays=delays, backend_calls=calls, ramp_metrics=metrics)
+    write_results(args.output, 'volume', config, results)
+    print(f"Results written to {args.output}")
+    if args.compare:
+        compare(args.compare, results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+"""
+COM worker thread for AudioSwitcher
+A single long-lived thread enters the COM apartment once, owns every COM
+object created by the backend and executes queued requests in order.
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from tracing import tracer
+
+
+class ComWorker:
+    """Long-lived thread that owns the COM apartment and runs backend calls"""
+
+    def __init__(self, backend, name="AudioSwitcherCOM"):
+        self.backend = backend
+        self.name = name
+        self._queue = queue.Queue()
+        self._thread = None
+        self._ready = threading.Event()
+        self._init_error = None
+
+    def start(self):
+        """Start the worker thread and wait until the apartment is ready"""
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+        self._ready.wait()
+        if self._init_error is not None:
+            raise self._init_error
+
+    def stop(self, timeout=5):
+        """Drain the queue, release COM objects and leave the apartment"""
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        if not self.on_worker_thread():
+            self._thread.join(timeout)
+        self._thread = None
+
+    def is_running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def on_worker_thread(self):
+        return threading.current_thread() is self._thread
+
+    def submit(self, fn, *args, **kwargs):
+        """Queue fn(*args, **kwargs) for the worker thread and return a Future
+
+        The future carries a ``timings`` dict with perf_counter timestamps for
+        'queued', 'started' and 'finished'.
+        """
+        future = Future()
+        future.timings = {'queued': time.perf_counter()}
+        self._queue.put((future, fn, args, kwargs))
+        return future
+
+    def call(self, fn, *args, **kwargs):
+        """Run fn on the worker thread and wait for its result"""
+        if self.on_worker_thread():
+            return fn(*args, **kwargs)
+        return self.submit(fn, *args, **kwargs).result()
+
+    def _run(self):
+        try:
+            self.backend.initialize()
+        except Exception as e:
+            self._init_error = e
+            self._ready.set()
+            return
+        self._ready.set()
+
+        try:
+            while True:
+                item = self._queue.get()
+                if item is None:
+                    break
+                future, fn, args, kwargs = item
+                if not future.set_running_or_notify_cancel():
+                    continue
+                future.timings['started'] = time.perf_counter()
+                try:
+                    result = fn(*args, **kwargs)
+                except BaseException as e:
+                    future.timings['finished'] = time.perf_counter()
+                    future.set_exception(e)
+                else:
+                    future.timings['finished'] = time.perf_counter()
+                    future.set_result(result)
+                if tracer.enabled:
+                    timings = future.timings
+                    tracer.complete(f"worker.{getattr(fn, '__name__', 'call')}",
+                                    timings['started'], timings['finished'],
+                                    queue_wait_ms=(timings['started'] - timings['queued']) * 1000)
+        finally:
+            try:
+                self.backend.shutdown()
+            finally:
+                self.backend.uninitialize()
@@ -0,0 +1,134 @@
+"""
+Write-behind JSON persistence
+save() only encodes the data and hands it to a background writer, so it is
+safe to call from the Tk thread, the hotkey path or the COM worker. Saves
+that arrive within the debounce delay are coalesced into one write, and every
+write goes through a temp file and os.replace, so a crash can never leave a
+truncated file behind. Documents carry a schema version and are migrated
+step by step on load.
+"""
+
+import json
+import os
+import threading
+import time
+from collections import Counter
+
+from tracing import tracer
+
+
+class ConfigStore:
+    """One JSON file with debounced, atomic background writes"""
+
+    def __init__(self, path, version=1, migrations=None, delay=0.5):
+        """
+        path: JSON file to read and write
+        version: current schema version, stored in the 'version' key
+        migrations: {old version: fn(document) -> document of old version + 1};
+                    documents without a 'version' key are version 1
+        delay: seconds to wait for more saves before writing
+        """
+        self.path = path
+        self.version = version
+        self.migrations = dict(migrations or {})
+        self.delay = delay
+        self._cond = threading.Condition()
+        # Held while a document is taken and written, so writes stay in order
+        self._write_lock = threading.Lock()
+        self._pending = None
+        self._flushing = False
+        self._thread = None
+        # saved: save() calls, written: files written, failed: failed writes
+        self.metrics = Counter()
+
+    def load(self):
+        """Read and migrate the document; None when there is no usable file
+
+        A file that cannot be parsed is kept as <path>.corrupt instead of
+        being overwritten by the next save.
+        """
+        try:
+            with tracer.span('config.read', path=self.path):
+                with open(self.path, 'r') as f:
+                    document = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            print(f"Error reading {self.path}: {e}")
+            try:
+                os.replace(self.path, self.path + '.corrupt')
+            except OSError:
+                pass
+            return None
+        if not isinstance(document, dict):
+            print(f"Error reading {self.path}: not a JSON object")
+            return None
+
+        version = document.get('version', 1)
+        while version < self.version:
+            migrate = self.migrations.get(version)
+            if migrate is not None:
+                document = migrate(document)
+            version += 1
+        document['version'] = version
+        return document
+
+    def save(self, document):
+        """Queue document for writing; returns without touching the disk"""
+        text = json.dumps(dict(document, version=self.version), indent=4)
+        with self._cond:
+            self.metrics['saved'] += 1
+            self._pending = text
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="ConfigStore", daemon=True)
+                self._thread.start()
+            self._cond.notify_all()
+
+    def flush(self):
+        """Write any pending document now, on the calling thread"""
+        with self._cond:
+            self._flushing = True
+            self._cond.notify_all()
+        try:
+            with self._write_lock:
+                with self._cond:
+                    text, self._pending = self._pending, None
+                if text is not None:
+                    self._write(text)
+        finally:
+            with self._cond:
+                self._flushing = False
+
+    def _run(self):
+        """Writer thread: wait out the debounce delay, write, exit when idle"""
+        while True:
+            with self._cond:
+                deadline = time.monotonic() + self.delay
+                while not self._flushing:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+            with self._write_lock:
+                with self._cond:
+                    text, self._pending = self._pending, None
+                if text is not None:
+                    self._write(text)
+            with self._cond:
+                if self._pending is None:
+                    self._thread = None
+                    return
+
+    def _write(self, text):
+        tmp_path = self.path + '.tmp'
+        try:
+            with tracer.span('config.write', path=self.path, size=len(text)):
+                with open(tmp_path, 'w') as f:
+                    f.write(text)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_path, self.path)
+            self.metrics['written'] += 1
+        except OSError as e:
+            self.metrics['failed'] += 1
+            print(f"Error writing {self.path}: {e}")
@@ -0,0 +1,35 @@
+"""
+pytest setup
+The tests in tests/ run against FakeAudioBackend, so they need neither
+Windows nor Core Audio. test_switching.py is a manual check against the real
+devices and is not collected.
+"""
+
+import os
+
+import pytest
+
+from fake_backend import FakeAudioBackend
+
+collect_ignore = ['test_switching.py']
+
+
+@pytest.fixture
+def backend():
+    return FakeAudioBackend(endpoint_count=3)
+
+
+@pytest.fixture
+def switcher(backend, tmp_path):
+    from audio_switcher import AudioSwitcher
+
+    switcher = AudioSwitcher(backend=backend, config_file=os.path.join(tmp_path, 'audio_config.json'))
+    yield switcher
+    switcher.close()
+
+
+def settle(switcher):
+    """Wait until the COM worker has run everything queued so far, including
+    the jobs the notifications it handled queued in turn"""
+    for _ in range(3):
+        switcher.worker.call(lambda: None)
@@ -0,0 +1,165 @@
+"""
+Indexed registry of audio output devices
+Lookups by endpoint ID and by display name are dictionary hits, and the name
+list handed to the combo boxes is cached until the device set changes.
+Devices are audio_backend.DeviceRecord tuples (or anything with id and name
+attributes). The COM worker changes the registry while the Tk, tray, hotkey
+and IPC threads read it, so every method holds the registry's lock.
+"""
+
+import threading
+
+
+class AmbiguousDeviceError(LookupError):
+    """Raised when a friendly name is shared by more than one endpoint"""
+
+    def __init__(self, name, labels):
+        super().__init__(f"'{name}' matches {len(labels)} devices: {', '.join(labels)}")
+        self.name = name
+        self.labels = labels
+
+
+def _id_suffix(device_id):
+    """Short, stable tag taken from the end of an endpoint ID"""
+    return device_id.strip('{}')[-8:]
+
+
+def _suffixed(device):
+    """The label a device gets while it shares its friendly name"""
+    return f"{device.name} ({_id_suffix(device.id)})"
+
+
+class DeviceRegistry:
+    """Audio output devices indexed by endpoint ID and display name
+
+    Devices whose friendly name is unique are labelled with that name.
+    Devices sharing a friendly name get "Name (id-suffix)" labels, and looking
+    up the bare shared name raises AmbiguousDeviceError instead of silently
+    picking one of them. Labels change as twins come and go, so find() also
+    accepts a device's other label form and an endpoint ID saved with a name.
+    """
+
+    def __init__(self, devices=()):
+        self._lock = threading.Lock()
+        self._by_id = {}
+        self._ids_by_name = {}
+        self._labels = {}
+        self._by_label = {}
+        self._names = None
+        self.version = 0
+        self.replace(devices)
+
+    def replace(self, devices):
+        """Replace the whole device set"""
+        with self._lock:
+            self._by_id = {}
+            self._ids_by_name = {}
+            for device in devices:
+                self._by_id[device.id] = device
+                self._ids_by_name.setdefault(device.name, []).append(device.id)
+            self._labels = {}
+            self._by_label = {}
+            for name in self._ids_by_name:
+                self._relabel(name)
+            self._changed()
+
+    def add(self, device):
+        """Add or update a single device"""
+        with self._lock:
+            old = self._by_id.get(device.id)
+            if old is not None:
+                self._unindex(old)
+            self._by_id[device.id] = device
+            self._ids_by_name.setdefault(device.name, []).append(device.id)
+            self._relabel(device.name)
+            self._changed()
+
+    def remove(self, device_id):
+        """Remove a device by endpoint ID and return it (None if unknown)"""
+        with self._lock:
+            device = self._by_id.pop(device_id, None)
+            if device is not None:
+                self._unindex(device)
+                self._changed()
+            return device
+
+    def get(self, device_id, default=None):
+        """Look up a device by endpoint ID"""
+        with self._lock:
+            return self._by_id.get(device_id, default)
+
+    def find(self, name, device_id=None):
+        """Look up a device by display label or unique friendly name
+
+        device_id: endpoint ID saved along with name; it wins when name is
+        that device's plain or suffixed label, whatever the labels are now.
+        A suffixed label whose twin has gone still finds the device.
+
+        Returns None when nothing matches and raises AmbiguousDeviceError
+        when name is a friendly name shared by several endpoints.
+        """
+        with self._lock:
+            device = self._by_id.get(device_id)
+            if device is not None and name in (device.name, _suffixed(device)):
+                return device
+            found = self._by_label.get(name)
+            if found is not None:
+                return self._by_id[found]
+            ids = self._ids_by_name.get(name)
+            if ids:
+                raise AmbiguousDeviceError(name, [self._labels[i] for i in ids])
+            base, sep, suffix = name.rpartition(' (')
+            if sep and suffix.endswith(')'):
+                for found in self._ids_by_name.get(base, ()):
+                    if _id_suffix(found) == suffix[:-1]:
+                        return self._by_id[found]
+            return None
+
+    def label(self, device_id, default=None):
+        """Display label for an endpoint ID"""
+        with self._lock:
+            return self._labels.get(device_id, default)
+
+    def names(self):
+        """Display labels of all devices, cached until the set changes"""
+        with self._lock:
+            if self._names is None:
+                self._names = tuple(self._labels[device_id] for device_id in self._by_id)
+            return self._names
+
+    def __len__(self):
+        with self._lock:
+            return len(self._by_id)
+
+    def __iter__(self):
+        with self._lock:
+            return iter(list(self._by_id.values()))
+
+    def __contains__(self, device_id):
+        with self._lock:
+            return device_id in self._by_id
+
+    def _unindex(self, device):
+        name = device.name
+        ids = self._ids_by_name[name]
+        ids.remove(device.id)
+        label = self._labels.pop(device.id)
+        self._by_label.pop(label, None)
+        if ids:
+            self._relabel(name)
+        else:
+            del self._ids_by_name[name]
+
+    def _relabel(self, name):
+        """Recompute the labels of every device sharing a friendly name"""
+        ids = self._ids_by_name[name]
+        for device_id in ids:
+            self._by_label.pop(self._labels.get(device_id), None)
+        for device_id in ids:
+            label = name if len(ids) == 1 else _suffixed(self._by_id[device_id])
+            self._labels[device_id] = label
+            self._by_label[label] = device_id
+
+    def _changed(self):
+        self._names = None
+        self.version += 1
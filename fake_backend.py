@@ -0,0 +1,278 @@
+"""
+In-process fake of the Core Audio backend
+Lets the COM worker, queueing and latency be exercised on machines without
+Windows Core Audio. Per-call delays and the number of endpoints are
+configurable, and endpoint changes can be simulated to drive the
+notification path. Endpoints carry a data flow, state and form factor, so
+stale and capture endpoints can be modelled alongside the active outputs.
+"""
+
+import threading
+import time
+from collections import Counter
+
+from tracing import tracer
+
+from audio_backend import (
+    DeviceRecord, FLOW_RENDER, FLOW_CAPTURE, ROLE_CONSOLE, ROLES,
+    DEVICE_STATE_ACTIVE, DEVICE_STATE_DISABLED, DEVICE_STATE_NOTPRESENT, DEVICE_STATE_UNPLUGGED,
+    FORM_FACTOR_SPEAKERS, FORM_FACTOR_HEADPHONES, FORM_FACTOR_MICROPHONE, FORM_FACTOR_HEADSET,
+    is_output_endpoint
+)
+
+# Properties in a typical endpoint property store; a full read (the way
+# pycaw's GetAllDevices works) pays for every one of them
+PROPERTIES_PER_ENDPOINT = 30
+
+
+class FakeComObject:
+    """Stand-in for an IMMDevice pointer and its property store
+
+    FakeComObject.live counts the instances still referenced, the way
+    AddRef/Release count references to a real COM object.
+    """
+
+    live = 0
+
+    def __init__(self, endpoint):
+        FakeComObject.live += 1
+        self.endpoint_id = endpoint['id']
+        self.properties = {'{fake-property}.%d' % pid: '%s property %d' % (endpoint['name'], pid)
+                           for pid in range(PROPERTIES_PER_ENDPOINT)}
+
+    def __del__(self):
+        FakeComObject.live -= 1
+
+
+class FakeAudioBackend:
+    """Simulated audio backend with configurable endpoints and call delays"""
+
+    def __init__(self, endpoint_count=2, delays=None):
+        # delays: {'enumerate_devices': 0.01, 'set_default_endpoint': 0.002,
+        #          'read_property': 0.0001, ...}
+        self.delays = dict(delays or {})
+        self.calls = Counter()
+        self.apartment_thread = None
+        self.sink = None
+        self._lock = threading.Lock()
+        self._next_index = 0
+        self.endpoints = {}
+        for _ in range(endpoint_count):
+            self._new_endpoint()
+        first = next(iter(self.endpoints), None)
+        self.default_ids = {role: first for role in ROLES}
+        # Set to False to simulate missed default-device notifications
+        self.notify_default_changes = True
+        self.preferred_clsid = None
+        self._policy_client = None
+        # Endpoint ID -> activated endpoint-volume stand-in
+        self._volumes = {}
+
+    def _new_endpoint(self, name=None, state=DEVICE_STATE_ACTIVE, flow=FLOW_RENDER,
+                      form_factor=FORM_FACTOR_SPEAKERS):
+        with self._lock:
+            index = self._next_index
+            self._next_index += 1
+            device_id = '{0.0.%d.00000000}.{fake-%04d}' % (flow, index)
+            self.endpoints[device_id] = {
+                'id': device_id,
+                'name': name or 'Fake Speakers %d' % (index + 1),
+                'state': state,
+                'flow': flow,
+                'form_factor': form_factor,
+                'volume': 0.5,
+                'muted': False,
+            }
+        return device_id
+
+    def add_stale_endpoints(self, count):
+        """Add endpoints that must never be listed: capture, disabled,
+        not present and unplugged ones, as left behind by old docks and
+        Bluetooth pairings"""
+        kinds = [
+            (FLOW_CAPTURE, DEVICE_STATE_ACTIVE, FORM_FACTOR_MICROPHONE, 'Fake Microphone'),
+            (FLOW_RENDER, DEVICE_STATE_NOTPRESENT, FORM_FACTOR_HEADPHONES, 'Fake Dock Headphones'),
+            (FLOW_RENDER, DEVICE_STATE_UNPLUGGED, FORM_FACTOR_SPEAKERS, 'Fake HDMI Output'),
+            (FLOW_RENDER, DEVICE_STATE_DISABLED, FORM_FACTOR_SPEAKERS, 'Fake Disabled Speakers'),
+            (FLOW_CAPTURE, DEVICE_STATE_NOTPRESENT, FORM_FACTOR_HEADSET, 'Fake Bluetooth Headset'),
+        ]
+        for index in range(count):
+            flow, state, form_factor, name = kinds[index % len(kinds)]
+            self._new_endpoint('%s %d' % (name, index + 1), state, flow, form_factor)
+
+    def _call(self, name):
+        """Record a call, check it runs in the apartment and apply its delay"""
+        if threading.get_ident() != self.apartment_thread:
+            raise RuntimeError(f"{name} called outside the COM apartment thread")
+        self.calls[name] += 1
+        delay = self.delays.get(name)
+        if delay:
+            with tracer.span(f"fake.{name}"):
+                time.sleep(delay)
+
+    def _device_info(self, endpoint):
+        """Read name and form factor, the two properties the real backend
+        reads, into a DeviceRecord; the fake pointer is dropped on return"""
+        device = FakeComObject(endpoint)
+        self._call('open_property_store')
+        self._call('read_property')
+        if not is_output_endpoint(endpoint['flow'], endpoint['state'], endpoint['form_factor']):
+            return None
+        self._call('read_property')
+        del device
+        return DeviceRecord(endpoint['id'], endpoint['name'], endpoint['state'],
+                            endpoint['flow'], endpoint['form_factor'])
+
+    def initialize(self):
+        self.apartment_thread = threading.get_ident()
+        self._call('initialize')
+
+    def uninitialize(self):
+        self._call('uninitialize')
+        self.apartment_thread = None
+
+    def shutdown(self):
+        self._call('shutdown')
+        self.sink = None
+        self._policy_client = None
+        self._volumes.clear()
+
+    def expire_policy_client(self):
+        """Simulate the policy client going stale (next call must rebuild it)"""
+        if self._policy_client is not None:
+            self._policy_client['stale'] = True
+
+    def enumerate_devices(self):
+        """EnumAudioEndpoints(eRender, ACTIVE): the filter runs at the source"""
+        self._call('enumerate_devices')
+        with self._lock:
+            endpoints = [e for e in self.endpoints.values()
+                         if e['flow'] == FLOW_RENDER and e['state'] == DEVICE_STATE_ACTIVE]
+        devices = [self._device_info(e) for e in endpoints]
+        return [d for d in devices if d is not None]
+
+    def get_all_devices(self):
+        """Every endpoint with its full property store and a live pointer,
+        like pycaw's GetAllDevices"""
+        self._call('get_all_devices')
+        with self._lock:
+            endpoints = list(self.endpoints.values())
+        devices = []
+        for endpoint in endpoints:
+            self._call('open_property_store')
+            for _ in range(PROPERTIES_PER_ENDPOINT):
+                self._call('read_property')
+            devices.append(dict(endpoint, device=FakeComObject(endpoint)))
+        return devices
+
+    def read_device(self, device_id):
+        self._call('read_device')
+        endpoint = self.endpoints.get(device_id)
+        if endpoint is None or endpoint['flow'] != FLOW_RENDER or endpoint['state'] != DEVICE_STATE_ACTIVE:
+            return None
+        return self._device_info(endpoint)
+
+    def register_notifications(self, sink):
+        self._call('register_notifications')
+        self.sink = sink
+
+    def unregister_notifications(self):
+        self._call('unregister_notifications')
+        self.sink = None
+
+    @property
+    def default_id(self):
+        return self.default_ids[ROLE_CONSOLE]
+
+    def get_default_device_id(self, role=ROLE_CONSOLE):
+        self._call('get_default_device_id')
+        return self.default_ids[role]
+
+    def get_default_device_ids(self):
+        self._call('get_default_device_ids')
+        return dict(self.default_ids)
+
+    def prepare(self):
+        self._get_policy_client()
+
+    def _get_policy_client(self):
+        if self._policy_client is None or self._policy_client['stale']:
+            self._call('create_policy_client')
+            self.preferred_clsid = self.preferred_clsid or '{fake-policy-config}'
+            self._policy_client = {'clsid': self.preferred_clsid, 'stale': False}
+        return self._policy_client
+
+    def set_default_endpoint(self, device_id, role=ROLE_CONSOLE):
+        self._get_policy_client()
+        self._call('set_default_endpoint')
+        endpoint = self.endpoints.get(device_id)
+        if endpoint is None or not is_output_endpoint(endpoint['flow'], endpoint['state'],
+                                                      endpoint['form_factor']):
+            return False
+        self.default_ids[role] = device_id
+        if self.sink is not None and self.notify_default_changes:
+            self.sink.on_default_device_changed(FLOW_RENDER, role, device_id)
+        return True
+
+    def set_default_endpoints(self, device_id, roles):
+        return {role: self.set_default_endpoint(device_id, role) for role in roles}
+
+    def _endpoint_volume(self, device_id):
+        volume = self._volumes.get(device_id)
+        if volume is None:
+            self._call('activate_endpoint_volume')
+            endpoint = self.endpoints.get(device_id)
+            if endpoint is None or endpoint['state'] != DEVICE_STATE_ACTIVE:
+                return None
+            volume = self._volumes[device_id] = endpoint
+        return volume
+
+    def release_volume(self, device_id=None):
+        if device_id is None:
+            self._volumes.clear()
+        else:
+            self._volumes.pop(device_id, None)
+
+    def get_volume(self, device_id):
+        volume = self._endpoint_volume(device_id)
+        if volume is None:
+            return None
+        self._call('get_volume')
+        return volume['volume'], volume['muted']
+
+    def set_volume(self, device_id, level=None, muted=None):
+        volume = self._endpoint_volume(device_id)
+        if volume is None or volume['id'] not in self.endpoints:
+            self.release_volume(device_id)
+            return False
+        if level is not None:
+            self._call('set_master_volume')
+            volume['volume'] = level
+        if muted is not None:
+            self._call('set_mute')
+            volume['muted'] = bool(muted)
+        return True
+
+    # Simulated event stream. These run on the caller's thread, the way
+    # Windows delivers IMMNotificationClient callbacks on its own threads.
+
+    def plug_in(self, name=None):
+        """Add a new active endpoint and notify the sink; returns its ID"""
+        device_id = self._new_endpoint(name)
+        if self.sink is not None:
+            self.sink.on_device_added(device_id)
+        return device_id
+
+    def unplug(self, device_id):
+        """Remove an endpoint and notify the sink"""
+        with self._lock:
+            self.endpoints.pop(device_id, None)
+        if self.sink is not None:
+            self.sink.on_device_removed(device_id)
+
+    def set_state(self, device_id, state):
+        """Change an endpoint's state and notify the sink"""
+        with self._lock:
+            self.endpoints[device_id]['state'] = state
+        if self.sink is not None:
+            self.sink.on_device_state_changed(device_id, state)
@@ -0,0 +1,362 @@
+"""
+Compiled hotkey dispatch
+One keyboard hook feeds a precompiled table keyed on (modifier bitmask,
+scan code), so the cost per keystroke is a couple of dictionary lookups no
+matter how many bindings exist. Chord sequences ("ctrl+k, ctrl+c") are
+stored as a trie in the same table.
+"""
+
+import threading
+import time
+
+from tracing import tracer
+
+MOD_CTRL = 0x1
+MOD_SHIFT = 0x2
+MOD_ALT = 0x4
+MOD_WIN = 0x8
+
+MODIFIER_NAMES = {
+    'ctrl': MOD_CTRL,
+    'control': MOD_CTRL,
+    'shift': MOD_SHIFT,
+    'alt': MOD_ALT,
+    'windows': MOD_WIN,
+    'win': MOD_WIN,
+}
+
+# Key names whose scan codes count as modifiers (left and right variants)
+MODIFIER_KEYS = {
+    'ctrl': MOD_CTRL, 'left ctrl': MOD_CTRL, 'right ctrl': MOD_CTRL,
+    'shift': MOD_SHIFT, 'left shift': MOD_SHIFT, 'right shift': MOD_SHIFT,
+    'alt': MOD_ALT, 'left alt': MOD_ALT, 'right alt': MOD_ALT, 'alt gr': MOD_ALT,
+    'windows': MOD_WIN, 'left windows': MOD_WIN, 'right windows': MOD_WIN,
+}
+
+# Binding actions understood by AudioSwitcher.binding_callback
+ACTION_TOGGLE = 'toggle'
+ACTION_SWITCH = 'switch'
+ACTION_CYCLE = 'cycle'
+ACTION_VOLUME = 'volume'
+ACTION_SCENE = 'scene'
+
+# Seconds allowed between the steps of a chord sequence
+CHORD_TIMEOUT = 1.5
+
+
+def keyboard_scan_codes(name):
+    """Default resolver: key name -> scan codes, via the keyboard library"""
+    import keyboard
+    return keyboard.key_to_scan_codes(name)
+
+
+class Binding:
+    """A compiled hotkey: its steps and the callback to run"""
+
+    __slots__ = ('hotkey', 'steps', 'callback', 'repeat')
+
+    def __init__(self, hotkey, steps, callback, repeat=False):
+        self.hotkey = hotkey
+        self.steps = steps
+        self.callback = callback
+        # Fire again on keyboard auto-repeat while the key is held
+        self.repeat = repeat
+
+    def __repr__(self):
+        return f"Binding({self.hotkey!r})"
+
+
+class HotkeyEngine:
+    """Single keyboard hook dispatching through a (mask, scan code) table"""
+
+    def __init__(self, resolver=None, source=None):
+        """
+        resolver: key name -> tuple of scan codes (default: keyboard library)
+        source: object with hook(callback) / unhook(handle) delivering events
+                with event_type, scan_code (default: the keyboard module)
+        """
+        self._resolve = resolver or keyboard_scan_codes
+        self._source = source
+        self._hook = None
+        self._lock = threading.Lock()
+        self._bindings = []
+        self._modifier_bits = {}
+        for name, bit in MODIFIER_KEYS.items():
+            try:
+                for scan_code in self._resolve(name):
+                    self._modifier_bits[scan_code] = bit
+            except (ValueError, KeyError):
+                continue
+        self._root = {}
+        self._down_modifiers = {}
+        self._mask = 0
+        self._held = set()
+        self._node = None
+        self._node_time = 0.0
+        self._capture = None
+        self.events = 0
+
+    # Building the table
+
+    def parse(self, hotkey):
+        """Parse 'ctrl+shift+a' or 'ctrl+k, ctrl+c' into a tuple of step lists
+
+        Each step is a list of (mask, scan code) keys; a key name with more
+        than one scan code gives more than one alternative.
+        """
+        steps = []
+        for step in hotkey.split(','):
+            mask = 0
+            keys = []
+            for token in step.strip().lower().split('+'):
+                token = token.strip()
+                if not token:
+                    raise ValueError(f"Empty key in hotkey '{hotkey}'")
+                if token in MODIFIER_NAMES:
+                    mask |= MODIFIER_NAMES[token]
+                    continue
+                if token.startswith('sc') and token[2:].isdigit():
+                    codes = (int(token[2:]),)
+                else:
+                    codes = tuple(self._resolve(token))
+                if codes and all(code in self._modifier_bits for code in codes):
+                    mask |= self._modifier_bits[codes[0]]
+                else:
+                    keys.append(codes)
+            if len(keys) != 1:
+                raise ValueError(f"Hotkey step '{step.strip()}' needs exactly one non-modifier key")
+            steps.append([(mask, code) for code in keys[0]])
+        return tuple(steps)
+
+    def add(self, hotkey, callback, repeat=False):
+        """Register callback for hotkey and recompile; returns the Binding"""
+        binding = Binding(hotkey, self.parse(hotkey), callback, repeat)
+        with self._lock:
+            bindings = self._bindings + [binding]
+            root = self._compile(bindings)
+            self._bindings = bindings
+            self._root = root
+        return binding
+
+    def remove(self, binding):
+        """Unregister a Binding returned by add()"""
+        with self._lock:
+            bindings = [b for b in self._bindings if b is not binding]
+            self._root = self._compile(bindings)
+            self._bindings = bindings
+
+    def clear(self):
+        """Drop every binding"""
+        with self._lock:
+            self._bindings = []
+            self._root = {}
+
+    @property
+    def bindings(self):
+        return list(self._bindings)
+
+    def _compile(self, bindings):
+        """Build the dispatch trie; raises ValueError on conflicting bindings"""
+        root = {}
+        for binding in bindings:
+            levels = [root]
+            for index, alternatives in enumerate(binding.steps):
+                last = index == len(binding.steps) - 1
+                next_levels = []
+                for level in levels:
+                    for key in alternatives:
+                        node = level.get(key)
+                        if last:
+                            if node is not None:
+                                raise ValueError(f"Hotkey '{binding.hotkey}' conflicts with "
+                                                 f"'{node.hotkey if isinstance(node, Binding) else 'a longer chord'}'")
+                            level[key] = binding
+                        else:
+                            if isinstance(node, Binding):
+                                raise ValueError(f"Hotkey '{binding.hotkey}' conflicts with '{node.hotkey}'")
+                            if node is None:
+                                node = level[key] = {}
+                            next_levels.append(node)
+                levels = next_levels
+        return root
+
+    # Hook
+
+    def start(self):
+        """Install the single keyboard hook"""
+        if self._hook is not None:
+            return
+        source = self._source
+        if source is None:
+            import keyboard as source
+            self._source = source
+        self._hook = source.hook(self.on_event)
+
+    def stop(self):
+        """Remove the keyboard hook"""
+        if self._hook is not None:
+            self._source.unhook(self._hook)
+            self._hook = None
+
+    def capture(self, callback):
+        """Send every key event to callback instead of dispatching it
+
+        Bindings are suspended (not removed) until release_capture(); the
+        hook itself stays installed.
+        """
+        self.start()
+        self._node = None
+        self._capture = callback
+
+    def release_capture(self):
+        """Resume dispatching to the bindings"""
+        self._capture = None
+
+    def modifier_bit(self, scan_code):
+        """MOD_* bit for a modifier scan code, 0 for any other key"""
+        return self._modifier_bits.get(scan_code, 0)
+
+    def on_event(self, event):
+        """Hook callback: O(1) per keystroke"""
+        self.events += 1
+        scan_code = event.scan_code
+        bit = self._modifier_bits.get(scan_code)
+        capture = self._capture
+
+        if event.event_type != 'down':
+            if bit:
+                self._down_modifiers.pop(scan_code, None)
+                self._mask = self._modifier_mask()
+            else:
+                self._held.discard(scan_code)
+            if capture is not None:
+                capture(event)
+            return
+
+        if bit:
+            if scan_code not in self._down_modifiers:
+                self._down_modifiers[scan_code] = bit
+                self._mask = self._modifier_mask()
+            if capture is not None:
+                capture(event)
+            return
+
+        repeat = scan_code in self._held
+        self._held.add(scan_code)
+        if capture is not None:
+            capture(event)
+            return
+        key = (self._mask, scan_code)
+
+        node = self._node
+        if node is not None and (repeat or time.monotonic() - self._node_time > CHORD_TIMEOUT):
+            node = self._node = None
+        target = (node if node is not None else self._root).get(key)
+        if target is None and node is not None:
+            # Broken sequence: the key may start a new one
+            target = self._root.get(key)
+        self._node = None
+
+        if target is None:
+            return
+        if isinstance(target, Binding):
+            if repeat and not target.repeat:
+                return
+            try:
+                with tracer.span('hotkey.dispatch', hotkey=target.hotkey, repeat=repeat):
+                    target.callback()
+            except Exception as e:
+                print(f"Error in hotkey '{target.hotkey}': {e}")
+        elif not repeat:
+            self._node = target
+            self._node_time = time.monotonic()
+
+    def _modifier_mask(self):
+        mask = 0
+        for bit in self._down_modifiers.values():
+            mask |= bit
+        return mask
+
+
+# Canonical modifier names, in the order used for recorded hotkeys
+_MODIFIER_ORDER = [('ctrl', MOD_CTRL), ('alt', MOD_ALT), ('shift', MOD_SHIFT), ('windows', MOD_WIN)]
+
+
+class RecordedHotkey:
+    """Result of a recording: scan-code hotkey string and a readable label"""
+
+    __slots__ = ('hotkey', 'label')
+
+    def __init__(self, hotkey, label):
+        self.hotkey = hotkey
+        self.label = label
+
+    def __repr__(self):
+        return f"RecordedHotkey({self.hotkey!r}, {self.label!r})"
+
+
+class HotkeyRecorder:
+    """Captures one key combination from a HotkeyEngine's event stream
+
+    The recording finishes as soon as every key of the combination has been
+    released, or with None when the timeout expires. Bindings are suspended
+    while recording and restored afterwards. The main key is stored by scan
+    code ("ctrl+shift+sc30"), so the result does not depend on the layout.
+    """
+
+    def __init__(self, engine, on_done, timeout=5.0):
+        self._engine = engine
+        self._on_done = on_done
+        self._timeout = timeout
+        self._timer = None
+        self._lock = threading.Lock()
+        self._pressed = set()
+        self._mask = 0
+        self._key = None
+        self._key_name = None
+        self._done = False
+
+    def start(self):
+        """Suspend the bindings and start capturing"""
+        if self._timeout:
+            self._timer = threading.Timer(self._timeout, self._finish, (None,))
+            self._timer.daemon = True
+            self._timer.start()
+        self._engine.capture(self._on_event)
+
+    def cancel(self):
+        """Stop recording without a result"""
+        self._finish(None)
+
+    def _on_event(self, event):
+        scan_code = event.scan_code
+        if event.event_type == 'down':
+            self._pressed.add(scan_code)
+            bit = self._engine.modifier_bit(scan_code)
+            if bit:
+                self._mask |= bit
+            else:
+                self._key = scan_code
+                self._key_name = getattr(event, 'name', None) or f"sc{scan_code}"
+            return
+
+        self._pressed.discard(scan_code)
+        if self._pressed or (self._key is None and not self._mask):
+            return
+        if self._key is None:
+            # Only modifiers were pressed; keep waiting for a real key
+            self._mask = 0
+            return
+        modifiers = [name for name, bit in _MODIFIER_ORDER if self._mask & bit]
+        self._finish(RecordedHotkey('+'.join(modifiers + [f"sc{self._key}"]),
+                                    '+'.join(modifiers + [self._key_name])))
+
+    def _finish(self, result):
+        with self._lock:
+            if self._done:
+                return
+            self._done = True
+        if self._timer is not None:
+            self._timer.cancel()
+        self._engine.release_capture()
+        self._on_done(result)
@@ -0,0 +1,455 @@
+"""
+Local control endpoint for a running audio switcher
+Line protocol on a loopback TCP socket, so it works the same on every OS:
+each request is one line ("switch <device>", "toggle", "list", "current",
+"stats"), each response is one line of JSON ({"ok": ..., "result": ...} or
+{"ok": false, "error": ...}). Requests may be pipelined; responses come back
+in request order. Switches go through the running instance's COM worker and
+switch queue, so they reuse its warm device registry and policy client.
+
+Any local process can reach a loopback port, web pages included, so the first
+line of a connection must be "auth <token>". The token is made fresh each
+session and written next to the config file, readable only by the user who
+runs the switcher (mode 0600, or an ACL for that user alone on Windows). A
+connection is closed on the first line that is not a known command: a wrong
+token, an unknown command, invalid UTF-8 or a line over MAX_LINE bytes.
+
+This module only imports the standard library, so the client is cheap to
+load from scripts and from a second launch of the app.
+
+Usage:
+  python ipc.py switch "Speakers"
+  python ipc.py toggle
+  python ipc.py list current stats
+"""
+
+import hmac
+import json
+import os
+import secrets
+import socket
+import sys
+import threading
+from collections import deque
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 47391
+COMMANDS = ('switch', 'toggle', 'list', 'current', 'stats', 'ping', 'show')
+# Longest request line accepted, in bytes
+MAX_LINE = 4096
+# Session token file, kept next to the config file
+TOKEN_FILE = 'audio_switcher.token'
+
+
+def token_path(config_file):
+    """Token file for the instance using config_file"""
+    return os.path.join(os.path.dirname(os.path.abspath(config_file)), TOKEN_FILE)
+
+
+def write_token(path):
+    """Create a new session token in path, readable only by this user"""
+    token = secrets.token_hex(16)
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+    with os.fdopen(_create_private_file(path), 'w') as f:
+        f.write(token)
+    return token
+
+
+def _create_private_file(path):
+    """Create path for writing, accessible to the current user only; returns an fd
+
+    Fails if path exists: a file someone else created may have wider permissions.
+    """
+    if sys.platform == 'win32':
+        return _create_private_file_win32(path)
+    return os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+
+
+def _create_private_file_win32(path):
+    # The mode of os.open only sets the read-only attribute on Windows and the
+    # file would inherit the folder's ACL, so create it with a protected DACL
+    # that allows the current user and nobody else
+    import ctypes
+    import msvcrt
+    from ctypes import wintypes
+
+    class SECURITY_ATTRIBUTES(ctypes.Structure):
+        _fields_ = [('nLength', wintypes.DWORD),
+                    ('lpSecurityDescriptor', wintypes.LPVOID),
+                    ('bInheritHandle', wintypes.BOOL)]
+
+    advapi32 = ctypes.WinDLL('advapi32', use_last_error=True)
+    kernel32 = ctypes.WinDLL('kernel32', use_last_error=True)
+    advapi32.ConvertStringSecurityDescriptorToSecurityDescriptorW.argtypes = [
+        wintypes.LPCWSTR, wintypes.DWORD, ctypes.POINTER(wintypes.LPVOID), wintypes.LPDWORD]
+    kernel32.CreateFileW.restype = wintypes.HANDLE
+    kernel32.CreateFileW.argtypes = [wintypes.LPCWSTR, wintypes.DWORD, wintypes.DWORD,
+                                     ctypes.POINTER(SECURITY_ATTRIBUTES), wintypes.DWORD,
+                                     wintypes.DWORD, wintypes.HANDLE]
+    kernel32.LocalFree.argtypes = [wintypes.LPVOID]
+
+    descriptor = wintypes.LPVOID()
+    # SDDL: protected DACL (no inherited entries), full access for the user's SID
+    if not advapi32.ConvertStringSecurityDescriptorToSecurityDescriptorW(
+            f"D:P(A;;FA;;;{_current_user_sid()})", 1, ctypes.byref(descriptor), None):
+        raise ctypes.WinError(ctypes.get_last_error())
+    try:
+        attributes = SECURITY_ATTRIBUTES(ctypes.sizeof(SECURITY_ATTRIBUTES), descriptor, False)
+        # GENERIC_WRITE, no sharing, CREATE_NEW, FILE_ATTRIBUTE_NORMAL
+        handle = kernel32.CreateFileW(path, 0x40000000, 0, ctypes.byref(attributes), 1, 0x80, None)
+        if handle is None or handle == ctypes.c_void_p(-1).value:
+            raise ctypes.WinError(ctypes.get_last_error())
+    finally:
+        kernel32.LocalFree(descriptor)
+    return msvcrt.open_osfhandle(handle, os.O_WRONLY)
+
+
+def _current_user_sid():
+    """SID of the user running this process, as a string (S-1-5-21-...)"""
+    import ctypes
+    from ctypes import wintypes
+
+    advapi32 = ctypes.WinDLL('advapi32', use_last_error=True)
+    kernel32 = ctypes.WinDLL('kernel32', use_last_error=True)
+    kernel32.GetCurrentProcess.restype = wintypes.HANDLE
+    kernel32.CloseHandle.argtypes = [wintypes.HANDLE]
+    kernel32.LocalFree.argtypes = [wintypes.LPVOID]
+    advapi32.OpenProcessToken.argtypes = [wintypes.HANDLE, wintypes.DWORD, ctypes.POINTER(wintypes.HANDLE)]
+    advapi32.GetTokenInformation.argtypes = [wintypes.HANDLE, ctypes.c_int, wintypes.LPVOID,
+                                             wintypes.DWORD, wintypes.LPDWORD]
+    advapi32.ConvertSidToStringSidW.argtypes = [wintypes.LPVOID, ctypes.POINTER(wintypes.LPWSTR)]
+
+    token = wintypes.HANDLE()
+    # TOKEN_QUERY
+    if not advapi32.OpenProcessToken(kernel32.GetCurrentProcess(), 0x0008, ctypes.byref(token)):
+        raise ctypes.WinError(ctypes.get_last_error())
+    try:
+        # TokenUser: a TOKEN_USER, whose first field is the SID pointer
+        size = wintypes.DWORD()
+        advapi32.GetTokenInformation(token, 1, None, 0, ctypes.byref(size))
+        buffer = ctypes.create_string_buffer(size.value)
+        if not advapi32.GetTokenInformation(token, 1, buffer, size, ctypes.byref(size)):
+            raise ctypes.WinError(ctypes.get_last_error())
+        sid = ctypes.cast(buffer, ctypes.POINTER(wintypes.LPVOID))[0]
+        text = wintypes.LPWSTR()
+        if not advapi32.ConvertSidToStringSidW(sid, ctypes.byref(text)):
+            raise ctypes.WinError(ctypes.get_last_error())
+        try:
+            return text.value
+        finally:
+            kernel32.LocalFree(text)
+    finally:
+        kernel32.CloseHandle(token)
+
+
+def read_token(path):
+    """Token written by the running instance; None if there is none"""
+    try:
+        with open(path) as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+
+class IpcServer:
+    """Serves the control protocol for an AudioSwitcher"""
+
+    def __init__(self, switcher, host=DEFAULT_HOST, port=DEFAULT_PORT, stats=None, token=None):
+        """
+        switcher: AudioSwitcher whose worker and queue handle the requests
+        port: TCP port on host; 0 picks a free one (see address)
+        stats: callable returning the dict for the stats command
+        token: secret every connection must send first; None disables the check
+        """
+        self.switcher = switcher
+        self.token = token
+        self._stats = stats or switcher.stats
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        if hasattr(socket, 'SO_EXCLUSIVEADDRUSE'):
+            # Windows: nobody else may bind the port while we hold it
+            self._socket.setsockopt(socket.SOL_SOCKET, socket.SO_EXCLUSIVEADDRUSE, 1)
+        else:
+            self._socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._socket.bind((host, port))
+        self._socket.listen(8)
+        self.address = self._socket.getsockname()
+        self._thread = None
+        self._running = False
+        self._connections = set()
+        self._lock = threading.Lock()
+        # Immediate commands start on the reader thread as soon as their line
+        # arrives (switch requests coalesce in the switch queue); the others
+        # run on the writer thread in request order, so "current" after a
+        # "switch" sees the switch
+        self.commands = {}
+        self.add_command('switch', self._switch, immediate=True)
+        self.add_command('toggle', self._toggle, immediate=True)
+        self.add_command('list', self._list)
+        self.add_command('current', self._current)
+        self.add_command('stats', self._stats_command)
+        self.add_command('ping', lambda argument: 'pong')
+
+    def add_command(self, name, handler, immediate=False):
+        """Add or replace a command
+
+        handler(argument) returns a JSON value, a Future of one, or raises.
+        """
+        self.commands[name] = (handler, immediate)
+
+    def start(self):
+        self._running = True
+        self._thread = threading.Thread(target=self._accept_loop, name="IpcServer", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop accepting and close open connections"""
+        self._running = False
+        try:
+            # shutdown() wakes the accept() call on Linux, close() alone does not
+            self._socket.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self._socket.close()
+        with self._lock:
+            connections = list(self._connections)
+        for conn in connections:
+            try:
+                conn.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+
+    def _accept_loop(self):
+        while self._running:
+            try:
+                conn, _ = self._socket.accept()
+            except OSError:
+                break
+            with self._lock:
+                self._connections.add(conn)
+            threading.Thread(target=self._serve, args=(conn,), name="IpcConnection", daemon=True).start()
+
+    def _serve(self, conn):
+        """Read requests as they arrive; a writer thread answers them in order"""
+        pending = deque()
+        ready = threading.Condition()
+        writer = threading.Thread(target=self._write_responses, args=(conn, pending, ready), daemon=True)
+        writer.start()
+        authenticated = self.token is None
+        try:
+            reader = conn.makefile('rb')
+            while True:
+                line = reader.readline(MAX_LINE + 1)
+                if not line:
+                    break
+                try:
+                    if len(line) > MAX_LINE and not line.endswith(b'\n'):
+                        raise ValueError("Request line too long")
+                    line = line.decode('utf-8')
+                    if authenticated:
+                        response = self.dispatch(line)
+                    elif line.strip():
+                        response = self._authenticate(line)
+                        authenticated = True
+                    else:
+                        response = None
+                except ValueError as e:
+                    # Not a client of this protocol; answer once and hang up
+                    response = {'ok': False, 'error': str(e)}
+                    with ready:
+                        pending.append(response)
+                        ready.notify()
+                    break
+                if response is None:
+                    continue
+                with ready:
+                    pending.append(response)
+                    ready.notify()
+        except OSError:
+            pass
+        finally:
+            with ready:
+                pending.append(None)
+                ready.notify()
+            writer.join()
+            with self._lock:
+                self._connections.discard(conn)
+            try:
+                conn.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            conn.close()
+
+    def _authenticate(self, line):
+        """Check an "auth <token>" line; raises ValueError if it is anything else"""
+        name, _, token = line.strip().partition(' ')
+        if name.lower() != 'auth' or not hmac.compare_digest(token.strip().encode('utf-8'),
+                                                             self.token.encode('utf-8')):
+            raise ValueError("Not authorized")
+        return {'ok': True, 'result': 'authorized'}
+
+    def _write_responses(self, conn, pending, ready):
+        while True:
+            with ready:
+                while not pending:
+                    ready.wait()
+                response = pending.popleft()
+            if response is None:
+                return
+            if callable(response):
+                response = response()
+            try:
+                conn.sendall(json.dumps(response).encode('utf-8') + b'\n')
+            except OSError:
+                return
+
+    def dispatch(self, line):
+        """Parse one request line
+
+        Returns a response dict, a callable producing one (run in order by
+        the writer) or None for blank lines. Raises ValueError for an
+        unknown command; the connection is then closed.
+        """
+        line = line.strip()
+        if not line:
+            return None
+        name, _, argument = line.partition(' ')
+        command = self.commands.get(name.lower())
+        if command is None:
+            raise ValueError(f"Unknown command '{name[:40]}'")
+        handler, immediate = command
+        argument = argument.strip()
+        if not immediate:
+            return lambda: self._response(self._call(handler, argument))
+        return self._response(self._call(handler, argument), wait=False)
+
+    def _call(self, handler, argument):
+        try:
+            return handler(argument)
+        except Exception as e:
+            return e
+
+    def _response(self, result, wait=True):
+        """Response dict for a handler result; Futures are waited for on the
+        writer thread"""
+        if hasattr(result, 'result') and callable(result.result):
+            if not wait:
+                return lambda: self._response(result)
+            try:
+                result = result.result()
+            except Exception as e:
+                result = e
+        if isinstance(result, Exception):
+            return {'ok': False, 'error': str(result)}
+        if hasattr(result, '_asdict'):
+            result = result._asdict()
+            return {'ok': bool(result.get('ok')), 'result': result, 'error': result.get('error')}
+        return {'ok': True, 'result': result}
+
+    # Commands
+
+    def _switch(self, device_name):
+        if not device_name:
+            raise ValueError("Usage: switch <device name>")
+        return self.switcher.request_switch(device_name)
+
+    def _toggle(self, argument):
+        return self.switcher.request_toggle()
+
+    def _list(self, argument):
+        return list(self.switcher.get_device_names())
+
+    def _current(self, argument):
+        return self.switcher.get_current_device()
+
+    def _stats_command(self, argument):
+        return self._stats()
+
+
+class IpcClient:
+    """Minimal client: one connection, blocking, pipelining supported"""
+
+    def __init__(self, host=DEFAULT_HOST, port=DEFAULT_PORT, timeout=5.0, token=None):
+        """token: the running instance's session token (see read_token)"""
+        self._socket = socket.create_connection((host, port), timeout=timeout)
+        self._reader = self._socket.makefile('rb')
+        if token is not None:
+            response = self.request(f"auth {token}")
+            if not response.get('ok'):
+                self.close()
+                raise PermissionError(response.get('error'))
+
+    def request(self, command):
+        """Send one request and return its decoded response"""
+        return self.pipeline([command])[0]
+
+    def pipeline(self, commands):
+        """Send every request at once, then read the responses in order"""
+        data = ''.join(command.replace('\n', ' ') + '\n' for command in commands)
+        self._socket.sendall(data.encode('utf-8'))
+        responses = []
+        for _ in commands:
+            line = self._reader.readline()
+            if not line:
+                raise ConnectionError("Connection closed by the audio switcher")
+            responses.append(json.loads(line))
+        return responses
+
+    def close(self):
+        self._reader.close()
+        self._socket.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def send(commands, host=DEFAULT_HOST, port=DEFAULT_PORT, timeout=5.0, token=None):
+    """Connect, pipeline commands and return the responses"""
+    with IpcClient(host, port, timeout, token) as client:
+        return client.pipeline(commands)
+
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description="Control a running audio switcher")
+    parser.add_argument('command', nargs='+',
+                        help="switch <device> | toggle | list | current | stats | show (several are pipelined)")
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--config', default='audio_config.json',
+                        help="config file of the running instance; its token file is read from the same folder")
+    args = parser.parse_args(argv)
+
+    # "switch Speakers (Realtek)" arrives as several words; known command
+    # names start a new request
+    commands = []
+    for word in args.command:
+        if word.lower() in COMMANDS or not commands:
+            commands.append(word)
+        else:
+            commands[-1] += ' ' + word
+    token = read_token(token_path(args.config))
+    if token is None:
+        print(f"No session token next to {args.config}; is the audio switcher running?")
+        return 2
+    try:
+        responses = send(commands, port=args.port, token=token)
+    except PermissionError as e:
+        print(f"Audio switcher on port {args.port} refused the session token: {e}")
+        return 2
+    except OSError as e:
+        print(f"Audio switcher is not running on port {args.port}: {e}")
+        return 2
+    for response in responses:
+        print(json.dumps(response))
+    return 0 if all(r.get('ok') for r in responses) else 1
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,115 @@
+"""
+IMMNotificationClient implementation for endpoint change notifications
+Windows calls the client on its own threads; every callback is forwarded
+to a Python sink object, which is expected to hand the work to the COM
+worker instead of calling back into Core Audio from the notification thread.
+Also defines IMMEndpoint, which pycaw does not expose, to read an endpoint's
+data flow.
+"""
+
+import ctypes
+from ctypes import POINTER, c_int
+from ctypes.wintypes import DWORD, LPCWSTR
+from comtypes import GUID, COMMETHOD, COMObject
+import comtypes
+
+
+CLSID_MMDeviceEnumerator = GUID('{BCDE0395-E52F-467C-8E3D-C4579291692E}')
+
+
+class PROPERTYKEY(ctypes.Structure):
+    _fields_ = [('fmtid', GUID), ('pid', DWORD)]
+
+
+class IMMNotificationClient(comtypes.IUnknown):
+    """IMMNotificationClient COM interface"""
+    _iid_ = GUID('{7991EEC9-7E89-4D85-8390-6C703CEC60C0}')
+    _methods_ = [
+        COMMETHOD([], comtypes.HRESULT, 'OnDeviceStateChanged',
+                  (['in'], LPCWSTR, 'pwstrDeviceId'),
+                  (['in'], DWORD, 'dwNewState')),
+        COMMETHOD([], comtypes.HRESULT, 'OnDeviceAdded',
+                  (['in'], LPCWSTR, 'pwstrDeviceId')),
+        COMMETHOD([], comtypes.HRESULT, 'OnDeviceRemoved',
+                  (['in'], LPCWSTR, 'pwstrDeviceId')),
+        COMMETHOD([], comtypes.HRESULT, 'OnDefaultDeviceChanged',
+                  (['in'], c_int, 'flow'),
+                  (['in'], c_int, 'role'),
+                  (['in'], LPCWSTR, 'pwstrDefaultDeviceId')),
+        COMMETHOD([], comtypes.HRESULT, 'OnPropertyValueChanged',
+                  (['in'], LPCWSTR, 'pwstrDeviceId'),
+                  (['in'], PROPERTYKEY, 'key')),
+    ]
+
+
+class IMMEndpoint(comtypes.IUnknown):
+    """IMMEndpoint COM interface"""
+    _iid_ = GUID('{1BE09788-6894-4089-8586-9A2A6C265AC5}')
+    _methods_ = [
+        COMMETHOD([], comtypes.HRESULT, 'GetDataFlow',
+                  (['out'], POINTER(c_int), 'pDataFlow')),
+    ]
+
+
+class IMMDeviceEnumerator(comtypes.IUnknown):
+    """IMMDeviceEnumerator COM interface (only the notification methods are typed)"""
+    _iid_ = GUID('{A95664D2-9614-4F35-A746-DE8DB63617E6}')
+    _methods_ = [
+        COMMETHOD([], comtypes.HRESULT, 'EnumAudioEndpoints'),
+        COMMETHOD([], comtypes.HRESULT, 'GetDefaultAudioEndpoint'),
+        COMMETHOD([], comtypes.HRESULT, 'GetDevice'),
+        COMMETHOD([], comtypes.HRESULT, 'RegisterEndpointNotificationCallback',
+                  (['in'], POINTER(IMMNotificationClient), 'pClient')),
+        COMMETHOD([], comtypes.HRESULT, 'UnregisterEndpointNotificationCallback',
+                  (['in'], POINTER(IMMNotificationClient), 'pClient')),
+    ]
+
+
+class NotificationClient(COMObject):
+    """Forwards endpoint notifications to a Python sink"""
+    _com_interfaces_ = [IMMNotificationClient]
+
+    def __init__(self, sink):
+        super().__init__()
+        self._sink = sink
+
+    def _forward(self, method, *args):
+        try:
+            getattr(self._sink, method)(*args)
+        except Exception as e:
+            print(f"Error handling {method}: {e}")
+
+    def OnDeviceStateChanged(self, pwstrDeviceId, dwNewState):
+        self._forward('on_device_state_changed', pwstrDeviceId, dwNewState)
+
+    def OnDeviceAdded(self, pwstrDeviceId):
+        self._forward('on_device_added', pwstrDeviceId)
+
+    def OnDeviceRemoved(self, pwstrDeviceId):
+        self._forward('on_device_removed', pwstrDeviceId)
+
+    def OnDefaultDeviceChanged(self, flow, role, pwstrDefaultDeviceId):
+        self._forward('on_default_device_changed', flow, role, pwstrDefaultDeviceId)
+
+    def OnPropertyValueChanged(self, pwstrDeviceId, key):
+        pass
+
+
+class EndpointNotifications:
+    """Registration of a NotificationClient with the device enumerator"""
+
+    def __init__(self, sink):
+        self._enumerator = comtypes.CoCreateInstance(
+            CLSID_MMDeviceEnumerator,
+            IMMDeviceEnumerator,
+            comtypes.CLSCTX_INPROC_SERVER
+        )
+        self._client = NotificationClient(sink)
+        self._enumerator.RegisterEndpointNotificationCallback(self._client)
+
+    def close(self):
+        """Unregister the client and release the enumerator"""
+        if self._enumerator is not None:
+            self._enumerator.UnregisterEndpointNotificationCallback(self._client)
+            self._enumerator = None
+            self._client = None
@@ -10,6 +10,8 @@ from ctypes import POINTER
 from ctypes.wintypes import DWORD
 import comtypes
 
+from tracing import tracer
+
 
 class IPolicyConfig(comtypes.IUnknown):
     """IPolicyConfig COM interface for Windows 10/11"""
@@ -33,40 +35,89 @@ class IPolicyConfig(comtypes.IUnknown):
     ]
 
 
+# HRESULTs showing that the COM server behind a cached client has gone away
+STALE_HRESULTS = {
+    -2147417848,  # RPC_E_DISCONNECTED
+    -2147023174,  # RPC_S_SERVER_UNAVAILABLE
+    -2147023170,  # RPC_S_CALL_FAILED
+    -2147220995,  # CO_E_OBJNOTCONNECTED
+}
+
+
+class StaleClientError(Exception):
+    """Raised when the PolicyConfig instance must be recreated"""
+
+
+def _hresult(error):
+    """Extract the HRESULT from a COMError or OSError"""
+    hresult = getattr(error, 'hresult', None)
+    if hresult is None:
+        hresult = getattr(error, 'winerror', None)
+    return hresult
+
+
 class PolicyConfigClient:
     """Client for setting default audio endpoint"""
 
-    def __init__(self):
-        # Try multiple CLSIDs for different Windows versions
-        self._clsids = [
-            GUID('{870af99c-171d-4f9e-af0d-e63df40c2bc9}'),  # Windows 10/11
-            GUID('{294935CE-F637-4E7C-A41B-AB255460B862}'),  # Windows 7/8
-        ]
+    # Try multiple CLSIDs for different Windows versions
+    CLSIDS = [
+        '{870af99c-171d-4f9e-af0d-e63df40c2bc9}',  # Windows 10/11
+        '{294935CE-F637-4E7C-A41B-AB255460B862}',  # Windows 7/8
+    ]
+
+    def __init__(self, preferred_clsid=None):
+        """
+        Create the PolicyConfig instance
+        preferred_clsid: CLSID that worked on a previous run, tried first
+        """
+        self._clsids = list(self.CLSIDS)
+        if preferred_clsid:
+            self._clsids = [preferred_clsid] + [c for c in self._clsids
+                                                if c.lower() != preferred_clsid.lower()]
         self._policy_config = None
+        self.clsid = None
 
+        errors = []
         for clsid in self._clsids:
             try:
-                self._policy_config = comtypes.CoCreateInstance(
-                    clsid,
-                    IPolicyConfig,
-                    comtypes.CLSCTX_ALL
-                )
+                with tracer.span('com.CoCreateInstance', clsid=clsid):
+                    self._policy_config = comtypes.CoCreateInstance(
+                        GUID(clsid),
+                        IPolicyConfig,
+                        comtypes.CLSCTX_ALL
+                    )
+                self.clsid = clsid
                 break
-            except:
+            except (comtypes.COMError, OSError) as e:
+                errors.append(f"{clsid}: {e}")
                 continue
 
         if self._policy_config is None:
-            raise Exception("Failed to create PolicyConfig instance")
+            raise Exception("Failed to create PolicyConfig instance (" + "; ".join(errors) + ")")
 
     def set_default_endpoint(self, device_id, role=0):
         """
         Set the default audio endpoint
         role: 0 = eConsole (default), 1 = eMultimedia, 2 = eCommunications
+        Raises StaleClientError if the instance has to be recreated
         """
         try:
             # role 0 = eConsole (default device for most applications)
-            self._policy_config.SetDefaultEndpoint(device_id, role)
+            with tracer.span('com.SetDefaultEndpoint', role=role):
+                self._policy_config.SetDefaultEndpoint(device_id, role)
             return True
-        except Exception as e:
+        except (comtypes.COMError, OSError) as e:
+            if _hresult(e) in STALE_HRESULTS:
+                raise StaleClientError(str(e)) from e
             print(f"Error setting default endpoint: {e}")
             return False
+
+    def set_default_endpoints(self, device_id, roles):
+        """
+        Set the default audio endpoint for several roles on this client
+        IPolicyConfig has no multi-role call, so this is one
+        SetDefaultEndpoint per role. Returns {role: bool}. Raises
+        StaleClientError if the instance has to be recreated; setting a role
+        again is harmless, so callers can retry the whole set.
+        """
+        return {role: self.set_default_endpoint(device_id, role) for role in roles}
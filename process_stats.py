@@ -0,0 +1,104 @@
+"""
+Resident memory and thread count of the current process
+Uses GetProcessMemoryInfo on Windows and /proc elsewhere, without third-party
+packages, so the headless daemon can report on itself cheaply.
+"""
+
+import os
+import sys
+import threading
+
+
+def resident_memory():
+    """Resident set size (working set on Windows) in bytes, None if unknown"""
+    if sys.platform == 'win32':
+        import ctypes
+        from ctypes import wintypes
+
+        class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+            _fields_ = [
+                ('cb', wintypes.DWORD),
+                ('PageFaultCount', wintypes.DWORD),
+                ('PeakWorkingSetSize', ctypes.c_size_t),
+                ('WorkingSetSize', ctypes.c_size_t),
+                ('QuotaPeakPagedPoolUsage', ctypes.c_size_t),
+                ('QuotaPagedPoolUsage', ctypes.c_size_t),
+                ('QuotaPeakNonPagedPoolUsage', ctypes.c_size_t),
+                ('QuotaNonPagedPoolUsage', ctypes.c_size_t),
+                ('PagefileUsage', ctypes.c_size_t),
+                ('PeakPagefileUsage', ctypes.c_size_t),
+            ]
+
+        counters = PROCESS_MEMORY_COUNTERS()
+        counters.cb = ctypes.sizeof(counters)
+        process = ctypes.windll.kernel32.GetCurrentProcess()
+        if not ctypes.windll.psapi.GetProcessMemoryInfo(process, ctypes.byref(counters), counters.cb):
+            return None
+        return counters.WorkingSetSize
+
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def thread_count():
+    """OS threads of the process where available, else Python threads"""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('Threads:'):
+                    return int(line.split()[1])
+    except (OSError, ValueError):
+        pass
+    if sys.platform == 'win32':
+        count = _windows_thread_count()
+        if count is not None:
+            return count
+    return threading.active_count()
+
+
+def _windows_thread_count():
+    import ctypes
+    from ctypes import wintypes
+
+    class THREADENTRY32(ctypes.Structure):
+        _fields_ = [
+            ('dwSize', wintypes.DWORD),
+            ('cntUsage', wintypes.DWORD),
+            ('th32ThreadID', wintypes.DWORD),
+            ('th32OwnerProcessID', wintypes.DWORD),
+            ('tpBasePri', wintypes.LONG),
+            ('tpDeltaPri', wintypes.LONG),
+            ('dwFlags', wintypes.DWORD),
+        ]
+
+    TH32CS_SNAPTHREAD = 0x4
+    kernel32 = ctypes.windll.kernel32
+    kernel32.CreateToolhelp32Snapshot.restype = wintypes.HANDLE
+    snapshot = kernel32.CreateToolhelp32Snapshot(TH32CS_SNAPTHREAD, 0)
+    if snapshot in (None, wintypes.HANDLE(-1).value):
+        return None
+    try:
+        entry = THREADENTRY32()
+        entry.dwSize = ctypes.sizeof(entry)
+        pid = os.getpid()
+        count = 0
+        more = kernel32.Thread32First(snapshot, ctypes.byref(entry))
+        while more:
+            if entry.th32OwnerProcessID == pid:
+                count += 1
+            more = kernel32.Thread32Next(snapshot, ctypes.byref(entry))
+        return count
+    finally:
+        kernel32.CloseHandle(snapshot)
+
+
+def process_stats():
+    """{'rss_bytes', 'threads', 'python_threads'} for the current process"""
+    return {
+        'rss_bytes': resident_memory(),
+        'threads': thread_count(),
+        'python_threads': threading.active_count(),
+    }
@@ -0,0 +1,68 @@
+"""
+Single-instance lock
+A named mutex on Windows and an flock()ed file elsewhere. Both are released
+by the operating system when the process exits, so a crash never leaves a
+stale lock behind. Only the standard library is imported, so a second launch
+can check the lock and hand its arguments over before any heavy import.
+"""
+
+import os
+import sys
+import tempfile
+
+ERROR_ALREADY_EXISTS = 183
+
+
+class InstanceLock:
+    """Held by at most one process per user session"""
+
+    def __init__(self, name="AudioSwitcher"):
+        self.name = name
+        self._handle = None
+
+    def acquire(self):
+        """Take the lock; False if another process holds it"""
+        if self._handle is not None:
+            return True
+        if sys.platform == 'win32':
+            return self._acquire_mutex()
+        return self._acquire_flock()
+
+    def _acquire_mutex(self):
+        import ctypes
+        from ctypes import wintypes
+
+        kernel32 = ctypes.WinDLL('kernel32', use_last_error=True)
+        kernel32.CreateMutexW.restype = wintypes.HANDLE
+        kernel32.CreateMutexW.argtypes = [wintypes.LPVOID, wintypes.BOOL, wintypes.LPCWSTR]
+        handle = kernel32.CreateMutexW(None, False, f"Local\\{self.name}")
+        if not handle:
+            raise ctypes.WinError(ctypes.get_last_error())
+        if ctypes.get_last_error() == ERROR_ALREADY_EXISTS:
+            kernel32.CloseHandle(handle)
+            return False
+        self._handle = handle
+        return True
+
+    def _acquire_flock(self):
+        import fcntl
+
+        path = os.path.join(tempfile.gettempdir(), f"{self.name}-{os.getuid()}.lock")
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False
+        self._handle = fd
+        return True
+
+    def release(self):
+        if self._handle is None:
+            return
+        if sys.platform == 'win32':
+            import ctypes
+            ctypes.windll.kernel32.CloseHandle(self._handle)
+        else:
+            os.close(self._handle)
+        self._handle = None
@@ -0,0 +1,87 @@
+"""
+Startup profiling for --startup-profile
+Records how long each startup phase takes and, while enabled, how long every
+top-level import takes (per thread). Disabled by default, in which case the
+phase() context manager only costs a flag check and imports are untouched.
+"""
+
+import builtins
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+_origin = time.perf_counter()
+
+
+class StartupProfile:
+    """Phase and import timings collected during startup"""
+
+    def __init__(self):
+        self.enabled = False
+        self.phases = []
+        self.imports = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._original_import = None
+
+    def enable(self):
+        """Start recording phases and hook __import__ to time imports"""
+        if self.enabled:
+            return
+        self.enabled = True
+        self._original_import = builtins.__import__
+        builtins.__import__ = self._timed_import
+
+    def disable(self):
+        """Stop recording and restore the original __import__"""
+        if not self.enabled:
+            return
+        self.enabled = False
+        builtins.__import__ = self._original_import
+
+    @contextmanager
+    def phase(self, name):
+        """Time a startup phase"""
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            with self._lock:
+                self.phases.append((name, threading.current_thread().name, start - _origin, end - start))
+
+    def _timed_import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        if level == 0 and name in sys.modules:
+            return self._original_import(name, globals, locals, fromlist, level)
+        depth = getattr(self._local, 'depth', 0)
+        self._local.depth = depth + 1
+        start = time.perf_counter()
+        try:
+            return self._original_import(name, globals, locals, fromlist, level)
+        finally:
+            self._local.depth = depth
+            if depth == 0:
+                elapsed = time.perf_counter() - start
+                with self._lock:
+                    self.imports.append((name, threading.current_thread().name, elapsed))
+
+    def report(self):
+        """Human readable summary of phases (in order) and imports (slowest first)"""
+        lines = ["Startup profile (ms since audio_switcher import)", "Phases:"]
+        with self._lock:
+            phases = list(self.phases)
+            imports = sorted(self.imports, key=lambda item: item[2], reverse=True)
+        for name, thread, started, elapsed in phases:
+            lines.append(f"  {started * 1000:9.1f}  {elapsed * 1000:8.1f} ms  {name} [{thread}]")
+        lines.append("Imports (inclusive, first import only):")
+        for name, thread, elapsed in imports:
+            if elapsed >= 0.0005:
+                lines.append(f"  {elapsed * 1000:8.1f} ms  {name} [{thread}]")
+        return "\n".join(lines)
+
+
+startup = StartupProfile()
@@ -0,0 +1,98 @@
+"""
+Precompiled A/B switch plan
+Resolves the toggle devices to endpoint IDs and role lists once, when the
+devices are saved or the config is loaded, and again only when the device
+registry changes. A toggle then becomes a dictionary lookup on the current
+default endpoint ID instead of name lookups and role parsing per press.
+"""
+
+from collections import namedtuple
+
+from audio_backend import ROLE_CONSOLE, ROLE_NAMES
+from device_registry import AmbiguousDeviceError
+
+# One resolved toggle target: display label, endpoint ID, role names and the
+# matching ERole values
+PlanTarget = namedtuple('PlanTarget', ['label', 'id', 'role_names', 'roles'])
+
+
+class SwitchPlan:
+    """Toggle ring compiled against one version of a DeviceRegistry"""
+
+    def __init__(self, registry, ring, roles_for, device_ids=None):
+        """
+        registry: DeviceRegistry to resolve the names against
+        ring: device names to toggle through (device A, device B)
+        roles_for: device name -> list of role names to set
+        device_ids: device name -> endpoint ID saved with it, see DeviceRegistry.find
+        """
+        device_ids = device_ids or {}
+        self.version = registry.version
+        self.ring = tuple(ring)
+        self.targets = []
+        # Why the plan cannot be used, and the device name concerned (None
+        # when A/B are not configured)
+        self.error = None
+        self.error_target = None
+        for name in self.ring:
+            if not name:
+                self.error = "Device A and Device B are not configured"
+                break
+            try:
+                device = registry.find(name, device_ids.get(name))
+            except AmbiguousDeviceError as e:
+                self.error, self.error_target = str(e), name
+                break
+            if device is None:
+                self.error, self.error_target = "Device not found", name
+                break
+            role_names = tuple(roles_for(name))
+            self.targets.append(PlanTarget(name, device.id, role_names,
+                                           tuple(ROLE_NAMES[role] for role in role_names)))
+        if self.error is not None:
+            self.targets = []
+        # A role every target sets: its default endpoint shows where the ring
+        # stands. None when the targets share no role (A console only, B
+        # communications only), see position()
+        shared = [role for name, role in ROLE_NAMES.items()
+                  if self.targets and all(name in target.role_names for target in self.targets)]
+        self.role = shared[0] if shared else None
+        # Endpoint ID -> position in the ring, for the opposite-target lookup
+        self._index = {target.id: index for index, target in enumerate(self.targets)}
+        # Endpoint ID -> target one toggle away
+        self.opposite = {target.id: self.targets[(index + 1) % len(self.targets)]
+                         for index, target in enumerate(self.targets)}
+
+    @property
+    def ok(self):
+        return bool(self.targets)
+
+    def is_current(self, registry, ring):
+        """Still valid for this registry version and device ring"""
+        return self.version == registry.version and self.ring == tuple(ring)
+
+    def position(self, default_ids, last_id=None):
+        """Endpoint ID a toggle starts from
+
+        default_ids: role -> current default endpoint ID
+        last_id: endpoint the last switch went to; used when the targets
+                 share no role, for as long as it still holds all its roles
+        """
+        if self.role is not None:
+            return default_ids.get(self.role)
+        index = self._index.get(last_id)
+        if index is not None and all(default_ids.get(role) == last_id for role in self.targets[index].roles):
+            return last_id
+        return default_ids.get(ROLE_CONSOLE)
+
+    def step(self, current_id, count):
+        """Target reached after count toggles from the endpoint current_id
+
+        From an endpoint outside the ring, the first toggle goes to device A.
+        """
+        if count == 1 and current_id in self.opposite:
+            return self.opposite[current_id]
+        index = self._index.get(current_id)
+        if index is None:
+            return self.targets[(count - 1) % len(self.targets)]
+        return self.targets[(index + count) % len(self.targets)]
@@ -0,0 +1,111 @@
+"""
+Coalescing queue for switch, toggle and cycle requests
+Requests that have not started executing yet are folded into one pending
+batch: consecutive steps through the same device ring are counted instead of
+queued, and a direct switch supersedes everything queued before it. At most
+one batch waits on the COM worker at a time.
+
+Every request gets its own Future. Requests folded into a batch get the
+batch's result; requests a later direct switch superseded get their own
+"superseded" result straight away, never the result of the switch that
+replaced them.
+"""
+
+import threading
+from collections import Counter
+from concurrent.futures import Future
+from functools import partial
+
+
+class SwitchQueue:
+    """Collapses pending switch requests to their net effect"""
+
+    def __init__(self, worker, execute, superseded=None):
+        """
+        worker: ComWorker that runs the batches
+        execute: execute(target, steps) -> result, called on the worker with
+                 the explicit target (or None) and the [ring, count] steps
+                 queued after it; ring None stands for the A/B toggle
+        superseded: superseded(device_name) -> result for requests a direct
+                    switch to device_name replaced before they started
+        """
+        self._worker = worker
+        self._execute = execute
+        self._superseded = superseded or (lambda device_name: None)
+        self._lock = threading.Lock()
+        self._target = None
+        self._steps = []
+        self._count = 0
+        self._batch = None
+        # Request Futures resolved with the pending batch's result
+        self._waiting = []
+        # requested: every request, executed: batches run,
+        # collapsed: requests folded into another one, noop: batches with no net effect,
+        # superseded: requests dropped by a later direct switch
+        self.metrics = Counter()
+
+    def toggle(self):
+        """Queue an A/B toggle; returns a Future of its result"""
+        return self.cycle(None)
+
+    def cycle(self, ring):
+        """Queue one step through the device names in ring"""
+        with self._lock:
+            if self._steps and self._steps[-1][0] == ring:
+                self._steps[-1][1] += 1
+            else:
+                self._steps.append([ring, 1])
+            return self._request()
+
+    def switch(self, device_name):
+        """Queue a direct switch, superseding the requests that have not
+        started yet; returns a Future of its result"""
+        with self._lock:
+            superseded = list(self._waiting)
+            del self._waiting[:]
+            self._target = device_name
+            self._steps = []
+            self._count = 0
+            self.metrics['superseded'] += len(superseded)
+            future = self._request()
+        if superseded:
+            result = self._superseded(device_name)
+            for request in superseded:
+                request.set_result(result)
+        return future
+
+    def _request(self):
+        """Add a request to the pending batch, submitting the batch if needed"""
+        self.metrics['requested'] += 1
+        self._count += 1
+        if self._batch is None:
+            # _run_batch waits for the lock held here, so the callback is
+            # added before the batch can finish
+            self._batch = self._worker.submit(self._run_batch)
+            self._waiting = []
+            self._batch.add_done_callback(partial(self._finish, self._waiting))
+        future = Future()
+        future.timings = self._batch.timings
+        self._waiting.append(future)
+        return future
+
+    def _run_batch(self):
+        with self._lock:
+            target, steps, count = self._target, self._steps, self._count
+            self._target, self._steps, self._count = None, [], 0
+            self._batch = None
+            self._waiting = []
+            self.metrics['executed'] += 1
+            self.metrics['collapsed'] += count - 1
+        return self._execute(target, steps)
+
+    @staticmethod
+    def _finish(waiting, batch):
+        """Hand a finished batch's result to the requests it served"""
+        for request in waiting:
+            if batch.cancelled():
+                request.cancel()
+            elif batch.exception() is not None:
+                request.set_exception(batch.exception())
+            else:
+                request.set_result(batch.result())
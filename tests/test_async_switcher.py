@@ -0,0 +1,35 @@
+import asyncio
+
+from async_switcher import AsyncAudioSwitcher, DefaultEvent
+from conftest import settle
+
+
+def test_concurrent_switches_get_their_own_results(switcher):
+    names = switcher.get_device_names()
+
+    async def run():
+        facade = AsyncAudioSwitcher(switcher)
+        results = await asyncio.gather(facade.switch(names[1]), facade.switch(names[2]))
+        return results, await facade.current()
+
+    results, current = asyncio.run(run())
+    assert current == names[2]
+    assert results[1].ok and results[1].target == names[2]
+    # The first switch either ran or was superseded; it never reports the second one
+    assert results[0].target != names[2]
+
+
+def test_default_events_are_streamed(switcher):
+    names = switcher.get_device_names()
+
+    async def run():
+        facade = AsyncAudioSwitcher(switcher)
+        events = facade.default_events()
+        await facade.switch(names[1])
+        await asyncio.get_running_loop().run_in_executor(None, settle, switcher)
+        await facade.close()
+        return [event async for event in events]
+
+    events = asyncio.run(run())
+    assert events
+    assert all(isinstance(event, DefaultEvent) and event.label == names[1] for event in events)
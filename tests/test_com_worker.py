@@ -0,0 +1,59 @@
+import threading
+
+import pytest
+
+from com_worker import ComWorker
+from fake_backend import FakeAudioBackend
+
+
+@pytest.fixture
+def worker():
+    worker = ComWorker(FakeAudioBackend())
+    worker.start()
+    yield worker
+    worker.stop()
+
+
+def test_backend_calls_run_in_the_apartment(worker):
+    assert worker.call(worker.backend.get_default_device_id) == worker.backend.default_id
+    with pytest.raises(RuntimeError):
+        worker.backend.get_default_device_id()
+
+
+def test_jobs_run_in_order_on_one_thread(worker):
+    threads, order = set(), []
+
+    def job(index):
+        threads.add(threading.current_thread().name)
+        order.append(index)
+
+    futures = [worker.submit(job, index) for index in range(20)]
+    for future in futures:
+        future.result(5)
+    assert order == list(range(20))
+    assert threads == {worker.name}
+
+
+def test_call_from_the_worker_runs_inline(worker):
+    assert worker.call(lambda: worker.call(lambda: 'inner')) == 'inner'
+
+
+def test_futures_carry_timings_and_errors(worker):
+    def fail():
+        raise ValueError("no device")
+
+    future = worker.submit(fail)
+    with pytest.raises(ValueError):
+        future.result(5)
+    timings = future.timings
+    assert timings['queued'] <= timings['started'] <= timings['finished']
+
+
+def test_stop_releases_the_apartment():
+    backend = FakeAudioBackend()
+    worker = ComWorker(backend)
+    worker.start()
+    worker.stop()
+    assert not worker.is_running()
+    assert backend.calls['shutdown'] == backend.calls['uninitialize'] == 1
+    assert backend.apartment_thread is None
@@ -0,0 +1,62 @@
+import json
+import os
+
+from audio_switcher import CONFIG_VERSION, migrate_config_v1
+from config_store import ConfigStore
+
+
+def test_missing_file_loads_as_none(tmp_path):
+    assert ConfigStore(str(tmp_path / 'config.json')).load() is None
+
+
+def test_saves_are_coalesced_and_written_atomically(tmp_path):
+    path = str(tmp_path / 'config.json')
+    store = ConfigStore(path, delay=60)
+    for index in range(3):
+        store.save({'index': index})
+    assert not os.path.exists(path)
+
+    store.flush()
+    with open(path) as f:
+        assert json.load(f) == {'index': 2, 'version': 1}
+    assert not os.path.exists(path + '.tmp')
+    assert store.metrics['saved'] == 3
+    assert store.metrics['written'] == 1
+
+
+def test_failed_write_keeps_the_old_file(tmp_path, monkeypatch):
+    path = str(tmp_path / 'config.json')
+    store = ConfigStore(path)
+    store.save({'device_a': 'Speakers'})
+    store.flush()
+
+    def fail(src, dst):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(os, 'replace', fail)
+    store.save({'device_a': 'Headset'})
+    store.flush()
+    monkeypatch.undo()
+
+    assert store.load()['device_a'] == 'Speakers'
+    assert store.metrics['failed'] == 1
+
+
+def test_corrupt_file_is_set_aside(tmp_path):
+    path = tmp_path / 'config.json'
+    path.write_text('{"device_a": ')
+
+    assert ConfigStore(str(path)).load() is None
+    assert not path.exists()
+    assert (tmp_path / 'config.json.corrupt').read_text() == '{"device_a": '
+
+
+def test_unversioned_config_is_migrated(tmp_path):
+    path = tmp_path / 'config.json'
+    path.write_text(json.dumps({'hotkeys': {'ctrl+1': 'Speakers'}, 'device_a': 'Speakers'}))
+
+    config = ConfigStore(str(path), CONFIG_VERSION, {1: migrate_config_v1}).load()
+    assert config['version'] == CONFIG_VERSION
+    assert 'hotkeys' not in config
+    assert config['bindings'] == [{'hotkey': 'ctrl+1', 'action': 'switch', 'device': 'Speakers'}]
+    assert config['device_a'] == 'Speakers'
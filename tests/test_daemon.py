@@ -0,0 +1,59 @@
+import io
+import os
+import subprocess
+import sys
+
+import pytest
+
+from audio_switcher import AudioSwitcherDaemon
+from conftest import settle
+from hotkey_engine import HotkeyEngine
+from test_hotkey_engine import KeySource, resolve
+
+
+@pytest.fixture
+def keys():
+    return KeySource()
+
+
+@pytest.fixture
+def daemon(switcher, keys):
+    switcher.ipc_port = None
+    switcher.device_a, switcher.device_b = switcher.get_device_names()[:2]
+    switcher.toggle_hotkey = 'ctrl+alt+a'
+    return AudioSwitcherDaemon(switcher, HotkeyEngine(resolver=resolve, source=keys))
+
+
+def test_import_leaves_out_the_gui_modules():
+    code = ("import sys, audio_switcher; "
+            "print(sorted({'tkinter', 'PIL', 'pystray'} & set(sys.modules)))")
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    output = subprocess.check_output([sys.executable, '-c', code], cwd=root, text=True)
+    assert output.strip() == '[]'
+
+
+def test_hotkey_toggles_without_a_gui(daemon, keys):
+    switcher = daemon.switcher
+    device_a, device_b = switcher.device_a, switcher.device_b
+    daemon.start()
+    try:
+        start = switcher.get_current_device()
+        keys.press('ctrl', 'alt', 'a')
+        settle(switcher)
+        assert switcher.get_current_device() == (device_b if start == device_a else device_a)
+    finally:
+        daemon.close()
+
+
+def test_stdin_commands(daemon, capsys):
+    switcher = daemon.switcher
+    current = switcher.get_current_device()
+    daemon.run(io.StringIO("current\nbogus\nstats\nquit\ntoggle\n"))
+
+    output = capsys.readouterr().out
+    assert current in output
+    assert "Unknown command 'bogus'" in output
+    assert "Hotkey events:" in output
+    # Nothing after quit is read
+    assert "Toggle queued" not in output
+    assert not switcher.worker.is_running()
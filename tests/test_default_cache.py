@@ -0,0 +1,85 @@
+import os
+
+from audio_backend import FLOW_CAPTURE, ROLE_CONSOLE, ROLES
+from audio_switcher import AudioSwitcher
+from conftest import settle
+from fake_backend import FakeAudioBackend
+
+
+def change_default_outside(switcher, backend, device_id):
+    """Another program switches the default device"""
+    def change():
+        for role in ROLES:
+            backend.set_default_endpoint(device_id, role)
+    switcher.worker.call(change)
+
+
+def test_current_device_is_a_cache_read(switcher, backend):
+    calls = backend.calls['get_default_device_ids'] + backend.calls['get_default_device_id']
+    for _ in range(10):
+        switcher.get_current_device()
+    assert backend.calls['get_default_device_ids'] + backend.calls['get_default_device_id'] == calls
+
+
+def test_notifications_keep_the_cache_current(switcher, backend):
+    target = switcher.get_device_names()[2]
+    change_default_outside(switcher, backend, switcher.devices.find(target).id)
+    settle(switcher)
+    assert switcher.get_current_device() == target
+
+
+def test_capture_notifications_are_ignored(switcher, backend):
+    current = switcher.get_current_device()
+    switcher.on_default_device_changed(FLOW_CAPTURE, ROLE_CONSOLE, '{capture}')
+    settle(switcher)
+    assert switcher.get_current_device() == current
+
+
+def test_resync_recovers_from_missed_notifications(switcher, backend):
+    current = switcher.get_current_device()
+    target = switcher.get_device_names()[1]
+    backend.notify_default_changes = False
+    change_default_outside(switcher, backend, switcher.devices.find(target).id)
+    settle(switcher)
+    assert switcher.get_current_device() == current
+
+    switcher.resync_default_devices()
+    assert switcher.get_current_device() == target
+
+
+def test_refresh_picks_up_missed_notifications(switcher, backend):
+    target = switcher.get_device_names()[2]
+    backend.notify_default_changes = False
+    change_default_outside(switcher, backend, switcher.devices.find(target).id)
+
+    assert switcher.worker.call(switcher.reconcile_devices)
+    assert switcher.current_device_label() == target
+
+
+class NoNotificationsBackend(FakeAudioBackend):
+    def register_notifications(self, sink):
+        raise OSError("IMMNotificationClient unavailable")
+
+
+def test_without_notifications_every_read_resyncs(tmp_path):
+    backend = NoNotificationsBackend(endpoint_count=2)
+    switcher = AudioSwitcher(backend=backend, config_file=os.path.join(tmp_path, 'audio_config.json'))
+    try:
+        assert not switcher.notifications_active
+        target = switcher.get_device_names()[1]
+        change_default_outside(switcher, backend, switcher.devices.find(target).id)
+        assert switcher.get_current_device() == target
+    finally:
+        switcher.close()
+
+
+def test_default_listeners_see_own_switches(switcher):
+    # The tray badge and tooltip follow these instead of polling
+    defaults = []
+    switcher.add_default_listener(lambda role, device_id: defaults.append((role, device_id)))
+    target = switcher.get_device_names()[2]
+
+    assert switcher.switch_to_device(target)
+    settle(switcher)
+    assert switcher.current_device_label() == target
+    assert {device_id for _, device_id in defaults} == {switcher.devices.find(target).id}
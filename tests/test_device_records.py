@@ -0,0 +1,24 @@
+import gc
+
+from audio_backend import DeviceRecord
+from conftest import settle
+from fake_backend import FakeComObject
+
+
+def test_records_hold_no_com_objects(switcher, backend):
+    gc.collect()
+    live = FakeComObject.live
+    backend.plug_in('Fake USB Speakers')
+    settle(switcher)
+    switcher.worker.call(switcher.reconcile_devices)
+    switcher.worker.call(backend.read_device, switcher.devices.find('Fake USB Speakers').id)
+
+    gc.collect()
+    assert FakeComObject.live == live
+    for device in switcher.devices:
+        assert type(device) is DeviceRecord
+        assert all(isinstance(field, (str, int)) for field in device)
+
+    # Whereas a pycaw-style full read keeps a pointer per endpoint
+    devices = switcher.worker.call(backend.get_all_devices)
+    assert FakeComObject.live == live + len(devices)
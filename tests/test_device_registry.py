@@ -0,0 +1,94 @@
+import os
+
+import pytest
+
+from audio_backend import DeviceRecord, DEVICE_STATE_ACTIVE, FLOW_RENDER, FORM_FACTOR_HEADSET, ROLE_CONSOLE
+from audio_switcher import AudioSwitcher
+from conftest import settle
+from device_registry import AmbiguousDeviceError, DeviceRegistry
+
+
+def record(device_id, name):
+    return DeviceRecord(device_id, name, DEVICE_STATE_ACTIVE, FLOW_RENDER, FORM_FACTOR_HEADSET)
+
+
+SPEAKERS = record('{0.0.0.00000000}.{aaaaaaaa-0000-0000-0000-000000000001}', 'Speakers')
+HEADSET_1 = record('{0.0.0.00000000}.{bbbbbbbb-0000-0000-0000-111111111111}', 'Headset')
+HEADSET_2 = record('{0.0.0.00000000}.{cccccccc-0000-0000-0000-222222222222}', 'Headset')
+
+
+def test_unique_names_are_their_own_labels():
+    registry = DeviceRegistry([SPEAKERS, HEADSET_1])
+
+    assert registry.names() == ('Speakers', 'Headset')
+    assert registry.find('Headset') == HEADSET_1
+    assert registry.find('Nope') is None
+
+
+def test_twins_get_suffixed_labels_and_plain_name_is_ambiguous():
+    registry = DeviceRegistry([SPEAKERS, HEADSET_1, HEADSET_2])
+
+    assert registry.label(HEADSET_1.id) == 'Headset (11111111)'
+    assert registry.label(HEADSET_2.id) == 'Headset (22222222)'
+    assert registry.find('Headset (22222222)') == HEADSET_2
+    with pytest.raises(AmbiguousDeviceError) as error:
+        registry.find('Headset')
+    assert error.value.labels == ['Headset (11111111)', 'Headset (22222222)']
+
+
+def test_labels_follow_twins_coming_and_going():
+    registry = DeviceRegistry([HEADSET_1])
+    version = registry.version
+
+    registry.add(HEADSET_2)
+    assert registry.names() == ('Headset (11111111)', 'Headset (22222222)')
+    registry.remove(HEADSET_1.id)
+    assert registry.names() == ('Headset',)
+    assert registry.version == version + 2
+
+
+def test_suffixed_label_still_found_after_twin_is_unplugged():
+    registry = DeviceRegistry([HEADSET_1, HEADSET_2])
+    saved = registry.label(HEADSET_2.id)
+
+    registry.remove(HEADSET_1.id)
+    assert registry.find(saved) == HEADSET_2
+    assert registry.find('Headset (99999999)') is None
+
+
+def test_saved_id_resolves_a_name_that_became_ambiguous():
+    registry = DeviceRegistry([HEADSET_1, HEADSET_2])
+
+    assert registry.find('Headset', HEADSET_2.id) == HEADSET_2
+    assert registry.find('Headset (11111111)', HEADSET_1.id) == HEADSET_1
+    # An ID saved with another name is ignored
+    assert registry.find('Speakers', HEADSET_1.id) is None
+
+
+def test_update_renames_in_place():
+    registry = DeviceRegistry([SPEAKERS])
+
+    registry.add(SPEAKERS._replace(name='Desk Speakers'))
+    assert len(registry) == 1
+    assert registry.find('Speakers') is None
+    assert registry.find('Desk Speakers').id == SPEAKERS.id
+
+
+def test_saved_name_survives_a_twin_being_plugged_in(backend, tmp_path):
+    config_file = os.path.join(tmp_path, 'audio_config.json')
+    headset = backend.plug_in('Headset')
+    switcher = AudioSwitcher(backend=backend, config_file=config_file)
+    switcher.device_a, switcher.device_b = switcher.get_device_names()[0], 'Headset'
+    switcher.save_config()
+    switcher.close()
+
+    switcher = AudioSwitcher(backend=backend, config_file=config_file)
+    try:
+        backend.plug_in('Headset')
+        settle(switcher)
+        assert 'Headset' not in switcher.get_device_names()
+        result = switcher.request_switch('Headset').result(5)
+        assert result.ok
+        assert switcher.default_ids[ROLE_CONSOLE] == headset
+    finally:
+        switcher.close()
@@ -0,0 +1,78 @@
+import threading
+import time
+
+from audio_backend import DeviceRecord, DEVICE_STATE_ACTIVE, FLOW_RENDER, FORM_FACTOR_HEADSET
+from conftest import settle
+from device_registry import AmbiguousDeviceError, DeviceRegistry
+
+
+def test_plugged_in_and_unplugged_devices_reach_the_listeners(switcher, backend):
+    changes = []
+    switcher.add_device_listener(lambda added, removed: changes.append(
+        ([d.name for d in added], [d.name for d in removed])))
+
+    device_id = backend.plug_in('USB Headset')
+    settle(switcher)
+    assert 'USB Headset' in switcher.get_device_names()
+    backend.unplug(device_id)
+    settle(switcher)
+    assert 'USB Headset' not in switcher.get_device_names()
+    assert changes == [(['USB Headset'], []), ([], ['USB Headset'])]
+
+
+def test_state_change_removes_the_device(switcher, backend):
+    from audio_backend import DEVICE_STATE_DISABLED
+
+    device_id = backend.plug_in('HDMI Output')
+    settle(switcher)
+    backend.set_state(device_id, DEVICE_STATE_DISABLED)
+    settle(switcher)
+    assert device_id not in switcher.devices
+
+
+def test_notifications_avoid_full_enumeration(switcher, backend):
+    enumerations = backend.calls['enumerate_devices']
+    for _ in range(5):
+        backend.unplug(backend.plug_in('Dock Speakers'))
+    settle(switcher)
+    assert backend.calls['enumerate_devices'] == enumerations
+
+
+def test_registry_reads_are_safe_during_updates():
+    twins = [DeviceRecord('{twin-%08d}' % index, 'Headset', DEVICE_STATE_ACTIVE, FLOW_RENDER,
+                          FORM_FACTOR_HEADSET) for index in range(4)]
+    registry = DeviceRegistry(twins[:1])
+    errors = []
+    stop = threading.Event()
+
+    def writer():
+        while not stop.is_set():
+            for device in twins[1:]:
+                registry.add(device)
+            for device in twins[1:]:
+                registry.remove(device.id)
+
+    def reader():
+        while not stop.is_set():
+            try:
+                names = registry.names()
+                registry.find('Headset (%s)' % twins[0].id[-9:-1])
+                list(registry)
+                try:
+                    registry.find('Headset')
+                except AmbiguousDeviceError:
+                    pass
+                assert len(names) == len(set(names))
+            except Exception as e:
+                errors.append(e)
+
+    threads = [threading.Thread(target=writer)] + [threading.Thread(target=reader) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.5)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    # The cached name list matches the final device set
+    assert registry.names() == ('Headset',)
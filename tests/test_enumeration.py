@@ -0,0 +1,29 @@
+import os
+
+from audio_backend import (
+    DEVICE_STATE_ACTIVE, DEVICE_STATE_DISABLED, DEVICE_STATE_UNPLUGGED, FLOW_CAPTURE, FLOW_RENDER,
+    FORM_FACTOR_HEADSET, FORM_FACTOR_MICROPHONE, FORM_FACTOR_SPEAKERS, is_output_endpoint
+)
+from audio_switcher import AudioSwitcher
+from fake_backend import FakeAudioBackend
+
+
+def test_only_active_render_endpoints_are_outputs():
+    assert is_output_endpoint(FLOW_RENDER, DEVICE_STATE_ACTIVE, FORM_FACTOR_SPEAKERS)
+    assert is_output_endpoint(FLOW_RENDER, DEVICE_STATE_ACTIVE, FORM_FACTOR_HEADSET)
+    assert not is_output_endpoint(FLOW_CAPTURE, DEVICE_STATE_ACTIVE, FORM_FACTOR_HEADSET)
+    assert not is_output_endpoint(FLOW_RENDER, DEVICE_STATE_UNPLUGGED, FORM_FACTOR_SPEAKERS)
+    assert not is_output_endpoint(FLOW_RENDER, DEVICE_STATE_DISABLED, FORM_FACTOR_SPEAKERS)
+    assert not is_output_endpoint(FLOW_RENDER, DEVICE_STATE_ACTIVE, FORM_FACTOR_MICROPHONE)
+
+
+def test_stale_endpoints_are_never_listed_or_read(tmp_path):
+    backend = FakeAudioBackend(endpoint_count=2)
+    backend.add_stale_endpoints(50)
+    switcher = AudioSwitcher(backend=backend, config_file=os.path.join(tmp_path, 'audio_config.json'))
+    try:
+        assert switcher.get_device_names() == ('Fake Speakers 1', 'Fake Speakers 2')
+        # Only the active outputs had their property stores opened
+        assert backend.calls['open_property_store'] == 2
+    finally:
+        switcher.close()
@@ -0,0 +1,147 @@
+from collections import namedtuple
+
+import pytest
+
+from hotkey_engine import HotkeyEngine, HotkeyRecorder
+
+KeyEvent = namedtuple('KeyEvent', ['event_type', 'scan_code', 'name'])
+
+SCAN_CODES = {
+    'ctrl': (29,), 'left ctrl': (29,), 'right ctrl': (157,),
+    'shift': (42,), 'left shift': (42,), 'right shift': (54,),
+    'alt': (56,), 'left alt': (56,),
+    'windows': (91,), 'left windows': (91,),
+    'a': (30,), 'c': (46,), 'k': (37,), 'f1': (59,),
+}
+
+
+def resolve(name):
+    try:
+        return SCAN_CODES[name]
+    except KeyError:
+        raise ValueError(f"Unknown key {name}")
+
+
+class KeySource:
+    """Synthetic keyboard: the engine hooks it like the keyboard module"""
+
+    def __init__(self):
+        self.callback = None
+
+    def hook(self, callback):
+        self.callback = callback
+        return callback
+
+    def unhook(self, handle):
+        self.callback = None
+
+    def down(self, key):
+        self.callback(KeyEvent('down', SCAN_CODES[key][0], key))
+
+    def up(self, key):
+        self.callback(KeyEvent('up', SCAN_CODES[key][0], key))
+
+    def press(self, *keys):
+        """Press keys in order and release them in reverse"""
+        for key in keys:
+            self.down(key)
+        for key in reversed(keys):
+            self.up(key)
+
+
+@pytest.fixture
+def keys():
+    return KeySource()
+
+
+@pytest.fixture
+def engine(keys):
+    engine = HotkeyEngine(resolver=resolve, source=keys)
+    engine.start()
+    return engine
+
+
+def test_fires_only_with_exact_modifiers(engine, keys):
+    fired = []
+    engine.add('ctrl+alt+a', lambda: fired.append('a'))
+
+    keys.press('ctrl', 'a')
+    keys.press('ctrl', 'shift', 'alt', 'a')
+    assert fired == []
+    keys.press('ctrl', 'alt', 'a')
+    assert fired == ['a']
+
+
+def test_left_and_right_modifiers_both_count(engine, keys):
+    fired = []
+    engine.add('shift+f1', lambda: fired.append('f1'))
+
+    keys.press('left shift', 'f1')
+    keys.press('right shift', 'f1')
+    assert fired == ['f1', 'f1']
+
+
+def test_chord_sequence(engine, keys):
+    fired = []
+    engine.add('ctrl+k, ctrl+c', lambda: fired.append('chord'))
+
+    keys.press('ctrl', 'k')
+    keys.press('ctrl', 'c')
+    assert fired == ['chord']
+    keys.press('ctrl', 'c')
+    assert fired == ['chord']
+
+
+def test_auto_repeat_fires_only_repeat_bindings(engine, keys):
+    fired = []
+    engine.add('ctrl+a', lambda: fired.append('once'))
+    engine.add('ctrl+f1', lambda: fired.append('held'), repeat=True)
+
+    keys.down('ctrl')
+    for key in ('a', 'f1'):
+        for _ in range(3):
+            keys.down(key)
+        keys.up(key)
+    keys.up('ctrl')
+    assert fired == ['once', 'held', 'held', 'held']
+
+
+def test_conflicting_bindings_are_rejected(engine):
+    engine.add('ctrl+k, ctrl+c', lambda: None)
+    with pytest.raises(ValueError):
+        engine.add('ctrl+k', lambda: None)
+    with pytest.raises(ValueError):
+        engine.parse('ctrl+a+c')
+
+
+def test_removed_binding_stops_firing(engine, keys):
+    fired = []
+    binding = engine.add('alt+a', lambda: fired.append('a'))
+    engine.remove(binding)
+
+    keys.press('alt', 'a')
+    assert fired == []
+
+
+def test_recorder_captures_a_combination_by_scan_code(engine, keys):
+    fired, recorded = [], []
+    engine.add('ctrl+a', lambda: fired.append('a'))
+    HotkeyRecorder(engine, recorded.append, timeout=None).start()
+
+    keys.press('ctrl', 'shift', 'a')
+    assert [(r.hotkey, r.label) for r in recorded] == [('ctrl+shift+sc30', 'ctrl+shift+a')]
+    # Bindings were suspended while recording and are back afterwards
+    assert fired == []
+    keys.press('ctrl', 'a')
+    assert fired == ['a']
+
+
+def test_recorder_waits_for_a_real_key(engine, keys):
+    recorded = []
+    recorder = HotkeyRecorder(engine, recorded.append, timeout=None)
+    recorder.start()
+
+    keys.press('ctrl')
+    assert recorded == []
+    recorder.cancel()
+    assert recorded == [None]
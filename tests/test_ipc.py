@@ -0,0 +1,106 @@
+import os
+import socket
+
+import pytest
+
+from ipc import IpcClient, read_token, token_path, write_token
+
+
+@pytest.fixture
+def server(switcher):
+    switcher.ipc_port = 0
+    server = switcher.start_ipc_server()
+    switcher.device_a, switcher.device_b = switcher.get_device_names()[:2]
+    return server
+
+
+def connect(server):
+    return IpcClient(port=server.address[1], token=server.token)
+
+
+def raw_exchange(server, data):
+    """Send raw bytes and read until the server hangs up"""
+    with socket.create_connection(server.address, timeout=5) as conn:
+        conn.sendall(data)
+        received = b''
+        while True:
+            chunk = conn.recv(4096)
+            if not chunk:
+                return received.decode('utf-8').splitlines()
+            received += chunk
+
+
+def test_token_file_is_private(switcher, server):
+    path = token_path(switcher.config_file)
+    assert read_token(path) == server.token
+    if os.name == 'posix':
+        assert os.stat(path).st_mode & 0o777 == 0o600
+
+
+def test_new_token_replaces_a_wider_file(tmp_path):
+    path = str(tmp_path / 'audio_switcher.token')
+    with open(path, 'w') as f:
+        f.write('old')
+    os.chmod(path, 0o666)
+
+    token = write_token(path)
+    assert read_token(path) == token != 'old'
+    if os.name == 'posix':
+        assert os.stat(path).st_mode & 0o777 == 0o600
+
+
+def test_pipelined_responses_come_back_in_order(switcher, server):
+    a, b = switcher.device_a, switcher.device_b
+    with connect(server) as client:
+        responses = client.pipeline(['ping', 'toggle', 'current', 'list'])
+        responses += client.pipeline([f'switch {a}', 'current'])
+
+    assert [response['ok'] for response in responses] == [True] * 6
+    assert responses[0]['result'] == 'pong'
+    assert responses[1]['result']['target'] == b
+    assert responses[2]['result'] == b
+    assert responses[3]['result'] == list(switcher.get_device_names())
+    assert responses[5]['result'] == a
+
+
+def test_switch_supersedes_a_pipelined_toggle(switcher, server):
+    with connect(server) as client:
+        toggle, switch = client.pipeline(['toggle', f'switch {switcher.device_a}'])
+
+    assert switch['ok']
+    assert toggle['ok'] or 'Superseded' in toggle['error']
+
+
+def test_failed_switch_does_not_take_the_toggle_with_it(server):
+    with connect(server) as client:
+        toggle, switch = client.pipeline(['toggle', 'switch Nope'])
+
+    assert toggle['ok']
+    assert not switch['ok']
+    assert switch['result']['target'] == 'Nope'
+
+
+def test_connection_without_token_is_refused(switcher, server):
+    lines = raw_exchange(server, b'POST / HTTP/1.1\r\nHost: localhost\r\n\r\ntoggle\n')
+
+    assert len(lines) == 1
+    assert '"ok": false' in lines[0]
+    assert switcher.metrics['requested'] == 0
+    with pytest.raises(PermissionError):
+        IpcClient(port=server.address[1], token='wrong')
+
+
+def test_unknown_command_closes_the_connection(switcher, server):
+    data = f'auth {server.token}\nping\nbogus\ntoggle\n'.encode('utf-8')
+    lines = raw_exchange(server, data)
+
+    assert len(lines) == 3
+    assert 'Unknown command' in lines[2]
+    assert switcher.metrics['requested'] == 0
+
+
+def test_invalid_utf8_closes_the_connection(server):
+    lines = raw_exchange(server, f'auth {server.token}\n'.encode('utf-8') + b'\xff\xfe\nping\n')
+
+    assert len(lines) == 2
+    assert '"ok": false' in lines[1]
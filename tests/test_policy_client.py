@@ -0,0 +1,37 @@
+import os
+
+from audio_switcher import AudioSwitcher
+from fake_backend import FakeAudioBackend
+
+
+def test_client_is_created_once_and_reused(switcher, backend):
+    a, b = switcher.get_device_names()[:2]
+    for name in (b, a, b):
+        assert switcher.switch_to_device(name)
+    assert backend.calls['create_policy_client'] == 1
+
+
+def test_stale_client_is_rebuilt(switcher, backend):
+    a, b = switcher.get_device_names()[:2]
+    assert switcher.switch_to_device(b)
+
+    switcher.worker.call(backend.expire_policy_client)
+    assert switcher.switch_to_device(a)
+    assert backend.calls['create_policy_client'] == 2
+    assert switcher.current_device_label() == a
+
+
+def test_working_clsid_is_remembered(tmp_path):
+    config_file = os.path.join(tmp_path, 'audio_config.json')
+    switcher = AudioSwitcher(backend=FakeAudioBackend(), config_file=config_file)
+    switcher.warm_up().result(5)
+    clsid = switcher.policy_clsid
+    switcher.close()
+    assert clsid
+
+    backend = FakeAudioBackend()
+    switcher = AudioSwitcher(backend=backend, config_file=config_file)
+    try:
+        assert backend.preferred_clsid == clsid
+    finally:
+        switcher.close()
@@ -0,0 +1,28 @@
+from conftest import settle
+
+
+def test_scene_sets_volume_before_switching(switcher, backend):
+    target = switcher.get_device_names()[1]
+    device_id = switcher.devices.find(target).id
+    switcher.scenes = {'Night': {'device': target, 'volume': 20, 'mute': False}}
+    levels = []
+    switcher.add_default_listener(lambda role, new_id: levels.append(backend.endpoints[new_id]['volume']))
+
+    result = switcher.request_scene('Night').result(5)
+    settle(switcher)
+    assert result.ok
+    assert backend.endpoints[device_id]['volume'] == 0.2
+    assert levels and set(levels) == {0.2}
+    assert not switcher.request_scene('Nope').result(5).ok
+
+
+def test_scene_without_volume_only_mutes(switcher, backend):
+    target = switcher.get_device_names()[2]
+    device_id = switcher.devices.find(target).id
+    volume = backend.endpoints[device_id]['volume']
+    switcher.scenes = {'Meeting': {'device': target, 'mute': True}}
+
+    assert switcher.request_scene('Meeting').result(5).ok
+    assert backend.endpoints[device_id]['muted']
+    assert backend.endpoints[device_id]['volume'] == volume
+    assert switcher.current_device_label() == target
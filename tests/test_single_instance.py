@@ -0,0 +1,49 @@
+import json
+import uuid
+
+from audio_switcher import forward_to_running_instance, launch_commands, parse_args
+from single_instance import InstanceLock
+
+
+def test_second_lock_is_refused_until_release():
+    name = f"AudioSwitcherTest-{uuid.uuid4().hex}"
+    first, second = InstanceLock(name), InstanceLock(name)
+    try:
+        assert first.acquire()
+        assert not second.acquire()
+        first.release()
+        assert second.acquire()
+    finally:
+        first.release()
+        second.release()
+
+
+def test_launch_commands():
+    assert launch_commands(parse_args([])) == []
+    assert launch_commands(parse_args(['--show', '--switch', 'Speakers', '--toggle'])) == \
+        ['show', 'switch Speakers', 'toggle']
+
+
+def write_port(switcher, port):
+    with open(switcher.config_file, 'w') as f:
+        json.dump({'ipc_port': port}, f)
+
+
+def test_arguments_are_forwarded_to_the_running_instance(switcher):
+    switcher.ipc_port = 0
+    server = switcher.start_ipc_server()
+    target = switcher.get_device_names()[2]
+    write_port(switcher, server.address[1])
+
+    args = parse_args(['--switch', target])
+    assert forward_to_running_instance(args, config_file=switcher.config_file) == 0
+    assert switcher.get_current_device() == target
+
+    args = parse_args(['--switch', 'No Such Device'])
+    assert forward_to_running_instance(args, config_file=switcher.config_file) == 1
+
+
+def test_forwarding_needs_the_control_endpoint(switcher, capsys):
+    write_port(switcher, None)
+    assert forward_to_running_instance(parse_args([]), config_file=switcher.config_file) == 1
+    assert "control endpoint disabled" in capsys.readouterr().out
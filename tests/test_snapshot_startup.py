@@ -0,0 +1,88 @@
+import os
+import time
+
+import pytest
+
+from audio_switcher import AudioSwitcher
+from conftest import settle
+from fake_backend import FakeAudioBackend
+
+ENUMERATE_DELAY = 0.5
+
+
+@pytest.fixture
+def config_file(tmp_path):
+    return os.path.join(tmp_path, 'audio_config.json')
+
+
+@pytest.fixture
+def backend(config_file):
+    """A backend whose devices were seen by an earlier run, with A/B saved"""
+    backend = FakeAudioBackend(endpoint_count=3)
+    first = AudioSwitcher(backend=backend, config_file=config_file)
+    first.device_a, first.device_b = first.get_device_names()[:2]
+    first.save_config()
+    first.close()
+    return backend
+
+
+def start(backend, config_file):
+    backend.delays['enumerate_devices'] = ENUMERATE_DELAY
+    return AudioSwitcher(backend=backend, config_file=config_file)
+
+
+def test_first_toggle_does_not_wait_for_the_enumeration(backend, config_file):
+    switcher = start(backend, config_file)
+    try:
+        started = time.perf_counter()
+        result = switcher.request_toggle().result()
+        elapsed = time.perf_counter() - started
+        assert result.ok
+        assert elapsed < ENUMERATE_DELAY / 2
+        assert not switcher.devices_reconciled
+
+        # The reconcile follows the switch
+        settle(switcher)
+        assert switcher.devices_reconciled
+    finally:
+        switcher.close()
+
+
+def test_warm_up_is_followed_by_the_reconcile(backend, config_file):
+    enumerations = backend.calls['enumerate_devices']
+    switcher = start(backend, config_file)
+    try:
+        switcher.warm_up().result()
+        assert not switcher.devices_reconciled
+        settle(switcher)
+        assert switcher.devices_reconciled
+        assert backend.calls['enumerate_devices'] == enumerations + 1
+    finally:
+        switcher.close()
+
+
+def test_reconcile_runs_without_a_switch(backend, config_file, monkeypatch):
+    monkeypatch.setattr('audio_switcher.RECONCILE_DELAY', 0.05)
+    switcher = start(backend, config_file)
+    try:
+        deadline = time.monotonic() + 5
+        while not switcher.devices_reconciled and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert switcher.devices_reconciled
+    finally:
+        switcher.close()
+
+
+def test_device_gone_since_the_snapshot_is_reported(backend, config_file):
+    switcher = start(backend, config_file)
+    try:
+        name = switcher.get_device_names()[2]
+        gone = switcher.devices.find(name).id
+        backend.endpoints.pop(gone)
+
+        result = switcher.request_switch(name).result()
+        assert not result.ok
+        assert switcher.devices_reconciled
+        assert name not in switcher.get_device_names()
+    finally:
+        switcher.close()
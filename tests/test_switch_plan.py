@@ -0,0 +1,95 @@
+from audio_backend import (
+    DeviceRecord, DEVICE_STATE_ACTIVE, FLOW_RENDER, FORM_FACTOR_SPEAKERS,
+    ROLE_COMMUNICATIONS, ROLE_CONSOLE, ROLE_MULTIMEDIA
+)
+from device_registry import DeviceRegistry
+from switch_plan import SwitchPlan
+
+ALL_ROLES = ['console', 'multimedia', 'communications']
+
+
+def record(device_id, name):
+    return DeviceRecord(device_id, name, DEVICE_STATE_ACTIVE, FLOW_RENDER, FORM_FACTOR_SPEAKERS)
+
+
+SPEAKERS = record('{speakers-0001}', 'Speakers')
+HEADSET = record('{headset-0002}', 'Headset')
+HDMI_1 = record('{hdmi-11111111}', 'HDMI')
+HDMI_2 = record('{hdmi-22222222}', 'HDMI')
+
+
+def compile_plan(registry, ring=('Speakers', 'Headset'), roles=None, device_ids=None):
+    roles = roles or {}
+    return SwitchPlan(registry, ring, lambda name: roles.get(name, ALL_ROLES), device_ids)
+
+
+def test_targets_are_resolved_once():
+    plan = compile_plan(DeviceRegistry([SPEAKERS, HEADSET]),
+                        roles={'Headset': ['communications']})
+
+    assert plan.ok
+    speakers, headset = plan.targets
+    assert (speakers.id, speakers.roles) == (SPEAKERS.id, (ROLE_CONSOLE, ROLE_MULTIMEDIA, ROLE_COMMUNICATIONS))
+    assert (headset.id, headset.role_names) == (HEADSET.id, ('communications',))
+    assert plan.opposite[SPEAKERS.id] is headset
+    assert plan.opposite[HEADSET.id] is speakers
+
+
+def test_step_from_inside_and_outside_the_ring():
+    plan = compile_plan(DeviceRegistry([SPEAKERS, HEADSET, HDMI_1]))
+
+    assert plan.step(SPEAKERS.id, 1).id == HEADSET.id
+    assert plan.step(SPEAKERS.id, 2).id == SPEAKERS.id
+    assert plan.step(HEADSET.id, 3).id == SPEAKERS.id
+    # The first toggle from another device goes to device A
+    assert plan.step(HDMI_1.id, 1).id == SPEAKERS.id
+    assert plan.step(None, 2).id == HEADSET.id
+
+
+def test_unusable_plans_say_why():
+    registry = DeviceRegistry([SPEAKERS, HDMI_1, HDMI_2])
+
+    plan = compile_plan(registry, ring=('Speakers', None))
+    assert not plan.ok and plan.error_target is None
+
+    plan = compile_plan(registry)
+    assert not plan.ok
+    assert (plan.error, plan.error_target) == ("Device not found", 'Headset')
+
+    plan = compile_plan(registry, ring=('Speakers', 'HDMI'))
+    assert not plan.ok and plan.error_target == 'HDMI'
+    assert 'matches 2 devices' in plan.error
+
+    # The endpoint ID saved with the name picks one of the twins
+    plan = compile_plan(registry, ring=('Speakers', 'HDMI'), device_ids={'HDMI': HDMI_2.id})
+    assert plan.ok and plan.targets[1].id == HDMI_2.id
+
+
+def test_plan_goes_stale_with_the_registry_or_the_ring():
+    registry = DeviceRegistry([SPEAKERS, HEADSET])
+    plan = compile_plan(registry)
+    assert plan.is_current(registry, ('Speakers', 'Headset'))
+    assert not plan.is_current(registry, ('Headset', 'Speakers'))
+
+    registry.add(HDMI_1)
+    assert not plan.is_current(registry, ('Speakers', 'Headset'))
+
+
+def test_switcher_recompiles_only_when_needed(switcher):
+    switcher.device_a, switcher.device_b = switcher.get_device_names()[:2]
+    switcher.warm_up().result()
+    plan = switcher.switch_plan()
+    assert switcher.switch_plan() is plan
+
+    switcher.device_b = switcher.get_device_names()[2]
+    assert switcher.switch_plan() is not plan
+    assert switcher.switch_plan().targets[1].label == switcher.device_b
+
+
+def test_toggle_alternates_between_a_and_b(switcher):
+    switcher.device_a, switcher.device_b = switcher.get_device_names()[:2]
+
+    first = switcher.request_toggle().result(5)
+    second = switcher.request_toggle().result(5)
+    assert (first.target, second.target) == (switcher.device_b, switcher.device_a)
+    assert switcher.current_device_label() == switcher.device_a
@@ -0,0 +1,133 @@
+import threading
+
+import pytest
+
+from com_worker import ComWorker
+from fake_backend import FakeAudioBackend
+from switch_queue import SwitchQueue
+
+
+@pytest.fixture
+def worker():
+    worker = ComWorker(FakeAudioBackend())
+    worker.start()
+    yield worker
+    worker.stop()
+
+
+class Recorder:
+    """execute() for the queue: records the batches it is given"""
+
+    def __init__(self):
+        self.batches = []
+
+    def __call__(self, target, steps):
+        self.batches.append((target, [list(step) for step in steps]))
+        return ('result', target, len(self.batches))
+
+
+def blocked(worker):
+    """Hold the worker until the returned event is set, so requests pile up"""
+    release = threading.Event()
+    worker.submit(release.wait, 5)
+    return release
+
+
+def make_queue(worker):
+    execute = Recorder()
+    return SwitchQueue(worker, execute, lambda name: ('superseded', name)), execute
+
+
+def test_toggles_collapse_into_one_batch(worker):
+    queue, execute = make_queue(worker)
+    release = blocked(worker)
+    futures = [queue.toggle() for _ in range(3)]
+    release.set()
+
+    results = [future.result(5) for future in futures]
+    assert execute.batches == [(None, [[None, 3]])]
+    assert results == [('result', None, 1)] * 3
+    assert queue.metrics['executed'] == 1
+    assert queue.metrics['collapsed'] == 2
+
+
+def test_steps_through_different_rings_stay_in_order(worker):
+    queue, execute = make_queue(worker)
+    release = blocked(worker)
+    queue.toggle()
+    queue.cycle(('a', 'b', 'c'))
+    queue.cycle(('a', 'b', 'c'))
+    last = queue.toggle()
+    release.set()
+
+    last.result(5)
+    assert execute.batches == [(None, [[None, 1], [('a', 'b', 'c'), 2], [None, 1]])]
+
+
+def test_switch_supersedes_pending_requests(worker):
+    queue, execute = make_queue(worker)
+    release = blocked(worker)
+    toggle = queue.toggle()
+    first = queue.switch('A')
+    second = queue.switch('B')
+    release.set()
+
+    assert toggle.result(5) == ('superseded', 'A')
+    assert first.result(5) == ('superseded', 'B')
+    assert second.result(5) == ('result', 'B', 1)
+    assert execute.batches == [('B', [])]
+    assert queue.metrics['superseded'] == 2
+
+
+def test_steps_after_a_switch_join_its_batch(worker):
+    queue, execute = make_queue(worker)
+    release = blocked(worker)
+    switch = queue.switch('A')
+    toggle = queue.toggle()
+    release.set()
+
+    assert switch.result(5) == toggle.result(5) == ('result', 'A', 1)
+    assert execute.batches == [('A', [[None, 1]])]
+
+
+def test_requests_after_a_batch_started_get_a_new_batch(worker):
+    queue, execute = make_queue(worker)
+    first = queue.toggle()
+    first.result(5)
+    second = queue.toggle()
+
+    assert second.result(5) == ('result', None, 2)
+    assert len(execute.batches) == 2
+
+
+def test_errors_reach_every_request(worker):
+    def execute(target, steps):
+        raise RuntimeError("no policy client")
+
+    queue = SwitchQueue(worker, execute)
+    release = blocked(worker)
+    futures = [queue.toggle(), queue.toggle()]
+    release.set()
+
+    for future in futures:
+        with pytest.raises(RuntimeError):
+            future.result(5)
+
+
+def test_requests_carry_the_batch_timings(worker):
+    queue, _ = make_queue(worker)
+    future = queue.toggle()
+    future.result(5)
+
+    assert future.timings['queued'] <= future.timings['started'] <= future.timings['finished']
+
+
+def test_unknown_switch_leaves_pending_toggle_alone(switcher):
+    switcher.device_a, switcher.device_b = switcher.get_device_names()[:2]
+
+    toggle = switcher.request_toggle()
+    failed = switcher.request_switch('Nope')
+    assert not failed.result(5).ok
+    assert failed.result(5).target == 'Nope'
+    assert toggle.result(5).ok
+    assert toggle.result(5).target == switcher.device_b
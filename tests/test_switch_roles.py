@@ -0,0 +1,79 @@
+import threading
+
+from audio_backend import ROLE_COMMUNICATIONS, ROLE_CONSOLE, ROLE_MULTIMEDIA
+
+
+def test_switch_sets_every_role_and_reports_each(switcher, backend):
+    target = switcher.get_device_names()[1]
+    device_id = switcher.devices.find(target).id
+
+    result = switcher.request_switch(target).result(5)
+    assert result.ok
+    assert result.roles == {'console': True, 'multimedia': True, 'communications': True}
+    assert backend.default_ids == {ROLE_CONSOLE: device_id, ROLE_MULTIMEDIA: device_id,
+                                   ROLE_COMMUNICATIONS: device_id}
+    assert backend.calls['create_policy_client'] == 1
+
+
+def test_device_roles_limit_what_is_set(switcher, backend):
+    target = switcher.get_device_names()[1]
+    switcher.device_roles[target] = ['communications']
+
+    result = switcher.request_switch(target).result(5)
+    assert result.roles == {'communications': True}
+    assert backend.default_ids[ROLE_COMMUNICATIONS] == switcher.devices.find(target).id
+    assert backend.default_ids[ROLE_CONSOLE] != switcher.devices.find(target).id
+
+
+def test_failed_roles_are_reported(switcher, backend):
+    target = switcher.get_device_names()[1]
+    device_id = switcher.devices.find(target).id
+    original = backend.set_default_endpoint
+
+    def flaky(device_id, role=ROLE_CONSOLE):
+        if role == ROLE_MULTIMEDIA:
+            return False
+        return original(device_id, role)
+
+    backend.set_default_endpoint = flaky
+    result = switcher.request_switch(target).result(5)
+    assert not result.ok
+    assert result.roles == {'console': True, 'multimedia': False, 'communications': True}
+    assert 'multimedia' in result.error
+    assert backend.default_ids[ROLE_CONSOLE] == device_id
+
+
+def toggle_targets(switcher, count):
+    return [switcher.request_toggle().result(5).target for _ in range(count)]
+
+
+def test_toggle_without_the_console_role(switcher, backend):
+    a, b = switcher.device_a, switcher.device_b = switcher.get_device_names()[:2]
+    switcher.device_roles = {a: ['communications'], b: ['communications']}
+    switcher.compile_switch_plan()
+
+    assert toggle_targets(switcher, 4) == [b, a, b, a]
+    assert backend.default_ids[ROLE_COMMUNICATIONS] == switcher.devices.find(a).id
+
+
+def test_toggle_between_devices_with_no_role_in_common(switcher, backend):
+    a, b = switcher.device_a, switcher.device_b = switcher.get_device_names()[:2]
+    switcher.device_roles = {a: ['console'], b: ['communications']}
+    switcher.compile_switch_plan()
+
+    assert toggle_targets(switcher, 4) == [b, a, b, a]
+
+
+def test_coalesced_toggles_without_the_console_role(switcher, backend):
+    a, b = switcher.device_a, switcher.device_b = switcher.get_device_names()[:2]
+    switcher.device_roles = {a: ['communications'], b: ['communications']}
+    switcher.compile_switch_plan()
+    switcher.request_toggle().result(5)
+
+    # A toggle then a cycle step run as one mixed batch, starting from B
+    release = threading.Event()
+    switcher.worker.submit(release.wait, 5)
+    toggle = switcher.request_toggle()
+    cycle = switcher.request_cycle([a, b])
+    release.set()
+    assert toggle.result(5).target == cycle.result(5).target == b
@@ -0,0 +1,47 @@
+import json
+import time
+
+import pytest
+
+from tracing import Tracer
+
+
+def test_disabled_tracer_records_nothing():
+    tracer = Tracer()
+    with tracer.span('com.set_default'):
+        pass
+    tracer.instant('hotkey.press')
+    assert tracer.events() == []
+
+
+def test_buffer_keeps_the_newest_spans():
+    tracer = Tracer(capacity=2)
+    tracer.enable()
+    for index in range(3):
+        with tracer.span('step', index=index):
+            pass
+    assert [args['index'] for *_, args in tracer.events()] == [1, 2]
+
+
+def test_export_writes_chrome_trace_json(tmp_path):
+    tracer = Tracer()
+    tracer.enable()
+    with tracer.span('com.set_default', role='console', device=object()):
+        time.sleep(0.001)
+    with pytest.raises(ValueError):
+        with tracer.span('config.save'):
+            raise ValueError("disk full")
+    tracer.instant('hotkey.press')
+
+    path = tmp_path / 'trace.json'
+    assert tracer.export(str(path)) == 3
+    trace = json.loads(path.read_text())
+    events = {event['name']: event for event in trace['traceEvents']}
+
+    assert events['thread_name']['ph'] == 'M'
+    span = events['com.set_default']
+    assert (span['ph'], span['cat'], span['args']['role']) == ('X', 'com', 'console')
+    assert isinstance(span['args']['device'], str)
+    assert span['dur'] > 0
+    assert 'disk full' in events['config.save']['args']['error']
+    assert events['hotkey.press']['ph'] == 'i'
@@ -0,0 +1,46 @@
+from audio_switcher import AudioSwitcherGUI
+from tray_icons import TOOLTIP_MAX, tooltip
+
+
+class FakeIcon:
+    """pystray.Icon stand-in counting menu refreshes"""
+
+    def __init__(self):
+        self.icon = None
+        self.title = None
+        self.menu_updates = 0
+
+    def update_menu(self):
+        self.menu_updates += 1
+
+
+class FakeIconCache:
+    def get(self, label):
+        return f"image for {label}"
+
+
+def make_gui():
+    # Only the tray state; no Tk window, PIL or pystray
+    gui = AudioSwitcherGUI.__new__(AudioSwitcherGUI)
+    gui.tray_icon = FakeIcon()
+    gui.tray_icons = FakeIconCache()
+    gui._tray_current = None
+    return gui
+
+
+def test_tray_is_only_touched_when_the_device_changes():
+    gui = make_gui()
+    gui.update_tray('Speakers')
+    gui.update_tray('Speakers')
+
+    icon = gui.tray_icon
+    assert (icon.icon, icon.title) == ('image for Speakers', 'Audio Switcher - Speakers')
+    assert icon.menu_updates == 1
+
+    gui.update_tray('Headset')
+    assert icon.icon == 'image for Headset'
+    assert icon.menu_updates == 2
+
+
+def test_tooltip_fits_the_notification_area():
+    assert len(tooltip('Speakers ' * 30)) == TOOLTIP_MAX
@@ -0,0 +1,55 @@
+import queue
+
+from audio_switcher import AudioSwitcherGUI, UI_POLL_IDLE_MS, UI_POLL_MS
+
+
+class FakeRoot:
+    """Records the delays the poller reschedules itself with"""
+
+    def __init__(self):
+        self.delays = []
+
+    def after(self, delay, callback):
+        self.delays.append(delay)
+
+
+def make_gui():
+    # Only the posting machinery; no Tk window
+    gui = AudioSwitcherGUI.__new__(AudioSwitcherGUI)
+    gui.ui_queue = queue.Queue()
+    gui._poll_delay = UI_POLL_MS
+    gui.root = FakeRoot()
+    return gui
+
+
+def test_posted_work_runs_in_order_on_the_poller():
+    gui = make_gui()
+    done = []
+    gui.post(done.append, 1)
+    gui.post(done.append, 2)
+
+    gui._poll_ui_queue()
+    assert done == [1, 2]
+
+
+def test_poller_backs_off_while_idle_and_speeds_up_for_work():
+    gui = make_gui()
+    for _ in range(10):
+        gui._poll_ui_queue()
+    assert gui.root.delays[-1] == UI_POLL_IDLE_MS
+    assert gui.root.delays == sorted(gui.root.delays)
+
+    gui.post(lambda: None)
+    gui._poll_ui_queue()
+    assert gui.root.delays[-1] == UI_POLL_MS
+
+
+def test_failing_work_does_not_stop_the_poller():
+    gui = make_gui()
+    done = []
+    gui.post(lambda: 1 / 0)
+    gui.post(done.append, 'after')
+
+    gui._poll_ui_queue()
+    assert done == ['after']
+    assert len(gui.root.delays) == 1
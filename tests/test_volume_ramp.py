@@ -0,0 +1,63 @@
+import time
+
+import pytest
+
+from com_worker import ComWorker
+from fake_backend import FakeAudioBackend
+from volume_ramp import VolumeRamp
+
+
+@pytest.fixture
+def worker():
+    worker = ComWorker(FakeAudioBackend())
+    worker.start()
+    yield worker
+    worker.stop()
+
+
+def wait_idle(ramp, timeout=5):
+    deadline = time.monotonic() + timeout
+    while ramp.active():
+        assert time.monotonic() < deadline, "fade never finished"
+        time.sleep(0.005)
+
+
+def test_held_key_merges_into_one_fade(worker):
+    backend = worker.backend
+    device_id = backend.default_id
+    ramp = VolumeRamp(worker, tick=0.01, duration=0.05)
+
+    for _ in range(10):
+        ramp.step(device_id, 0.02)
+    wait_idle(ramp)
+
+    assert backend.endpoints[device_id]['volume'] == pytest.approx(0.7)
+    assert ramp.metrics['steps'] == 10
+    assert ramp.metrics['merged'] == 9
+    assert ramp.metrics['fades'] == 1
+    assert backend.calls['activate_endpoint_volume'] == 1
+    assert backend.calls['set_master_volume'] == ramp.metrics['updates']
+
+
+def test_level_is_clamped(worker):
+    backend = worker.backend
+    device_id = backend.default_id
+    ramp = VolumeRamp(worker, tick=0.01, duration=0.02)
+
+    ramp.step(device_id, 0.8)
+    wait_idle(ramp)
+    assert backend.endpoints[device_id]['volume'] == 1.0
+    ramp.step(device_id, -2.0)
+    wait_idle(ramp)
+    assert backend.endpoints[device_id]['volume'] == 0.0
+
+
+def test_unplugged_endpoint_ends_its_fade(worker):
+    backend = worker.backend
+    device_id = backend.plug_in('USB Headset')
+    ramp = VolumeRamp(worker, tick=0.01, duration=0.5)
+
+    ramp.step(device_id, 0.1)
+    backend.unplug(device_id)
+    wait_idle(ramp)
+    assert device_id not in backend.endpoints
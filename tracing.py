@@ -0,0 +1,126 @@
+"""
+Lightweight timing spans for the hot paths
+Spans go into a bounded in-memory ring buffer and can be exported as Chrome
+trace-event JSON (chrome://tracing, Perfetto) with --trace FILE. While
+tracing is disabled, span() returns a shared no-op context manager: no clock
+read, no allocation beyond the keyword arguments and no buffer write. That
+is a fraction of a microsecond, so spans go around COM calls, file I/O and
+UI updates; code that runs on every keystroke checks tracer.enabled instead.
+"""
+
+import json
+import os
+import threading
+import time
+from collections import deque
+
+# Spans kept in memory; older ones are dropped first
+DEFAULT_CAPACITY = 20000
+
+_origin = time.perf_counter_ns()
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ('tracer', 'name', 'args', 'start')
+
+    def __init__(self, tracer, name, args):
+        self.tracer = tracer
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.args['error'] = repr(exc)
+        self.tracer._record(self.name, self.start, time.perf_counter_ns(), self.args)
+        return False
+
+
+class Tracer:
+    """Bounded buffer of completed spans"""
+
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        self.enabled = False
+        self._events = deque(maxlen=capacity)
+        self._thread_names = {}
+
+    def enable(self):
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def span(self, name, **args):
+        """Context manager timing the block as a span called name"""
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, name, args)
+
+    def complete(self, name, start, end, **args):
+        """Record a span from perf_counter() timestamps taken elsewhere"""
+        if self.enabled:
+            self._record(name, int(start * 1e9), int(end * 1e9), args)
+
+    def instant(self, name, **args):
+        """Record a zero-length marker"""
+        if self.enabled:
+            now = time.perf_counter_ns()
+            self._record(name, now, now, args)
+
+    def _record(self, name, start_ns, end_ns, args):
+        thread_id = threading.get_ident()
+        if thread_id not in self._thread_names:
+            self._thread_names[thread_id] = threading.current_thread().name
+        # deque.append is atomic, so no lock is needed on the recording side
+        self._events.append((name, start_ns, end_ns, thread_id, args))
+
+    def events(self):
+        """Recorded spans as (name, start_ns, end_ns, thread id, args), oldest first"""
+        return list(self._events)
+
+    def clear(self):
+        self._events.clear()
+
+    def export(self, path):
+        """Write the buffer as Chrome trace-event JSON; returns the number of spans"""
+        pid = os.getpid()
+        events = self.events()
+        trace = []
+        for thread_id, name in list(self._thread_names.items()):
+            trace.append({'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': thread_id,
+                          'args': {'name': name}})
+        for name, start_ns, end_ns, thread_id, args in events:
+            trace.append({
+                'name': name,
+                'cat': name.split('.', 1)[0],
+                'ph': 'X' if end_ns > start_ns else 'i',
+                'ts': (start_ns - _origin) / 1000.0,
+                'dur': (end_ns - start_ns) / 1000.0,
+                'pid': pid,
+                'tid': thread_id,
+                'args': {key: value if isinstance(value, (int, float, bool, type(None))) else str(value)
+                         for key, value in args.items()},
+            })
+        with open(path, 'w') as f:
+            json.dump({'traceEvents': trace, 'displayTimeUnit': 'ms'}, f)
+        return len(events)
+
+
+# Process-wide tracer used by the instrumented modules
+tracer = Tracer()
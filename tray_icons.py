@@ -0,0 +1,78 @@
+"""
+Per-device tray icon variants
+The base icon is decoded once; each device gets a variant with a coloured
+badge and its initial, rendered when the device first appears and kept in a
+cache. Switching devices or opening the tray menu only swaps cached images.
+"""
+
+# Badge colours: device A, device B, then the other devices in turn
+BADGE_A = (46, 160, 67, 255)
+BADGE_B = (33, 118, 214, 255)
+BADGE_OTHERS = [(214, 120, 33, 255), (142, 68, 173, 255), (192, 57, 43, 255), (22, 160, 133, 255)]
+BADGE_UNKNOWN = (120, 120, 120, 255)
+
+ICON_SIZE = 64
+# NOTIFYICONDATA holds 128 characters of tooltip including the terminator
+TOOLTIP_MAX = 127
+
+
+class TrayIconCache:
+    """Device label -> pre-rendered PIL image"""
+
+    def __init__(self, base_path):
+        from PIL import Image
+        self._base = Image.open(base_path).convert('RGBA').resize((ICON_SIZE, ICON_SIZE))
+        self._images = {}
+        self.device_a = None
+        self.device_b = None
+
+    def set_pair(self, device_a, device_b):
+        """Colour A and B consistently; drops their old variants if the pair changed"""
+        if (device_a, device_b) != (self.device_a, self.device_b):
+            for label in (self.device_a, self.device_b, device_a, device_b):
+                self._images.pop(label, None)
+            self.device_a, self.device_b = device_a, device_b
+
+    def prerender(self, labels):
+        """Render the variants that are not cached yet"""
+        for index, label in enumerate(labels):
+            if label not in self._images:
+                self._images[label] = self._render(label, self._colour(label, index))
+
+    def get(self, label):
+        """Cached variant for label; the plain icon for unknown devices"""
+        image = self._images.get(label)
+        if image is None:
+            image = self._images.get(None)
+            if image is None:
+                image = self._images[None] = self._render(None, BADGE_UNKNOWN)
+        return image
+
+    def _colour(self, label, index):
+        if label == self.device_a:
+            return BADGE_A
+        if label == self.device_b:
+            return BADGE_B
+        return BADGE_OTHERS[index % len(BADGE_OTHERS)]
+
+    def _render(self, label, colour):
+        from PIL import ImageDraw
+
+        image = self._base.copy()
+        if label is None:
+            return image
+        draw = ImageDraw.Draw(image)
+        size = ICON_SIZE // 2
+        box = (ICON_SIZE - size, ICON_SIZE - size, ICON_SIZE - 1, ICON_SIZE - 1)
+        draw.ellipse(box, fill=colour, outline=(255, 255, 255, 255), width=2)
+        initial = label.strip()[:1].upper() or '?'
+        left, top, right, bottom = draw.textbbox((0, 0), initial)
+        x = box[0] + (size - (right - left)) / 2 - left
+        y = box[1] + (size - (bottom - top)) / 2 - top
+        draw.text((x, y), initial, fill=(255, 255, 255, 255))
+        return image
+
+
+def tooltip(label):
+    """Tray tooltip naming the current device"""
+    return f"Audio Switcher - {label}"[:TOOLTIP_MAX]
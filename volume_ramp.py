@@ -0,0 +1,138 @@
+"""
+Timed volume fades for the volume hotkeys
+Every press moves a per-endpoint target level; the level heard fades towards
+it in ticks run on the COM worker. Presses that arrive while a fade is
+running, such as keyboard auto-repeat on a held key, only move the target,
+so a held key costs one SetMasterVolumeLevelScalar per tick instead of one
+Activate and one set call per repeat. The tick thread runs only while a fade
+is in progress.
+"""
+
+import threading
+import time
+from collections import Counter
+
+# Seconds between volume updates while fading
+RAMP_TICK = 0.08
+# Seconds a fade takes to reach its target after the last press
+RAMP_DURATION = 0.24
+
+
+class _Ramp:
+    __slots__ = ('delta', 'start_level', 'start_time', 'target', 'applied')
+
+    def __init__(self, delta):
+        # Steps collected before the current level has been read
+        self.delta = delta
+        self.start_level = None
+        self.start_time = None
+        self.target = None
+        self.applied = None
+
+    def level_at(self, now, duration):
+        progress = (now - self.start_time) / duration if duration > 0 else 1.0
+        if progress >= 1.0:
+            return self.target
+        return self.start_level + (self.target - self.start_level) * progress
+
+
+def _clamp(level):
+    return min(max(level, 0.0), 1.0)
+
+
+class VolumeRamp:
+    """Merges volume steps per endpoint into fades applied on the COM worker"""
+
+    def __init__(self, worker, tick=RAMP_TICK, duration=RAMP_DURATION):
+        """
+        worker: ComWorker whose backend owns the endpoint-volume interfaces
+        tick: seconds between updates while fading
+        duration: seconds from the last step to reaching the target
+        """
+        self._worker = worker
+        self.tick = tick
+        self.duration = duration
+        self._lock = threading.Lock()
+        self._ramps = {}
+        self._thread = None
+        # steps: step() calls, merged: steps folded into a running fade,
+        # updates: volume set calls, fades: fades completed
+        self.metrics = Counter()
+
+    def step(self, device_id, delta):
+        """Move device_id's target level by delta (-1.0 to 1.0); never blocks"""
+        with self._lock:
+            self.metrics['steps'] += 1
+            ramp = self._ramps.get(device_id)
+            if ramp is None:
+                self._ramps[device_id] = _Ramp(delta)
+            else:
+                self.metrics['merged'] += 1
+                if ramp.target is None:
+                    ramp.delta += delta
+                else:
+                    # Continue from the level reached so far towards the new target
+                    now = time.monotonic()
+                    ramp.start_level = ramp.level_at(now, self.duration)
+                    ramp.start_time = now
+                    ramp.target = _clamp(ramp.target + delta)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="VolumeRamp", daemon=True)
+                self._thread.start()
+
+    def cancel(self, device_id=None):
+        """Stop fading device_id (every endpoint for None) where it is now"""
+        with self._lock:
+            if device_id is None:
+                self._ramps.clear()
+            else:
+                self._ramps.pop(device_id, None)
+
+    def active(self):
+        """Endpoint IDs with a fade in progress"""
+        with self._lock:
+            return list(self._ramps)
+
+    def _run(self):
+        """Tick thread: one worker job per tick, exits when nothing is fading"""
+        while True:
+            try:
+                self._worker.submit(self._tick).result()
+            except Exception as e:
+                print(f"Error in volume fade: {e}")
+                self.cancel()
+            with self._lock:
+                if not self._ramps:
+                    self._thread = None
+                    return
+            time.sleep(self.tick)
+
+    def _tick(self):
+        """Apply the current level of every fade; runs on the COM worker"""
+        backend = self._worker.backend
+        with self._lock:
+            ramps = list(self._ramps.items())
+        for device_id, ramp in ramps:
+            if ramp.target is None:
+                current = backend.get_volume(device_id)
+                with self._lock:
+                    if current is None:
+                        self._ramps.pop(device_id, None)
+                        continue
+                    ramp.start_level = ramp.applied = current[0]
+                    ramp.start_time = time.monotonic()
+                    ramp.target = _clamp(current[0] + ramp.delta)
+            with self._lock:
+                level = ramp.level_at(time.monotonic(), self.duration)
+            ok = True
+            if level != ramp.applied:
+                ok = backend.set_volume(device_id, level)
+                ramp.applied = level
+                self.metrics['updates'] += 1
+            with self._lock:
+                if self._ramps.get(device_id) is not ramp:
+                    continue
+                # A step may have moved the target since the level was taken
+                if not ok or ramp.applied == ramp.target:
+                    del self._ramps[device_id]
+                    self.metrics['fades'] += 1